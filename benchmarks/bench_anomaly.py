@@ -0,0 +1,92 @@
+"""
+Benchmark: detect_anomalies() over the whole books table and over a small
+incremental slice (the rows one run would have upserted).
+
+Each size is loaded into a fresh SQLite file (or DATABASE_URL if set), with a
+previous raw_books observation for every 10th book so price-jump detection
+has history to read.
+
+Run:
+    python -m benchmarks.bench_anomaly
+    python -m benchmarks.bench_anomaly --sizes 100000 1000000 3000000 --chunk-size 100000
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+
+def url(i):
+    return f"https://books.toscrape.com/catalogue/book_{i}/index.html"
+
+
+def load(n, categories):
+    from sqlalchemy import insert
+
+    from src.db.connector import chunked, get_session, insert_raw_books
+    from src.db.models import Book
+
+    rnd = random.Random(n)
+    books = (
+        {
+            "title": f"Book {i}",
+            "price": round(rnd.uniform(10, 60) if i % 997 else rnd.uniform(500, 900), 2),
+            "rating": None if i % 1499 == 0 else rnd.randint(1, 5),
+            "availability": rnd.randint(0, 22),
+            "category": categories[i % len(categories)],
+            "product_page_url": url(i),
+        }
+        for i in range(n)
+    )
+    with get_session() as session:
+        for chunk in chunked(books, 50_000):
+            session.execute(insert(Book.__table__), chunk)
+    history = (
+        {"title": f"Book {i}", "price": f"£{rnd.uniform(10, 60):.2f}", "availability": "In stock",
+         "rating": "Three", "product_page_url": url(i), "category": categories[i % len(categories)]}
+        for i in range(0, n, 10) for _ in range(2)
+    )
+    insert_raw_books(history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunk-size", type=int, default=None, help="rows per chunk (default: ANOMALY_CHUNK_SIZE)")
+    parser.add_argument("--incremental", type=int, default=1_000, help="URLs scored in the incremental pass")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-anomaly-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/books.db")
+
+    from benchmarks.fixtures import CATEGORIES
+    from src.config import ANOMALY_CHUNK_SIZE
+    from src.db.connector import engine
+    from src.db.init_db import create_tables
+    from src.db.models import Base
+    from src.processing.anomaly import detect_anomalies
+
+    logging.getLogger().setLevel(logging.WARNING)
+    chunk_size = args.chunk_size or ANOMALY_CHUNK_SIZE
+    print(f"Database: {engine.url.render_as_string(hide_password=True)} (chunk size {chunk_size})")
+    print(f"{'books':>10} | {'pass':<11} | {'scored':>10} | {'flagged':>8} | {'seconds':>8} | {'rows/s':>12}")
+
+    for n in args.sizes:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        load(n, CATEGORIES)
+        step = max(1, n // args.incremental)
+        passes = [("full", None), ("incremental", [url(i) for i in range(0, n, step)])]
+        for name, urls in passes:
+            start = time.perf_counter()
+            counts = detect_anomalies(urls=urls, chunk_size=chunk_size,
+                                      report_path=os.path.join(workdir, f"anomalies_{n}_{name}.csv"))
+            elapsed = time.perf_counter() - start
+            print(f"{n:>10} | {name:<11} | {counts['scored']:>10,} | {counts['flagged']:>8,} | "
+                  f"{elapsed:>8.2f} | {counts['scored'] / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: per-batch book lookups against the database vs the in-process BookIndex.
+
+Each size loads `books` books into a fresh SQLite file (or DATABASE_URL if
+set), then re-runs a streaming pipeline's DB stages over the whole catalogue
+in batches of --batch-size rows (one transaction each), 10% of them with a
+new price:
+
+    database  diff_rows() -> bulk_upsert_books() -> record_snapshots(), each
+              SELECTing the batch's books (content hashes, then ids)
+    index     the same with a BookIndex warmed by one streaming SELECT
+              (warm-up included in the time)
+
+"selects" counts the SELECTs reading the books table. --max-entries below
+the catalogue size shows the cost of evictions (misses go back to the
+database).
+
+Run:
+    python -m benchmarks.bench_book_index
+    python -m benchmarks.bench_book_index --sizes 1000000 --max-entries 250000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+URL = "https://books.toscrape.com/catalogue/book_{}/index.html"
+
+
+def load(n):
+    from sqlalchemy import insert
+
+    from src.db.connector import chunked, content_hash, get_session
+    from src.db.models import Book
+
+    def rows():
+        for i in range(n):
+            row = {"title": f"Book {i}", "price": 20.0, "rating": 3, "availability": 5, "category": "Poetry",
+                   "product_page_url": URL.format(i)}
+            yield {**row, "content_hash": content_hash(row)}
+
+    with get_session() as session:
+        for chunk in chunked(rows(), 50_000):
+            session.execute(insert(Book.__table__), chunk)
+
+
+def run(n, batch_size, round_no, book_index=None):
+    """One pass over the catalogue; every 10th book gets a new price."""
+    from src.db.connector import bulk_upsert_books, chunked, get_session
+    from src.db.history import record_snapshots
+    from src.pipeline import diff_rows
+
+    rows = ({"title": f"Book {i}", "price": 20.0 + round_no * (i % 10 == 0), "rating": 3, "availability": 5,
+             "category": "Poetry", "product_page_url": URL.format(i)} for i in range(n))
+    written = 0
+    for batch in chunked(rows, batch_size):
+        with get_session() as session:
+            changed, _, stored = diff_rows(batch, session=session, book_index=book_index)
+            counts = bulk_upsert_books(changed, session=session, stored_hashes=stored, index=book_index)
+            record_snapshots(changed, session=session, index=book_index)
+        if book_index is not None:
+            book_index.commit()
+        written += counts["updated"]
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="books in the catalogue")
+    parser.add_argument("--batch-size", type=int, default=200, help="rows per batch (PIPELINE_BATCH_SIZE)")
+    parser.add_argument("--max-entries", type=int, help="BookIndex capacity (default: the catalogue size)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-book-index-')}/books.db")
+
+    from sqlalchemy import event
+
+    from src.db.book_index import BookIndex
+    from src.db.connector import engine
+    from src.db.init_db import create_tables
+    from src.db.models import Base
+
+    selects = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *_: selects.append(1)
+                 if statement.lstrip().startswith("SELECT") and "FROM books" in statement else None)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)} (batch size {args.batch_size})")
+    print(f"{'books':>10} | {'mode':<8} | {'seconds':>8} | {'rows/s':>9} | {'selects':>7} | {'updated':>7}")
+
+    for n in args.sizes:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        load(n)
+        for round_no, mode in enumerate(("database", "index"), start=1):
+            selects.clear()
+            start = time.perf_counter()
+            book_index = BookIndex.warm(max_entries=args.max_entries or n) if mode == "index" else None
+            updated = run(n, args.batch_size, round_no, book_index)
+            elapsed = time.perf_counter() - start
+            print(f"{n:>10,} | {mode:<8} | {elapsed:>8.2f} | {n / elapsed:>9,.0f} | {len(selects):>7,} | {updated:>7,}")
+
+
+if __name__ == "__main__":
+    main()
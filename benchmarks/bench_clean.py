@@ -0,0 +1,62 @@
+"""
+Microbenchmark: row-by-row clean_row vs columnar clean_frame / clean_batch.
+
+Run:
+    python -m benchmarks.bench_clean
+    python -m benchmarks.bench_clean --rows 100000
+"""
+import argparse
+import logging
+import random
+import time
+
+PRICES = ["Â£51.77", "£53.74", "50.10", "£47.82", "Â£13.99", ""]
+RATINGS = ["One", "Two", "Three", "Four", "Five", "3", "4.0", None]
+AVAILABILITY = ["In stock (22 available)", "In stock (3 available)", "In stock", "Out of stock", "15 in stock"]
+
+
+def make_rows(n, seed=42):
+    rnd = random.Random(seed)
+    return [
+        {
+            "title": f"Book {i}",
+            "price": rnd.choice(PRICES),
+            "rating": rnd.choice(RATINGS),
+            "availability": rnd.choice(AVAILABILITY),
+            "product_page_url": f"https://books.toscrape.com/catalogue/book_{i}/index.html",
+        }
+        for i in range(n)
+    ]
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:>8.2f}s {n / elapsed:>14,.0f} rows/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    import pandas as pd
+    from src.processing.clean import clean_batch, clean_frame, clean_row
+
+    logging.disable(logging.WARNING)  # unparseable synthetic values would flood the log
+    rows = make_rows(args.rows)
+    frame = pd.DataFrame.from_records(rows)
+    print(f"{args.rows:,} synthetic raw rows")
+
+    expected, loop_time = timed("clean_row loop", lambda: [c for c in map(clean_row, rows) if c], args.rows)
+    _, frame_time = timed("clean_frame (DataFrame in/out)", lambda: clean_frame(frame), args.rows)
+    batched, batch_time = timed("clean_batch (dicts in/out)", lambda: clean_batch(rows), args.rows)
+
+    assert batched == expected, "clean_batch must match clean_row"
+    print(f"speedup: clean_frame {loop_time / frame_time:.1f}x, clean_batch {loop_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
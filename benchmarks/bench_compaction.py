@@ -0,0 +1,108 @@
+"""
+Benchmark: raw_books compaction and retention after simulated months of daily runs.
+
+Each size loads `books` URLs x --days daily observations into a fresh SQLite
+file (or DATABASE_URL if set); a book's price changes on --churn of the days,
+and every other day repeats the previous observation. It then times:
+
+    compact   compact_raw_books(retention_days=0): repeats collapse into
+              validity ranges
+    retain    compact_raw_books(retention_days=--retention-days): ranges
+              that ended before the cutoff are deleted, the latest per URL kept
+    rebuild   rebuild_books() (newest raw row per URL) after loading and
+              after each step, as a read over the whole table
+
+and reports rows and bytes used before / after (see src/db/compaction.py).
+
+Run:
+    python -m benchmarks.bench_compaction
+    python -m benchmarks.bench_compaction --sizes 10000 --days 365 --churn 0.02
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+URL = "https://books.toscrape.com/catalogue/book_{}/index.html"
+
+
+def load(n, days, churn, seed=0):
+    from sqlalchemy import insert
+
+    from src.db.connector import chunked, get_session
+    from src.db.models import RawBook
+
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+    prices = [rng.uniform(10, 60) for _ in range(n)]
+
+    def rows():
+        for day in range(days):
+            for i in range(n):
+                if rng.random() < churn:
+                    prices[i] = rng.uniform(10, 60)
+                yield {"title": f"Book {i}", "price_raw": f"£{prices[i]:.2f}", "rating_raw": "3",
+                       "availability_raw": "In stock (5 available)", "category": "Poetry",
+                       "product_page_url": URL.format(i), "timestamp": start + timedelta(days=day)}
+
+    with get_session() as session:
+        for chunk in chunked(rows(), 50_000):
+            session.execute(insert(RawBook.__table__), chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000], help="books (URLs)")
+    parser.add_argument("--days", type=int, default=120, help="daily runs simulated")
+    parser.add_argument("--churn", type=float, default=0.05, help="chance a book's price changes on a day")
+    parser.add_argument("--retention-days", type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-compaction-')}/books.db")
+
+    from sqlalchemy import func, select
+
+    from src.db.compaction import compact_raw_books, used_bytes
+    from src.db.connector import engine, get_session
+    from src.db.init_db import create_tables
+    from src.db.models import Base, RawBook
+    from src.db.rebuild import rebuild_books
+
+    def raw_rows():
+        with get_session() as session:
+            return session.execute(select(func.count()).select_from(RawBook)).scalar()
+
+    def timed_rebuild():
+        start = time.perf_counter()
+        rebuild_books()
+        return time.perf_counter() - start
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)} "
+          f"({args.days} days, churn {args.churn:.0%}, retention {args.retention_days} days)")
+    print(f"{'books':>7} | {'step':<7} | {'seconds':>7} | {'rows before':>11} | {'rows after':>10} | "
+          f"{'MB before':>9} | {'MB after':>8} | {'rebuild s':>9}")
+
+    for n in args.sizes:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        start = time.perf_counter()
+        load(n, args.days, args.churn)
+        with get_session() as session:
+            loaded = used_bytes(session.connection())
+        print(f"{n:>7,} | {'load':<7} | {time.perf_counter() - start:>7.2f} | {'':>11} | {raw_rows():>10,} | "
+              f"{'':>9} | {loaded / 1e6:>8.1f} | {timed_rebuild():>9.2f}")
+        for step, retention in (("compact", 0), ("retain", args.retention_days)):
+            rows_before = raw_rows()
+            report = compact_raw_books(retention_days=retention)
+            rows_after = raw_rows()
+            print(f"{n:>7,} | {step:<7} | {report['seconds']:>7.2f} | {rows_before:>11,} | {rows_after:>10,} | "
+                  f"{report['bytes_before'] / 1e6:>9.1f} | {report['bytes_after'] / 1e6:>8.1f} | "
+                  f"{timed_rebuild():>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
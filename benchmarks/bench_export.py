@@ -0,0 +1,110 @@
+"""
+Benchmark: analysis reads from the database vs the columnar export (src/export.py).
+
+Each size is loaded into a fresh SQLite file (or DATABASE_URL if set) and
+exported as Parquet and as Arrow IPC into a temporary directory, then times:
+
+    full load    every books row into a pandas DataFrame
+                 (SQL: pandas.read_sql of SELECT *; export: read_export().to_pandas())
+    price scan   mean price per category over the whole table
+                 (SQL: ORM rows into pandas; export: projected read + Arrow group_by)
+    export       writing the dataset itself (streamed from the database)
+
+Run:
+    python -m benchmarks.bench_export
+    python -m benchmarks.bench_export --sizes 100000 1000000 3000000
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+
+def load(n, categories):
+    from sqlalchemy import insert
+
+    from src.db.connector import chunked, get_session
+    from src.db.models import Book
+
+    rnd = random.Random(n)
+    books = (
+        {"title": f"Book {i}", "price": round(rnd.uniform(10, 60), 2), "rating": rnd.randint(1, 5),
+         "availability": rnd.randint(0, 22), "category": categories[i % len(categories)],
+         "product_page_url": f"https://books.toscrape.com/catalogue/book_{i}/index.html"}
+        for i in range(n)
+    )
+    with get_session() as session:
+        for chunk in chunked(books, 50_000):
+            session.execute(insert(Book.__table__), chunk)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--categories", type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("pyarrow not installed: nothing to compare (pip install pyarrow)")
+        return
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-export-')}/books.db")
+
+    import pandas as pd
+    import pyarrow.compute as pc
+
+    from src.db.connector import engine, get_session
+    from src.db.init_db import create_tables
+    from src.db.models import Base, Book
+    from src.export import export_table, read_export
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'rows':>10} | {'source':>8} | {'export s':>8} | {'MB':>6} | {'full load s':>11} | {'price scan s':>12}")
+
+    categories = [f"Category {i}" for i in range(args.categories)]
+    for n in args.sizes:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        load(n, categories)
+
+        def sql_full():
+            with engine.connect() as conn:
+                return pd.read_sql("SELECT * FROM books", conn)
+
+        def sql_scan():
+            with get_session() as session:
+                rows = session.query(Book.category, Book.price).all()
+            return pd.DataFrame(rows, columns=["category", "price"]).groupby("category")["price"].mean()
+
+        _, full_s = timed(sql_full)
+        _, scan_s = timed(sql_scan)
+        print(f"{n:>10,} | {'sql':>8} | {'':>8} | {'':>6} | {full_s:>11.3f} | {scan_s:>12.3f}")
+
+        for fmt in ("parquet", "ipc"):
+            export_dir = tempfile.mkdtemp(prefix="bench-export-")
+            result, export_s = timed(lambda: export_table("books", fmt, export_dir=export_dir))
+            _, full_s = timed(lambda: read_export("books", export_dir=export_dir).to_pandas())
+            _, scan_s = timed(lambda: read_export("books", columns=["category", "price"], export_dir=export_dir)
+                              .group_by("category").aggregate([("price", "mean")]))
+            print(f"{n:>10,} | {fmt:>8} | {export_s:>8.2f} | {result['bytes'] / 1e6:>6.1f} | "
+                  f"{full_s:>11.3f} | {scan_s:>12.3f}")
+
+        # Partition pruning: one category is one directory
+        _, one_s = timed(lambda: read_export("books", columns=["price"], export_dir=export_dir,
+                                             filter=pc.field("category") == categories[0]))
+        print(f"{'':>10}   one category (ipc, pruned): {one_s:.4f} s")
+
+
+if __name__ == "__main__":
+    main()
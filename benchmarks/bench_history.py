@@ -0,0 +1,93 @@
+"""
+Benchmark: book_snapshots query helpers as the history grows.
+
+Each size loads `books` books with `--snapshots` changes each (spread over a
+year) into a fresh SQLite file (or DATABASE_URL if set), then times:
+
+    price_history     one book, whole year
+    as_of (1k books)  latest snapshot at mid-year for 1000 books
+    price_changes     books whose price dropped in one week
+
+Their latency should stay flat as the table grows, since all of them are
+index seeks or range scans.
+
+Run:
+    python -m benchmarks.bench_history
+    python -m benchmarks.bench_history --books 10000 100000 --snapshots 20
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def load(n, per_book):
+    from sqlalchemy import insert
+
+    from src.db.connector import chunked, get_session
+    from src.db.models import Book, BookSnapshot
+
+    rnd = random.Random(n)
+    books = ({"id": i, "title": f"Book {i}", "price": 20.0, "rating": 3, "availability": 5,
+              "product_page_url": f"https://books.toscrape.com/catalogue/book_{i}/index.html"}
+             for i in range(1, n + 1))
+    snapshots = (
+        {"book_id": i, "observed_at": T0 + timedelta(minutes=minute), "price": round(rnd.uniform(10, 60), 2),
+         "availability": rnd.randint(0, 22)}
+        for i in range(1, n + 1)
+        for minute in sorted(rnd.sample(range(365 * 24 * 60), per_book))
+    )
+    with get_session() as session:
+        for chunk in chunked(books, 50_000):
+            session.execute(insert(Book.__table__), chunk)
+        for chunk in chunked(snapshots, 50_000):
+            session.execute(insert(BookSnapshot.__table__), chunk)
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--snapshots", type=int, default=20, help="snapshots per book")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-history-')}/books.db")
+
+    from src.db.connector import engine
+    from src.db.history import price_changes, price_history, snapshots_as_of
+    from src.db.init_db import create_tables
+    from src.db.models import Base
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'snapshots':>12} | {'price_history ms':>16} | {'as_of 1k ms':>11} | {'price_changes ms':>16} | {'dropped':>8}")
+
+    for n in args.books:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        load(n, args.snapshots)
+        _, history_s = timed(lambda: price_history(n // 2))
+        ids = list(range(1, n + 1, max(1, n // 1000)))
+        _, as_of_s = timed(lambda: snapshots_as_of(T0 + timedelta(days=182), ids))
+        week = T0 + timedelta(days=200)
+        dropped, changes_s = timed(lambda: price_changes(week, week + timedelta(days=7), "down"))
+        print(f"{n * args.snapshots:>12,} | {history_s * 1000:>16.2f} | {as_of_s * 1000:>11.2f} | "
+              f"{changes_s * 1000:>16.2f} | {len(dropped):>8,}")
+
+
+if __name__ == "__main__":
+    main()
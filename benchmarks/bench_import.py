@@ -0,0 +1,84 @@
+"""
+Benchmark: start-up cost of the pipeline entry points.
+
+Each target runs in a fresh interpreter (best of --repeat runs):
+
+    import    python -X importtime -c "import <module>": cumulative import
+              time of the module, and the slowest modules it pulled in
+    --help    wall time of `python -m src.pipeline --help`
+
+BeautifulSoup, requests and SQLAlchemy are only imported once a run starts,
+so `import src.pipeline`, `--help` and `import src.processing.clean` should
+stay in the low tens of milliseconds; importing src.db.connector pays for
+SQLAlchemy but no longer connects or creates data/books.db.
+
+Run:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --modules src.pipeline --top 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULES = ["src.config", "src.processing.clean", "src.pipeline", "src.db.connector"]
+
+
+def import_times(module):
+    """
+    (cumulative µs of `import module`, {direct dependency: cumulative µs})
+    from -X importtime in a fresh interpreter.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name[1:].rstrip()  # nesting is shown as two spaces per level
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name == module:
+                return int(cumulative), children
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = int(cumulative)
+    raise RuntimeError(f"{module} not found in the -X importtime output")
+
+
+def wall_time(*args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=MODULES, help="modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per target; the fastest is reported")
+    parser.add_argument("--top", type=int, default=3, help="slowest imported modules listed per target")
+    args = parser.parse_args()
+
+    # Never touch data/books.db, whatever a target does at import
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+    baseline = min(wall_time("-c", "pass") for _ in range(args.repeat))
+    print(f"Interpreter start-up: {baseline * 1000:.0f} ms")
+    print(f"{'target':<30} | {'import ms':>9} | slowest imports")
+    for module in args.modules:
+        total, children = min((import_times(module) for _ in range(args.repeat)), key=lambda run: run[0])
+        slowest = sorted(children.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        listed = ", ".join(f"{name} {us / 1000:.0f}" for name, us in slowest)
+        print(f"{module:<30} | {total / 1000:>9.1f} | {listed}")
+
+    help_s = min(wall_time("-m", "src.pipeline", "--help") for _ in range(args.repeat))
+    print(f"{'python -m src.pipeline --help':<30} | {help_s * 1000:>9.0f} | wall time, "
+          f"{(help_s - baseline) * 1000:.0f} ms over start-up")
+
+
+if __name__ == "__main__":
+    main()
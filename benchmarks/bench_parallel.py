@@ -0,0 +1,87 @@
+"""
+Benchmark: the CPU-bound stages inline vs in a ParsePool of worker processes.
+
+A local FixtureServer catalogue is scraped once into a ResponseCache; every
+timed run then re-scrapes it from the cache, so the time is parsing (and
+cache reads), not the network:
+
+    scrape   scraper(cache=...) with product pages parsed inline
+             (--parse-workers 0) or in a ParsePool of N processes
+    clean    clean_batch() of the scraped rows repeated to --clean-rows rows,
+             inline vs ParsePool.clean() split over N processes
+
+Every variant is checked to give the same rows as the inline run. Speed-ups
+need as many free cores as workers (the "cores" line): on a single core the
+pool only adds pickling and process switches.
+
+Run:
+    python -m benchmarks.bench_parallel
+    python -m benchmarks.bench_parallel --books 5000 --workers 2 4 8
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=2000, help="books in the fixture catalogue")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="ParsePool sizes to time")
+    parser.add_argument("--clean-rows", type=int, default=500_000, help="rows per clean batch")
+    args = parser.parse_args()
+
+    os.environ.setdefault("RATE_LIMIT_RPS", "1000")
+    os.environ.setdefault("RATE_LIMIT_MAX_RPS", "1000")
+
+    from benchmarks.server import FixtureServer
+    from src.processing.clean import clean_batch
+    from src.processing.parallel import ParsePool, available_cores
+    from src.scrape.cache import ResponseCache
+    from src.scrape.scraper import scraper
+
+    logging.getLogger().setLevel(logging.WARNING)
+    cache = ResponseCache(os.path.join(tempfile.mkdtemp(prefix="bench-parallel-"), "cache.db"))
+    print(f"Cores available: {available_cores()}")
+
+    with FixtureServer(total_books=args.books) as server:
+        pages = server.pages
+        baseline = list(scraper(max_pages=pages, cache=cache, base_url=server.base_url))  # warm the cache
+    print(f"Catalogue: {len(baseline):,} books on {pages} listing pages (served from the cache)")
+
+    print(f"{'stage':<6} | {'workers':>7} | {'seconds':>8} | {'rows/s':>10} | {'speed-up':>8}")
+
+    def report(stage, workers, elapsed, rows, inline):
+        print(f"{stage:<6} | {workers:>7} | {elapsed:>8.2f} | {rows / elapsed:>10,.0f} | {inline / elapsed:>7.2f}x")
+
+    start = time.perf_counter()
+    rows = list(scraper(max_pages=pages, cache=cache, base_url=server.base_url))
+    inline = time.perf_counter() - start
+    assert rows == baseline
+    report("scrape", 0, inline, len(rows), inline)
+    for workers in args.workers:
+        with ParsePool(workers) as pool:
+            start = time.perf_counter()
+            parsed = list(scraper(max_pages=pages, cache=cache, base_url=server.base_url, parse_pool=pool))
+            elapsed = time.perf_counter() - start
+        assert parsed == baseline, f"{workers} parse workers gave different rows"
+        report("scrape", workers, elapsed, len(parsed), inline)
+
+    batch = (baseline * (args.clean_rows // len(baseline) + 1))[:args.clean_rows]
+    start = time.perf_counter()
+    cleaned = clean_batch(batch)
+    inline = time.perf_counter() - start
+    report("clean", 0, inline, len(batch), inline)
+    for workers in args.workers:
+        with ParsePool(workers, clean_min_rows=1) as pool:
+            start = time.perf_counter()
+            result = pool.clean(batch)
+            elapsed = time.perf_counter() - start
+        assert result == cleaned, f"{workers} clean workers gave different rows"
+        report("clean", workers, elapsed, len(batch), inline)
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
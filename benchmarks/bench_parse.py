@@ -0,0 +1,97 @@
+"""
+Parse-throughput benchmark for listing and product pages.
+
+Compares the BeautifulSoup backends (html.parser, lxml if installed) with and
+without SoupStrainer-restricted parsing, and checks every variant extracts
+exactly the same fields as the full html.parser baseline.
+
+The corpus is a directory of saved pages (*.html; pages containing
+"product_pod" count as listing pages), or generated books.toscrape.com-shaped
+pages from benchmarks/fixtures.py when --corpus is not given.
+
+Run:
+    python -m benchmarks.bench_parse
+    python -m benchmarks.bench_parse --corpus saved_pages/
+    python -m benchmarks.bench_parse --save saved_pages/   # write the generated corpus
+"""
+import argparse
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import PER_PAGE, render_listing_page, render_product_page
+from src.scrape.scraper import parse_listing_page, parse_product_details
+
+PAGE_URL = "https://books.toscrape.com/catalogue/page-1.html"
+
+
+def generated_corpus(listing_pages, product_pages):
+    listings = [render_listing_page(p, listing_pages * PER_PAGE) for p in range(1, listing_pages + 1)]
+    products = [render_product_page(i) for i in range(1, product_pages + 1)]
+    return listings, products
+
+
+def load_corpus(directory):
+    listings, products = [], []
+    for path in sorted(Path(directory).glob("**/*.html")):
+        html = path.read_text(encoding="utf-8")
+        (listings if "product_pod" in html else products).append(html)
+    return listings, products
+
+
+def variants():
+    backends = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+        backends.append("lxml")
+    except ImportError:
+        print("lxml not installed: only html.parser variants")
+    return [(parser, strain) for parser in backends for strain in (False, True)]
+
+
+def run(listings, products, parser, strain):
+    start = time.perf_counter()
+    parsed = [parse_listing_page(html, PAGE_URL, parser=parser, strain=strain) for html in listings]
+    parsed += [parse_product_details(html, parser=parser, strain=strain) for html in products]
+    return parsed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of saved .html pages")
+    parser.add_argument("--listing-pages", type=int, default=50)
+    parser.add_argument("--product-pages", type=int, default=1000)
+    parser.add_argument("--save", help="write the generated corpus to this directory and exit")
+    args = parser.parse_args()
+
+    if args.corpus:
+        listings, products = load_corpus(args.corpus)
+    else:
+        listings, products = generated_corpus(args.listing_pages, args.product_pages)
+
+    if args.save:
+        out = Path(args.save)
+        out.mkdir(parents=True, exist_ok=True)
+        for n, html in enumerate(listings, start=1):
+            (out / f"page-{n}.html").write_text(html, encoding="utf-8")
+        for n, html in enumerate(products, start=1):
+            (out / f"product-{n}.html").write_text(html, encoding="utf-8")
+        print(f"Saved {len(listings) + len(products)} pages to {out}")
+        return
+
+    total = len(listings) + len(products)
+    megabytes = sum(len(h.encode("utf-8")) for h in listings + products) / 1e6
+    print(f"Corpus: {len(listings)} listing + {len(products)} product pages ({megabytes:.1f} MB)")
+
+    baseline, baseline_time = None, None
+    for backend, strain in variants():
+        parsed, elapsed = run(listings, products, backend, strain)
+        if baseline is None:
+            baseline, baseline_time = parsed, elapsed
+        assert parsed == baseline, f"{backend} strain={strain} extracted different fields"
+        label = f"{backend}{' + strainer' if strain else ''}"
+        print(f"{label:<24} {elapsed:>7.2f}s {total / elapsed:>9,.0f} pages/s "
+              f"{megabytes / elapsed:>7.1f} MB/s {baseline_time / elapsed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
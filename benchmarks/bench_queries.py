@@ -0,0 +1,119 @@
+"""
+Benchmark: read patterns on books with and without the read API's indexes and cache.
+
+Each size loads `books` books over 50 categories into a fresh SQLite file (or
+DATABASE_URL if set), then times, with the ix_books_* indexes dropped and
+with them created:
+
+    full scan    check_db.py's old way: SELECT * FROM books, filter in Python
+    offset page  ORDER BY price, id LIMIT 100 OFFSET k, k deep in the table
+    keyset page  books_page(after=cursor) for the same page
+    top-n        the 5 cheapest per category: ROW_NUMBER() window over the
+                 table vs cheapest_per_category() (one index seek per category)
+    cached       books_page() again, answered by the TTL cache
+
+Run:
+    python -m benchmarks.bench_queries
+    python -m benchmarks.bench_queries --sizes 1000000 --repeat 20
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+URL = "https://books.toscrape.com/catalogue/book_{}/index.html"
+CATEGORIES = 50
+
+
+def load(n):
+    from sqlalchemy import insert
+
+    from src.db.connector import chunked, get_session
+    from src.db.models import Book
+
+    rows = ({"title": f"Book {i}", "price": round(10 + (i * 7919 % 5000) / 100, 2), "rating": i % 5 + 1,
+             "availability": i % 7, "category": f"Category {i % CATEGORIES}", "product_page_url": URL.format(i)}
+            for i in range(n))
+    with get_session() as session:
+        for chunk in chunked(rows, 50_000):
+            session.execute(insert(Book.__table__), chunk)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000], help="books in the table")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (mean is reported)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-queries-')}/books.db")
+
+    from sqlalchemy import func, select, text
+
+    from src.db import queries
+    from src.db.connector import engine, get_session
+    from src.db.init_db import create_tables
+    from src.db.models import Base, Book
+
+    indexes = [index for index in Book.__table__.indexes if index.name.startswith("ix_books_") and
+               index.name != "ix_books_product_page_url"]
+
+    def full_scan():
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT * FROM books")).fetchall()
+        return [r for r in rows if r.category == "Category 7" and r.price <= 20 and r.availability > 0][:100]
+
+    def offset_page(offset):
+        with get_session() as session:
+            return session.execute(queries.books_query(min_price=0).limit(100).offset(offset)).all()
+
+    def window_top_n():
+        rank = func.row_number().over(partition_by=Book.category, order_by=(Book.price, Book.id)).label("rank")
+        ranked = select(Book.id, Book.category, Book.price, rank).subquery()
+        with get_session() as session:
+            return session.execute(select(ranked).where(ranked.c.rank <= 5)).all()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)} (mean of {args.repeat} runs, ms)")
+    print(f"{'books':>9} | {'indexes':<7} | {'query':<20} | {'ms':>9}")
+
+    for n in args.sizes:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        load(n)
+        offset = n * 9 // 10
+        with get_session() as session:
+            # The cursor of the row just before the offset page
+            cursor = tuple(session.execute(queries.books_query(min_price=0).with_only_columns(Book.price, Book.id)
+                                           .limit(1).offset(offset - 1)).one())
+        for mode in ("dropped", "created"):
+            with engine.begin() as conn:
+                for index in indexes:
+                    index.drop(conn) if mode == "dropped" else index.create(conn)
+            queries.CACHE.ttl = 0  # uncached timings
+            results = {
+                "full scan": timed(full_scan, args.repeat),
+                f"offset page ({offset:,})": timed(lambda: offset_page(offset), args.repeat),
+                "keyset page": timed(lambda: queries.books_page(min_price=0, after=cursor), args.repeat),
+                "top-5 window": timed(window_top_n, args.repeat),
+                "top-5 seeks": timed(lambda: queries.cheapest_per_category(5), args.repeat),
+            }
+            assert [tuple(r)[:3] for r in results[f"offset page ({offset:,})"][1]] == \
+                [(b["id"], b["title"], b["price"]) for b in results["keyset page"][1]["books"]]
+            queries.CACHE.ttl = 60
+            queries.books_page(category="Category 7", max_price=20, in_stock=True)
+            results["cached page"] = timed(
+                lambda: queries.books_page(category="Category 7", max_price=20, in_stock=True), args.repeat)
+            for name, (ms, _) in results.items():
+                print(f"{n:>9,} | {mode:<7} | {name:<20} | {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: rebuilding books from raw_books in Python vs inside the database.
+
+Each size loads `raw` raw_books rows (five observations per product URL)
+into a fresh SQLite file (or DATABASE_URL if set), then rebuilds books twice
+from an empty table:
+
+    python    stream the latest raw row per URL, clean_batch(), bulk_upsert_books()
+    database  rebuild_books(): one INSERT ... SELECT ... ON CONFLICT statement
+
+Run:
+    python -m benchmarks.bench_rebuild
+    python -m benchmarks.bench_rebuild --sizes 1000000 5000000
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+PRICES = [f"Â£{p / 100:.2f}" for p in range(1000, 6000, 7)]
+RATINGS = ["One", "Two", "Three", "Four", "Five"]
+
+
+def load(n):
+    from src.db.connector import insert_raw_books
+
+    rnd = random.Random(n)
+    urls = max(1, n // 5)
+    insert_raw_books(
+        {"title": f"Book {i % urls}", "price": rnd.choice(PRICES), "rating": rnd.choice(RATINGS),
+         "availability": f"In stock ({rnd.randint(0, 22)} available)", "category": "Poetry",
+         "product_page_url": f"https://books.toscrape.com/catalogue/book_{i % urls}/index.html"}
+        for i in range(n)
+    )
+
+
+def rebuild_in_python():
+    from src.db.connector import bulk_upsert_books, get_session, stream_query
+    from src.db.rebuild import latest_raw_books
+    from src.processing.clean import clean_batch
+    from sqlalchemy import select
+
+    raw = latest_raw_books()
+    columns = (raw.c.title, raw.c.price_raw, raw.c.rating_raw, raw.c.availability_raw, raw.c.product_page_url)
+    written = 0
+    with get_session() as session:
+        for chunk in stream_query(select(*columns), session=session):
+            cleaned = [r for r in clean_batch(dict(row._mapping) for row in chunk) if r["price"] is not None]
+            counts = bulk_upsert_books(cleaned, session=session)
+            written += counts["inserted"] + counts["updated"]
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000], help="raw_books rows")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-rebuild-')}/books.db")
+
+    from src.db.connector import engine, get_session
+    from src.db.init_db import create_tables
+    from src.db.models import Base, Book
+    from src.db.rebuild import rebuild_books
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'raw rows':>10} | {'books':>8} | {'python s':>9} | {'database s':>10} | {'speedup':>7}")
+
+    for n in args.sizes:
+        Base.metadata.drop_all(engine)
+        create_tables()
+        load(n)
+
+        start = time.perf_counter()
+        books = rebuild_in_python()
+        python_s = time.perf_counter() - start
+
+        with get_session() as session:
+            session.query(Book).delete()
+        start = time.perf_counter()
+        counts = rebuild_books()
+        database_s = time.perf_counter() - start
+        assert counts["inserted"] == books
+
+        print(f"{n:>10,} | {books:>8,} | {python_s:>9.2f} | {database_s:>10.2f} | {python_s / database_s:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: sharded crawl throughput vs worker processes.
+
+Pages come from benchmarks/fixtures.py through an in-process fake session
+with a fixed per-request latency (no network), so the numbers show how the
+crawl scales with workers, not how fast books.toscrape.com answers. The
+per-host rate limit is lifted for the same reason.
+
+Run:
+    python -m benchmarks.bench_sharded
+    python -m benchmarks.bench_sharded --pages 20 --workers 1 2 4 8 --latency 0.05
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("RATE_LIMIT_RPS", "10000")
+os.environ.setdefault("RATE_LIMIT_MAX_RPS", "10000")
+
+from benchmarks.fixtures import PER_PAGE, book_index, render_listing_page, render_product_page
+from src.scrape.sharded import sharded_scraper
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class LatencySession:
+    """Serves fixture pages after `latency` seconds (class attributes survive fork)."""
+    latency = 0.02
+    total_books = 200
+
+    def get(self, url, timeout=None, headers=None):
+        time.sleep(self.latency)
+        if "/page-" in url:
+            page = int(url.rsplit("page-", 1)[1].split(".")[0])
+            return FakeResponse(render_listing_page(page, self.total_books))
+        return FakeResponse(render_product_page(book_index(url.rstrip("/").split("/")[-2])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=16, help="catalogue pages (20 books each)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per simulated request")
+    args = parser.parse_args()
+
+    LatencySession.latency = args.latency
+    LatencySession.total_books = args.pages * PER_PAGE
+    print(f"{args.pages} pages, {LatencySession.total_books} books, {args.latency * 1000:.0f} ms per request")
+    print(f"{'workers':>8} | {'rows':>6} | {'seconds':>8} | {'rows/s':>8} | {'speedup':>7}")
+
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        rows = list(sharded_scraper(max_pages=args.pages, workers=workers, pages_per_shard=1,
+                                    session_factory=LatencySession))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>8} | {len(rows):>6} | {elapsed:>8.2f} | {len(rows) / elapsed:>8.1f} | {baseline / elapsed:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Offline benchmark suite: scrape, clean, DB and end-to-end pipeline scenarios
+against the local fixture server (benchmarks/server.py) and a throwaway
+SQLite database. Nothing touches books.toscrape.com or data/books.db.
+
+Each scenario runs --repeat times; the best run counts. Results (rows,
+seconds, rows/s per scenario plus environment info) are written as JSON so
+a later run can be compared against them:
+
+    python -m benchmarks.bench_suite --output baseline.json
+    ... change something ...
+    python -m benchmarks.bench_suite --compare baseline.json --fail-on-regression
+
+Scenarios: scrape, scrape_sharded, scrape_async (with httpx), clean_row, clean_batch, insert_raw_books,
+upsert_books, bulk_upsert_books, pipeline, pipeline_stream.
+
+The per-host rate limit is lifted (RATE_LIMIT_RPS / RATE_LIMIT_MAX_RPS)
+since the server is local; --latency simulates the network instead.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def scraped_like_rows(n, seed=0):
+    """Rows shaped like scraper() output for fixture books 1..n."""
+    from benchmarks.fixtures import RATINGS, book
+
+    rows = []
+    for i in range(1, n + 1):
+        b = book(i, seed)
+        rows.append({
+            "title": b["title"],
+            "price": b["price"],
+            "availability": f"In stock ({b['stock']} available)",
+            "rating": RATINGS.index(b["rating"]) + 1,
+            "product_page_url": f"https://books.toscrape.com/catalogue/{b['slug']}/index.html",
+            "category": b["category"],
+        })
+    return rows
+
+
+def reset_db():
+    from src.db.connector import engine
+    from src.db.models import Base
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+
+def build_scenarios(args, server):
+    """name -> callable returning the number of rows it processed."""
+    from src.db.connector import bulk_upsert_books, insert_raw_books, upsert_books
+    from src.pipeline import run_pipeline
+    from src.processing.clean import clean_batch, clean_row
+    from src.scrape.scraper import scraper
+    from src.scrape.sharded import sharded_scraper
+
+    rows = scraped_like_rows(args.rows)
+    cleaned = clean_batch(rows)
+    cleaned_loop = cleaned[:args.loop_rows]
+
+    def db(fn):
+        def run():
+            reset_db()
+            return fn()
+        return run
+
+    scenarios = {
+        "scrape": lambda: sum(1 for _ in scraper(max_pages=args.pages, base_url=server.base_url)),
+        "scrape_sharded": lambda: sum(1 for _ in sharded_scraper(max_pages=args.pages, workers=args.workers,
+                                                                 pages_per_shard=1, base_url=server.base_url)),
+        "clean_row": lambda: len([r for r in (clean_row(row) for row in rows) if r is not None]),
+        "clean_batch": lambda: len(clean_batch(rows)),
+        "insert_raw_books": db(lambda: insert_raw_books(rows)),
+        "upsert_books": db(lambda: upsert_books(cleaned_loop) or len(cleaned_loop)),
+        "bulk_upsert_books": db(lambda: sum(bulk_upsert_books(cleaned).values())),
+        "pipeline": db(lambda: run_pipeline(args.pages, base_url=server.base_url)["upserted"]),
+        "pipeline_stream": db(lambda: run_pipeline(args.pages, stream=True, base_url=server.base_url)["upserted"]),
+    }
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        return scenarios
+    from src.scrape.async_scraper import async_scraper_sync
+
+    scenarios["scrape_async"] = lambda: sum(1 for _ in async_scraper_sync(max_pages=args.pages,
+                                                                          base_url=server.base_url))
+    return scenarios
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print rows/s against a previous results file; return the regressed scenario names."""
+    regressed = []
+    print(f"\n{'scenario':<18} | {'baseline rows/s':>16} | {'now rows/s':>12} | {'change':>8}")
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old.get("rows_per_s"):
+            print(f"{name:<18} | {'-':>16} | {result['rows_per_s']:>12,.0f} | {'new':>8}")
+            continue
+        change = result["rows_per_s"] / old["rows_per_s"] - 1
+        flag = ""
+        if change < -threshold:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<18} | {old['rows_per_s']:>16,.0f} | {result['rows_per_s']:>12,.0f} | {change:>+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=400, help="books served by the fixture server")
+    parser.add_argument("--pages", type=int, default=5, help="listing pages scraped by the scrape/pipeline scenarios")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds of server latency per request")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows for the clean / DB scenarios")
+    parser.add_argument("--loop-rows", type=int, default=5_000, help="rows for the per-row upsert_books loop")
+    parser.add_argument("--workers", type=int, default=4, help="processes for scrape_sharded")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help="run just these scenarios")
+    parser.add_argument("--output", help=f"results JSON (default: {RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="rows/s drop counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any scenario regressed")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{workdir}/books.db")
+    os.environ["RATE_LIMIT_RPS"] = os.environ["RATE_LIMIT_MAX_RPS"] = "10000"
+
+    import logging
+    import src.metrics
+    from benchmarks.server import FixtureServer
+
+    logging.basicConfig(level=logging.WARNING)  # keep the suite output to the table
+    src.metrics.REPORTS_DIR = workdir  # run_pipeline's metrics JSON
+
+    results = {}
+    with FixtureServer(total_books=args.books, latency=args.latency) as server:
+        scenarios = build_scenarios(args, server)
+        names = args.only or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        print(f"Fixture server {server.base_url}: {args.books} books, {args.latency * 1000:.0f} ms latency")
+        print(f"{'scenario':<18} | {'rows':>8} | {'best s':>8} | {'rows/s':>12}")
+        for name in names:
+            best, rows = None, 0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = scenarios[name]()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = {"rows": rows, "seconds": round(best, 4), "rows_per_s": round(rows / best, 1)}
+            print(f"{name:<18} | {rows:>8,} | {best:>8.3f} | {rows / best:>12,.0f}")
+
+    params = {k: v for k, v in vars(args).items() if k not in ("output", "compare", "fail_on_regression")}
+    payload = {"environment": environment(), "params": params, "results": results}
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        regressed = compare(results, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.threshold)
+        if regressed and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: per-row upsert_books loop vs set-based bulk_upsert_books.
+
+Each size runs against a fresh SQLite file (or DATABASE_URL if set):
+an insert pass (all URLs new) followed by an update pass (all URLs exist).
+The per-row loop runs at every size unless --loop-max caps it (at 1M rows
+it takes a while: one round trip per row).
+
+Run:
+    python -m benchmarks.bench_upsert
+    python -m benchmarks.bench_upsert --loop-max 100000    # skip the loop at 1M rows
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+
+def make_rows(n, version=0):
+    return [
+        {
+            "title": f"Book {i} v{version}",
+            "price": round(10 + (i % 5000) / 100 + version, 2),
+            "rating": i % 6,
+            "availability": i % 23,
+            "product_page_url": f"https://books.toscrape.com/catalogue/book_{i}/index.html",
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, rows):
+    start = time.perf_counter()
+    fn(rows)
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--loop-max", type=int, default=None,
+                        help="skip the per-row loop above this many rows (default: run it at every size; "
+                             "it is O(n) round trips)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='bench-upsert-')}/books.db")
+
+    from src.db.init_db import create_tables
+    from src.db.connector import engine, upsert_books, bulk_upsert_books
+    from src.db.models import Base
+
+    logging.getLogger("src.db.connector").setLevel(logging.WARNING)
+    print(f"Database: {engine.url}")
+    print(f"{'rows':>10} | {'engine':<6} | {'insert rows/s':>14} | {'update rows/s':>14}")
+
+    for n in args.sizes:
+        new_rows, changed_rows = make_rows(n), make_rows(n, version=1)
+        engines = [("bulk", bulk_upsert_books)]
+        if args.loop_max is None or n <= args.loop_max:
+            engines.insert(0, ("loop", upsert_books))
+        else:
+            print(f"{n:>10} | {'loop':<6} | {'skipped (--loop-max)':>31}")
+
+        for name, fn in engines:
+            Base.metadata.drop_all(engine)
+            create_tables()
+            insert_rate = timed(fn, new_rows)
+            update_rate = timed(fn, changed_rows)
+            print(f"{n:>10} | {name:<6} | {insert_rate:>14,.0f} | {update_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Synthetic books.toscrape.com pages with the same HTML structure as the live site
+(listing pages with 20 `article.product_pod` cards and `li.next` pagination,
+product pages with breadcrumb, `.product_main`, availability and info table).
+
+Deterministic for a given seed, so benchmarks and tests can run offline.
+"""
+import random
+
+CATEGORIES = [
+    "Travel", "Mystery", "Historical Fiction", "Sequential Art", "Classics", "Philosophy",
+    "Romance", "Womens Fiction", "Fiction", "Childrens", "Religion", "Nonfiction", "Music",
+    "Default", "Science Fiction", "Sports and Games", "Add a comment", "Fantasy", "New Adult",
+    "Young Adult", "Science", "Poetry", "Paranormal", "Art", "Psychology", "Autobiography",
+    "Parenting", "Adult Fiction", "Humor", "Horror", "History", "Food and Drink",
+    "Christian Fiction", "Business", "Biography", "Thriller", "Contemporary", "Spirituality",
+    "Academic", "Self Help", "Historical", "Christian", "Suspense", "Short Stories", "Novels",
+    "Health", "Politics", "Cultural", "Erotica", "Crime",
+]
+RATINGS = ["One", "Two", "Three", "Four", "Five"]
+PER_PAGE = 20
+
+HEAD = """<!DOCTYPE html>
+<!--[if lt IE 7]>      <html lang="en-us" class="no-js lt-ie9 lt-ie8 lt-ie7"> <![endif]-->
+<html lang="en-us" class="no-js">
+    <head>
+        <title>{title} | Books to Scrape - Sandbox</title>
+        <meta http-equiv="content-type" content="text/html; charset=UTF-8" />
+        <meta name="description" content="" />
+        <meta name="viewport" content="width=device-width" />
+        <link rel="stylesheet" type="text/css" href="{root}static/oscar/css/styles.css" />
+        <script src="{root}static/oscar/js/bootstrap3/bootstrap.min.js" type="text/javascript" charset="utf-8"></script>
+    </head>
+    <body id="default" class="default">
+        <header class="header container-fluid">
+            <div class="page_inner"><div class="row">
+                <div class="col-sm-8 h1"><a href="{root}index.html">Books to Scrape</a><small> We love being scraped!</small></div>
+            </div></div>
+        </header>
+        <div class="container-fluid page"><div class="page_inner">
+"""
+
+FOOT = """
+        </div></div>
+        <footer class="footer container-fluid"></footer>
+        <script type="text/javascript">$(function() {{ oscar.init(); }});</script>
+    </body>
+</html>
+"""
+
+CARD = """
+        <li class="col-xs-6 col-sm-4 col-md-3 col-lg-3">
+    <article class="product_pod">
+            <div class="image_container">
+                    <a href="{href}"><img src="../media/cache/{i:02x}/thumb.jpg" alt="{title}" class="thumbnail"></a>
+            </div>
+                <p class="star-rating {rating}">
+                    <i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i>
+                    <i class="icon-star"></i><i class="icon-star"></i>
+                </p>
+            <h3><a href="{href}" title="{title}">{short_title}</a></h3>
+            <div class="product_price">
+        <p class="price_color">£{price}</p>
+<p class="instock availability">
+    <i class="icon-ok"></i>
+        In stock
+</p>
+    <form><button type="submit" class="btn btn-primary btn-block" data-loading-text="Adding...">Add to basket</button></form>
+            </div>
+    </article>
+</li>
+"""
+
+
+def book(i, seed=0):
+    """Deterministic attributes of book number `i` (1-based)."""
+    rnd = random.Random(seed * 1_000_003 + i)
+    title = f"Book {i}: " + " ".join(rnd.choice(["The", "Light", "Attic", "Velvet", "Night", "Sharp", "Objects",
+                                                  "Requiem", "Red", "Olio", "Tipping", "Soumission"])
+                                     for _ in range(rnd.randint(2, 6)))
+    return {
+        "i": i,
+        "title": title,
+        "slug": f"book-{i}_{i}",
+        "price": f"{rnd.uniform(10, 60):.2f}",
+        "rating": rnd.choice(RATINGS),
+        "stock": rnd.randint(0, 22),
+        "category": CATEGORIES[i % len(CATEGORIES)],
+    }
+
+
+def render_listing_page(page, total_books, seed=0):
+    """HTML of catalogue/page-{page}.html (page 1 is also served as index.html)."""
+    first = (page - 1) * PER_PAGE + 1
+    return _listing_html(range(first, min(first + PER_PAGE, total_books + 1)), page, total_books, seed,
+                         title="All products")
+
+
+def category_books(category_number, total_books):
+    """Book numbers in category/books/<slug>_{category_number} (numbered from 2 like the sidebar)."""
+    return range(category_number - 2 or len(CATEGORIES), total_books + 1, len(CATEGORIES))
+
+
+def render_category_page(category_number, page, total_books, seed=0):
+    """HTML of catalogue/category/books/<slug>_{category_number}/index.html (or page-{page}.html)."""
+    books = category_books(category_number, total_books)
+    first = (page - 1) * PER_PAGE
+    return _listing_html(books[first:first + PER_PAGE], page, len(books), seed,
+                         title=CATEGORIES[(category_number - 2) % len(CATEGORIES)])
+
+
+def _listing_html(numbers, page, total_books, seed, title):
+    pages = max(1, -(-total_books // PER_PAGE))
+    cards = []
+    for i in numbers:
+        b = book(i, seed)
+        short = b["title"] if len(b["title"]) < 40 else b["title"][:37] + "..."
+        cards.append(CARD.format(i=i % 256, href=f"{b['slug']}/index.html", title=b["title"],
+                                 short_title=short, rating=b["rating"], price=b["price"]))
+    sidebar = "".join(
+        f'<li><a href="category/books/{c.lower().replace(" ", "-")}_{n}/index.html">{c}</a></li>\n'
+        for n, c in enumerate(CATEGORIES, start=2)
+    )
+    pager = f'<li class="current">Page {page} of {pages}</li>'
+    if page > 1:
+        pager = f'<li class="previous"><a href="page-{page - 1}.html">previous</a></li>' + pager
+    if page < pages:
+        pager += f'<li class="next"><a href="page-{page + 1}.html">next</a></li>'
+    return (
+        HEAD.format(title=title, root="../")
+        + '<div class="row"><aside class="sidebar col-sm-4 col-md-3"><div class="side_categories"><ul class="nav nav-list">'
+        + sidebar
+        + f'</ul></div></aside><div class="col-sm-8 col-md-9"><div class="page-header action"><h1>{title}</h1></div>'
+        + f'<form class="form-horizontal"><strong>{total_books}</strong> results.</form>'
+        + '<section><div><ol class="row">' + "".join(cards) + "</ol>"
+        + f'<div><ul class="pager">{pager}</ul></div></div></section></div></div>'
+        + FOOT
+    )
+
+
+def render_product_page(i, seed=0):
+    """HTML of catalogue/{slug}/index.html for book `i`."""
+    b = book(i, seed)
+    category_slug = b["category"].lower().replace(" ", "-")
+    description = " ".join(["Lorem ipsum dolor sit amet, consectetur adipiscing elit."] * 12)
+    table = "".join(
+        f"<tr><th>{k}</th><td>{v}</td></tr>"
+        for k, v in [("UPC", f"{i:016x}"), ("Product Type", "Books"), ("Price (excl. tax)", f"£{b['price']}"),
+                     ("Price (incl. tax)", f"£{b['price']}"), ("Tax", "£0.00"),
+                     ("Availability", f"In stock ({b['stock']} available)"), ("Number of reviews", "0")]
+    )
+    return (
+        HEAD.format(title=b["title"], root="../../")
+        + f"""
+<ul class="breadcrumb">
+    <li><a href="../../index.html">Home</a></li>
+    <li><a href="../category/books_1/index.html">Books</a></li>
+    <li><a href="../category/books/{category_slug}_{i % 50 + 2}/index.html">{b['category']}</a></li>
+    <li class="active">{b['title']}</li>
+</ul>
+<div id="messages"></div>
+<div class="content"><div id="promotions"></div><div id="content_inner">
+<article class="product_page">
+  <div class="row">
+    <div class="col-sm-6"><div id="product_gallery" class="carousel"><div class="thumbnail">
+        <div class="carousel-inner"><div class="item active"><img src="../../media/cache/{i % 256:02x}/full.jpg" alt="{b['title']}" /></div></div>
+    </div></div></div>
+    <div class="col-sm-6 product_main">
+        <h1>{b['title']}</h1>
+        <p class="price_color">£{b['price']}</p>
+<p class="instock availability">
+    <i class="icon-ok"></i>
+        In stock ({b['stock']} available)
+</p>
+        <p class="star-rating {b['rating']}">
+            <i class="icon-star"></i><i class="icon-star"></i><i class="icon-star"></i>
+            <i class="icon-star"></i><i class="icon-star"></i>
+        </p>
+        <hr/>
+        <div class="alert alert-warning" role="alert"><strong>Warning!</strong> This is a demo website for web scraping purposes. Prices and ratings here were randomly assigned and have no real meaning.</div>
+    </div>
+  </div>
+  <div id="product_description" class="sub-header"><h2>Product Description</h2></div>
+  <p>{description} ...more</p>
+  <div class="sub-header"><h2>Product Information</h2></div>
+  <table class="table table-striped">{table}</table>
+  <div id="reviews" class="reviews"></div>
+</article>
+</div></div>"""
+        + FOOT
+    )
+
+
+def book_index(slug):
+    """Book number from a product slug such as 'book-12_12'."""
+    return int(slug.rsplit("_", 1)[1])
@@ -0,0 +1,155 @@
+"""
+Local stand-in for books.toscrape.com serving the pages of benchmarks/fixtures.py.
+
+Routes (like the live site, links are relative so any prefix works):
+    /, /index.html, .../page-N.html                   catalogue listing pages
+    .../category/books/<slug>_N/index.html|page-M.html  category listing pages
+    .../book-<i>_<i>/index.html                         product pages
+Every response carries an ETag and honours If-None-Match (304), and each
+request can be delayed by a fixed latency plus random jitter.
+
+Use it from code:
+    with FixtureServer(total_books=1000, latency=0.02) as server:
+        rows = list(scraper(max_pages=3, base_url=server.base_url))
+
+or run it standalone and point the pipeline at it:
+    python -m benchmarks.server --books 1000 --latency 0.05 --port 8765
+    python -m src.pipeline --base-url http://127.0.0.1:8765/ --max-pages 5
+"""
+import argparse
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import (
+    PER_PAGE, book_index, render_category_page, render_listing_page, render_product_page,
+)
+
+PRODUCT_RE = re.compile(r"(book-\d+_\d+)/index\.html$")
+CATEGORY_RE = re.compile(r"category/books/[^/]+_(\d+)/(?:index|page-(\d+))\.html$")
+LISTING_RE = re.compile(r"page-(\d+)\.html$")
+
+
+class FixtureServer:
+    """Threaded HTTP server with generated catalogue/product pages (context manager)."""
+
+    def __init__(self, total_books=1000, latency=0.0, jitter=0.0, seed=0, host="127.0.0.1", port=0):
+        self.total_books = total_books
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total_books // PER_PAGE))
+
+    def render(self, path: str):
+        """HTML for a request path, or None for a 404."""
+        match = PRODUCT_RE.search(path)
+        if match:
+            i = book_index(match.group(1))
+            return render_product_page(i, self.seed) if 1 <= i <= self.total_books else None
+        match = CATEGORY_RE.search(path)
+        if match:
+            return render_category_page(int(match.group(1)), int(match.group(2) or 1), self.total_books, self.seed)
+        match = LISTING_RE.search(path)
+        if match:
+            page = int(match.group(1))
+            return render_listing_page(page, self.total_books, self.seed) if 1 <= page <= self.pages else None
+        if path in ("/", "/index.html"):
+            return render_listing_page(1, self.total_books, self.seed)
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+
+                html = server.render(self.path.split("?", 1)[0])
+                if html is None:
+                    self._reply(404, b"Not found")
+                    return
+                body = html.encode("utf-8")
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304, b"", etag)
+                    return
+                self._reply(200, body, etag)
+
+            def _reply(self, status, body, etag=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # client gave up (cancelled request)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FixtureServer(args.books, args.latency, args.jitter, args.seed, port=args.port).start()
+    print(f"Serving {args.books} books ({server.pages} pages) at {server.base_url} - Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,17 @@
-import sqlite3
+from sqlalchemy import inspect
 
-conn = sqlite3.connect('data/books.db')
-cursor = conn.cursor()
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-tables = [row[0] for row in cursor.fetchall()]
+from src.db.connector import engine
+from src.db.queries import iter_books
+
+tables = inspect(engine).get_table_names()
 print(f"Tables in database: {tables}")
 
 if 'books' in tables:
-    cursor.execute("SELECT * FROM books")
-    rows = cursor.fetchall()
-    print(f"\nBooks table has {len(rows)} row(s):")
-    for row in rows:
-        print(row)
-
-conn.close()
+    # Streamed in chunks (src/db/queries.py) instead of fetching the whole table at once
+    count = 0
+    print("\nBooks table:")
+    for chunk in iter_books(order="id"):
+        for book in chunk:
+            print(tuple(book.values()))
+        count += len(chunk)
+    print(f"\nBooks table has {count} row(s)")
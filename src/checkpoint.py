@@ -0,0 +1,136 @@
+"""
+Durable checkpoints for resumable streaming runs (--resume).
+
+The checkpoint is a small JSON file (CHECKPOINT_PATH) rewritten atomically
+after every committed micro-batch:
+
+    listing_url   first listing page whose books are not all committed yet
+    pages_done    listing pages completed before it
+    done          product URLs of that page already committed
+    pending       product URLs of that page still to do
+    batches       IDs of the committed batches
+
+A resumed run starts the scraper at `listing_url`, skips the `done` product
+URLs, and numbers its batches after the last committed one, so completed
+pages are neither fetched nor inserted again. The file is removed when a
+run finishes.
+
+A batch is committed to the database before the checkpoint is written, so a
+crash between the two re-inserts at most that one batch into raw_books (the
+upsert into books is idempotent).
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.config import CHECKPOINT_PATH, ensure_dir
+
+logger = logging.getLogger(__name__)
+
+
+class _Page:
+    """A listing page seen in this run and the product URLs the scraper yielded from it."""
+
+    def __init__(self, url: str, next_url: Optional[str], products: List[str]):
+        self.url = url
+        self.next_url = next_url
+        self.products = products
+        self.yielded: List[str] = []
+        self.closed = False  # the scraper has moved past this page
+
+
+class Checkpoint:
+    """Progress of one resumable run, persisted to `path` on every commit."""
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = Path(path)
+        self.state: Optional[dict] = None
+        if self.path.exists():
+            self.state = json.loads(self.path.read_text(encoding="utf-8"))
+        self._pages: List[_Page] = []
+        self._committed: Set[str] = set()
+        self.resumed = False
+
+    def start(self, base_url: str, start_url: str, max_pages: int) -> Tuple[str, int, Set[str]]:
+        """
+        Begin a run, continuing the saved one when it is for the same site.
+
+        Returns:
+            (listing URL to start from, listing pages left, product URLs to skip)
+        """
+        state = self.state
+        if state is not None and state.get("base_url") != base_url:
+            logger.warning(f"Ignoring checkpoint {self.path} for another site ({state.get('base_url')})")
+            state = None
+        if state is None:
+            self.state = {
+                "base_url": base_url, "listing_url": start_url, "pages_done": 0,
+                "done": [], "pending": [], "batches": [], "started_at": datetime.now().isoformat(),
+            }
+            return start_url, max_pages, set()
+
+        self.resumed = True
+        self._committed = set(state["done"])
+        logger.info(f"Resuming at {state['listing_url']} after {state['pages_done']} pages and "
+                    f"{len(state['batches'])} batches ({len(state['done'])} books of that page done)")
+        return state["listing_url"], max_pages - state["pages_done"], set(state["done"])
+
+    def on_page(self, page_url: str, next_url: Optional[str], product_urls: List[str]) -> None:
+        """Scraper callback: a listing page was read; every earlier page is fully yielded."""
+        for page in self._pages:
+            page.closed = True
+        self._pages.append(_Page(page_url, next_url, list(product_urls)))
+
+    def track(self, rows: Iterable[dict]) -> Iterator[dict]:
+        """Pass scraped rows through, attributing each one to the listing page it came from."""
+        for row in rows:
+            if self._pages and row.get("product_page_url"):
+                self._pages[-1].yielded.append(row["product_page_url"])
+            yield row
+        for page in self._pages:
+            page.closed = True
+
+    def position(self) -> dict:
+        """Where the run stands: resumed or not, next listing page, pages done, batches committed."""
+        return {"resumed": self.resumed, "listing_url": self.state["listing_url"],
+                "pages_done": self.state["pages_done"], "batches": len(self.state["batches"])}
+
+    @property
+    def next_batch_id(self) -> int:
+        batches = self.state["batches"]
+        return batches[-1] + 1 if batches else 1
+
+    def commit(self, urls: Iterable[str]) -> int:
+        """Record a committed batch (its product URLs), save the checkpoint and return the batch ID."""
+        batch_id = self.next_batch_id
+        self.state["batches"].append(batch_id)
+        self._committed.update(urls)
+
+        # Batches commit in scrape order, so completed pages are always at the front
+        while self._pages and self._pages[0].closed and self._committed.issuperset(self._pages[0].yielded):
+            page = self._pages.pop(0)
+            self._committed.difference_update(page.products)
+            self.state["listing_url"] = page.next_url
+            self.state["pages_done"] += 1
+
+        current = self._pages[0] if self._pages else None
+        self.state["done"] = sorted(self._committed)
+        self.state["pending"] = [u for u in current.products if u not in self._committed] if current else []
+        self.save()
+        return batch_id
+
+    def save(self) -> None:
+        """Write the state atomically (temp file + rename)."""
+        self.state["updated_at"] = datetime.now().isoformat()
+        tmp = ensure_dir(self.path.parent) / (self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def finish(self) -> None:
+        """The run completed: drop the checkpoint so the next --resume starts from the beginning."""
+        if self.path.exists():
+            self.path.unlink()
+        self.state = None
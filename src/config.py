@@ -6,15 +6,24 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = PROJECT_ROOT / "data"
 REPORTS_DIR = PROJECT_ROOT / "reports"
 
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
+def ensure_dir(path) -> Path:
+    """Create `path` (and its parents) if missing; called by whatever writes
+    under DATA_DIR / REPORTS_DIR, so importing config has no side effects."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
 
 """Database configuration.
 Uses SQLite locally unless DB_HOST is set (Postgres).
+An explicit DATABASE_URL overrides both (benchmarks, tests).
 """
 
 # If DB_HOST is provided (in Docker), use Postgres; otherwise SQLite for local dev
-if os.getenv("DB_HOST"):
+if os.getenv("DATABASE_URL"):
+    DATABASE_URL = os.environ["DATABASE_URL"]
+elif os.getenv("DB_HOST"):
     DB_HOST = os.getenv("DB_HOST", "db")
     DB_PORT = int(os.getenv("DB_PORT", "5432"))
     DB_NAME = os.getenv("DB_NAME", "books")
@@ -24,8 +33,104 @@ if os.getenv("DB_HOST"):
 else:
     DATABASE_URL = f"sqlite:///{DATA_DIR / 'books.db'}"
 
+# Engine profile used by src.db.connector.make_engine():
+#   "tuned"   - SQLite: WAL, synchronous=NORMAL, mmap; Postgres: sized pool,
+#               pre-ping, statement timeout, prepared statements
+#   "default" - plain create_engine() settings
+DB_PROFILE = os.getenv("DB_PROFILE", "tuned")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "300000"))
+# psycopg prepares a statement server-side after it has run this many times
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Rows fetched per round-trip by stream_query() (server-side cursor on Postgres)
+DB_STREAM_CHUNK_SIZE = int(os.getenv("DB_STREAM_CHUNK_SIZE", "10000"))
+
+# Rows per executemany / COPY batch in insert_raw_books
+RAW_INSERT_CHUNK_SIZE = int(os.getenv("RAW_INSERT_CHUNK_SIZE", "5000"))
+# Rows per INSERT ... ON CONFLICT statement in bulk_upsert_books
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", "1000"))
+# In-process url -> (id, content_hash) index of books (src/db/book_index.py), warmed once per
+# run so change detection and upserts don't query books; least recently used urls beyond
+# this many are evicted and looked up again when needed. 0 turns the index off.
+BOOK_INDEX_MAX_ENTRIES = int(os.getenv("BOOK_INDEX_MAX_ENTRIES", "2000000"))
+# raw_books compaction (src/db/compaction.py): observations that ended more than this many
+# days ago are deleted, except the latest one per URL (0 keeps everything)
+RAW_BOOKS_RETENTION_DAYS = int(os.getenv("RAW_BOOKS_RETENTION_DAYS", "0"))
+# URLs per compaction batch (one transaction each)
+RAW_COMPACTION_BATCH_SIZE = int(os.getenv("RAW_COMPACTION_BATCH_SIZE", "1000"))
+# Monthly raw_books partitions kept created ahead of time on PostgreSQL
+RAW_BOOKS_PARTITIONS_AHEAD = int(os.getenv("RAW_BOOKS_PARTITIONS_AHEAD", "2"))
+# Read API (src/db/queries.py): rows per page (capped at QUERY_MAX_PAGE_SIZE), and a TTL
+# cache of page / top-N results, dropped whenever a transaction writing books commits
+# (QUERY_CACHE_TTL=0 turns it off)
+QUERY_PAGE_SIZE = int(os.getenv("QUERY_PAGE_SIZE", "100"))
+QUERY_MAX_PAGE_SIZE = int(os.getenv("QUERY_MAX_PAGE_SIZE", "1000"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "30"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+# Rows per micro-batch (one transaction each) in run_pipeline(stream=True)
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "200"))
+
+# Anomaly stage (src/processing/anomaly.py, --anomalies)
+ANOMALY_CHUNK_SIZE = int(os.getenv("ANOMALY_CHUNK_SIZE", "50000"))
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "4.0"))
+# Flag a price that moved by more than this fraction since the previous observation
+ANOMALY_PRICE_JUMP = float(os.getenv("ANOMALY_PRICE_JUMP", "0.5"))
+# Categories smaller than this are scored against the global price stats
+ANOMALY_MIN_CATEGORY_SIZE = int(os.getenv("ANOMALY_MIN_CATEGORY_SIZE", "30"))
+
 BASE_URL = "https://books.toscrape.com"
 
+# Scraper tuning: detail pages fetched in parallel per listing page
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "4"))
+# Scrape engine: "threads" (scraper(), requests + thread pool) or "async"
+# (src/scrape/async_scraper.py, httpx with HTTP/2 when h2 is installed), and the
+# async engine's cap on requests in flight (still subject to the rate limit below)
+SCRAPE_ENGINE = os.getenv("SCRAPE_ENGINE", "threads")
+SCRAPE_IN_FLIGHT = int(os.getenv("SCRAPE_IN_FLIGHT", "100"))
+# Adaptive per-host rate limit (src/scrape/ratelimit.py): starts at RATE_LIMIT_RPS
+# requests/s, grows by RATE_LIMIT_STEP per fast success up to RATE_LIMIT_MAX_RPS and
+# halves on 429/5xx/errors or responses slower than RATE_LIMIT_TARGET_LATENCY seconds.
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "4"))
+RATE_LIMIT_MAX_RPS = float(os.getenv("RATE_LIMIT_MAX_RPS", "16"))
+RATE_LIMIT_MIN_RPS = float(os.getenv("RATE_LIMIT_MIN_RPS", "0.5"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "2"))
+RATE_LIMIT_STEP = float(os.getenv("RATE_LIMIT_STEP", "0.25"))
+RATE_LIMIT_TARGET_LATENCY = float(os.getenv("RATE_LIMIT_TARGET_LATENCY", "2.0"))
+# Sharded crawl (--workers): listing pages per shard, and a hard cap on worker
+# processes so the combined request rate stays under
+# SCRAPE_MAX_WORKERS * RATE_LIMIT_MAX_RPS requests per second per host.
+# A shard that raises is crawled again up to SHARD_RETRIES times before the
+# crawl fails.
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "1"))
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", "8"))
+SHARD_PAGES = int(os.getenv("SHARD_PAGES", "5"))
+SHARD_RETRIES = int(os.getenv("SHARD_RETRIES", "1"))
+# BeautifulSoup backend: "auto" (lxml if installed, else html.parser), "lxml" or "html.parser"
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+# Process pool for the CPU-bound stages (--parse-workers, src/processing/parallel.py):
+# product pages are parsed and large batches cleaned in PARSE_WORKERS processes
+# (0: in the main process, -1: one per available core) while fetching stays in
+# the main process, with up to PARSE_AHEAD_PAGES listing pages parsed ahead per
+# worker. Batches smaller than PARALLEL_CLEAN_MIN_ROWS are cleaned in place.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+PARSE_AHEAD_PAGES = int(os.getenv("PARSE_AHEAD_PAGES", "2"))
+PARALLEL_CLEAN_MIN_ROWS = int(os.getenv("PARALLEL_CLEAN_MIN_ROWS", "20000"))
+# ETag / Last-Modified / body-hash index used by incremental scraping
+HTTP_INDEX_PATH = DATA_DIR / "http_index.db"
+# Progress of a resumable run (--resume), rewritten after every committed batch
+CHECKPOINT_PATH = Path(os.getenv("CHECKPOINT_PATH", str(DATA_DIR / "checkpoint.json")))
+# Columnar export (src/export.py, --export): partitioned "parquet" or Arrow "ipc" datasets per table
+EXPORT_DIR = Path(os.getenv("EXPORT_DIR", str(DATA_DIR / "export")))
+EXPORT_FORMATS = ("parquet", "ipc")
+EXPORT_FORMAT = os.getenv("EXPORT_FORMAT", "parquet")
+# On-disk response cache in front of fetch() (--cache)
+HTTP_CACHE_PATH = DATA_DIR / "http_cache.db"
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(24 * 3600)))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
 USER_AGENT = (
     "MiniDataPipelineBot/0.1 "
     "(+https://github.com/<lakiiibalint>/mini-data-pipeline)"
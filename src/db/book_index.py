@@ -0,0 +1,198 @@
+"""
+In-process index of the books table: product_page_url -> (id, content_hash).
+
+BookIndex.warm() loads it with one streaming SELECT when a run starts.
+After that, change detection (hashes()), bulk_upsert_books() and
+record_snapshots() (ids()) answer from memory instead of querying books
+for every batch.
+
+Entries written by a batch are staged with put() and applied by commit()
+once the batch's transaction is committed, so a rolled-back batch never
+leaves books in the index that are not in the table. Lookups see staged
+entries too: they are visible to the transaction that wrote them.
+
+Memory: one dict maps each interned url to a slot; ids and hashes live in
+array('q') / array('Q') at that slot (content_hash is a 64-bit blake2b
+digest in hex) next to a reference bit, so an entry costs a dict slot, a
+list slot and 17 bytes on top of the url string, with no ORM objects or
+tuples.
+
+Eviction: beyond max_entries an url not used recently is dropped (CLOCK:
+a hand sweeps the slots and evicts the first one whose reference bit is
+clear, clearing the bits it passes). An url the index does not know is
+then no longer known to be new, so lookups
+fall back to one SELECT (per UPSERT_CHUNK_SIZE unknown urls) and add the
+results back. As long as nothing was evicted, an unknown url is a new book
+and no query runs at all.
+
+The index assumes it is the only writer of books during a run: a book
+inserted by another process meanwhile is still upserted correctly, but
+counted as new.
+"""
+import logging
+import sys
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from src.config import BOOK_INDEX_MAX_ENTRIES, DB_STREAM_CHUNK_SIZE, UPSERT_CHUNK_SIZE
+from src.db.connector import chunked, session_scope, stream_query
+from src.db.models import Book
+
+logger = logging.getLogger(__name__)
+
+# Stored for books written before content hashes were kept: never equal to a real hash
+_NO_HASH = 0
+
+
+def _pack(digest: Optional[str]) -> int:
+    return _NO_HASH if digest is None else int(digest, 16)
+
+
+def _unpack(value: int) -> Optional[str]:
+    return None if value == _NO_HASH else f"{value:016x}"
+
+
+class BookIndex:
+    """Bounded url -> (book id, content_hash) map of the books table, CLOCK-evicted."""
+
+    def __init__(self, max_entries: int = BOOK_INDEX_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self._slots: Dict[str, int] = {}
+        self._urls: List[str] = []  # slot -> url
+        self._ids = array("q")
+        self._hashes = array("Q")
+        self._referenced = bytearray()
+        self._hand = 0
+        self._pending: Dict[str, Tuple[int, Optional[str]]] = {}
+        # Every book in the table has an entry: unknown urls are new books
+        self.complete = True
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.warm_seconds = 0.0
+
+    @classmethod
+    def warm(cls, max_entries: int = BOOK_INDEX_MAX_ENTRIES, session=None,
+             chunk_size: int = DB_STREAM_CHUNK_SIZE) -> "BookIndex":
+        """Index built from one streaming SELECT over books (at most `max_entries` of them)."""
+        index = cls(max_entries)
+        started = time.perf_counter()
+        statement = select(Book.product_page_url, Book.id, Book.content_hash).limit(max_entries + 1)
+        for chunk in stream_query(statement, chunk_size, session=session):
+            for url, book_id, digest in chunk:
+                index._set(url, book_id, digest)
+        index.warm_seconds = time.perf_counter() - started
+        logger.info(f"Book index warmed with {len(index)} books in {index.warm_seconds:.2f}s"
+                    + ("" if index.complete else " (table larger than BOOK_INDEX_MAX_ENTRIES)"))
+        return index
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _evict(self) -> int:
+        """Free the first slot from the hand on that was not used since the hand last passed it."""
+        while self._referenced[self._hand]:
+            self._referenced[self._hand] = 0
+            self._hand = (self._hand + 1) % len(self._urls)
+        slot = self._hand
+        self._hand = (self._hand + 1) % len(self._urls)
+        del self._slots[self._urls[slot]]
+        self.evictions += 1
+        self.complete = False
+        return slot
+
+    def _set(self, url: str, book_id: int, digest: Optional[str]) -> None:
+        slot = self._slots.get(url)
+        if slot is None:
+            url = sys.intern(url)
+            if len(self._urls) < self.max_entries:
+                slot = len(self._urls)
+                self._urls.append(url)
+                self._ids.append(0)
+                self._hashes.append(_NO_HASH)
+                self._referenced.append(0)
+            else:
+                slot = self._evict()
+                self._urls[slot] = url
+                self._referenced[slot] = 0
+            self._slots[url] = slot
+        self._ids[slot] = book_id
+        self._hashes[slot] = _pack(digest)
+
+    def _get(self, url: str) -> Optional[Tuple[int, Optional[str]]]:
+        if url in self._pending:
+            return self._pending[url]
+        slot = self._slots.get(url)
+        if slot is None:
+            return None
+        self._referenced[slot] = 1
+        return self._ids[slot], _unpack(self._hashes[slot])
+
+    def lookup(self, urls: Iterable[str], session=None) -> Dict[str, Tuple[int, Optional[str]]]:
+        """
+        (id, content_hash) of the given urls that are in books.
+
+        Unknown urls are only looked up in the database once entries have
+        been evicted; what that finds is added to the index.
+        """
+        found = {}
+        unknown = []
+        for url in dict.fromkeys(urls):
+            entry = self._get(url)
+            if entry is None:
+                unknown.append(url)
+            else:
+                found[url] = entry
+        self.hits += len(found)
+        self.misses += len(unknown)
+        if unknown and not self.complete:
+            with session_scope(session) as s:
+                conn = s.connection()
+                for batch in chunked(unknown, UPSERT_CHUNK_SIZE):
+                    query = select(Book.product_page_url, Book.id, Book.content_hash)
+                    for url, book_id, digest in conn.execute(query.where(Book.product_page_url.in_(batch))):
+                        self._set(url, book_id, digest)
+                        found[url] = (book_id, digest)
+        return found
+
+    def hashes(self, urls: Iterable[str], session=None) -> Dict[str, Optional[str]]:
+        """Stored content_hash per url already in books, like existing_hashes()."""
+        return {url: digest for url, (_, digest) in self.lookup(urls, session).items()}
+
+    def ids(self, urls: Iterable[str], session=None) -> Dict[str, int]:
+        """Book id per url already in books."""
+        return {url: book_id for url, (book_id, _) in self.lookup(urls, session).items()}
+
+    def put(self, url: str, book_id: int, digest: Optional[str]) -> None:
+        """Stage a written book; it is kept by commit() and dropped by rollback()."""
+        self._pending[url] = (book_id, digest)
+
+    def commit(self) -> None:
+        """Apply the staged books (call once their transaction is committed)."""
+        for url, (book_id, digest) in self._pending.items():
+            self._set(url, book_id, digest)
+        self._pending.clear()
+
+    def rollback(self) -> None:
+        """Drop the staged books (their transaction was rolled back)."""
+        self._pending.clear()
+
+    @contextmanager
+    def staged(self):
+        """commit() the books put() inside the block, or rollback() if it raises."""
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    def stats(self) -> Dict:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "complete": self.complete, "warm_seconds": round(self.warm_seconds, 3)}
@@ -0,0 +1,365 @@
+"""
+Compaction, retention and partitioning of the append-only raw_books table.
+
+Every run appends a raw_books row per new or changed book (and rows that fail
+cleaning on every run), so after months of daily runs the table is mostly
+repeats. compact_raw_books() shrinks it in bounded batches, one transaction
+each:
+
+    compaction  RAW_COMPACTION_BATCH_SIZE URLs at a time (keyset over the
+                product_page_url index): consecutive identical observations
+                of a URL (title, price, rating, availability and category)
+                collapse into the first one, which becomes valid from its
+                timestamp to `valid_to` and counts its `observations`
+    retention   RAW_COMPACTION_BATCH_SIZE rows at a time (id range up to the
+                last row older than the cutoff, found with the timestamp
+                index): observations that ended more than
+                RAW_BOOKS_RETENTION_DAYS ago are deleted, unless they are
+                the latest of their URL
+
+Kept rows keep their id, so the newest row per URL (rebuild_books()) is the
+same as before. Price history lives in book_snapshots, which compaction does
+not touch.
+
+Storage:
+
+    PostgreSQL  partition_raw_books() turns raw_books (once) into monthly
+                range partitions on timestamp plus a DEFAULT partition.
+                Each compaction creates RAW_BOOKS_PARTITIONS_AHEAD months
+                ahead and drops expired partitions that retention emptied,
+                which frees their space at once rather than after VACUUM.
+    SQLite      has no partitions: partition_raw_books() switches the file
+                to incremental auto-vacuum (one full VACUUM), after which
+                each compaction hands freed pages back to the filesystem
+                with PRAGMA incremental_vacuum.
+
+bytes_reclaimed in the report is the drop in bytes used: pages of the
+database file not on its freelist on SQLite, raw_books with its partitions
+and indexes on PostgreSQL. PostgreSQL only reuses the space of deleted rows
+after VACUUM (vacuum=True / --vacuum), so there the figure counts dropped
+partitions and pages VACUUM truncates, and is a lower bound.
+
+Run:
+    python -m src.db.compaction --retention-days 365
+    python -m src.db.compaction --partition   # once: partitions (PostgreSQL) / incremental vacuum (SQLite)
+"""
+import argparse
+import logging
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, bindparam, delete, exists, func, or_, select, text, update
+from sqlalchemy.orm import aliased
+
+from src.config import RAW_BOOKS_PARTITIONS_AHEAD, RAW_BOOKS_RETENTION_DAYS, RAW_COMPACTION_BATCH_SIZE
+from src.db.connector import chunked, get_engine, session_scope
+from src.db.models import RawBook
+
+logger = logging.getLogger(__name__)
+
+TABLE = RawBook.__tablename__
+# Columns two observations must share to be merged
+OBSERVED_COLUMNS = ("title", "price_raw", "rating_raw", "availability_raw", "category")
+# Monthly partitions are named raw_books_pYYYY_MM
+PARTITION_RE = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+# Statement-size cap for the id lists of UPDATE / DELETE
+ID_CHUNK_SIZE = 1000
+
+
+def _month(day: date, offset: int = 0) -> date:
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _is_partitioned(conn) -> bool:
+    return conn.dialect.name == "postgresql" and conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": TABLE}
+    ).first() is not None
+
+
+def used_bytes(conn) -> int:
+    """Bytes held by raw_books (PostgreSQL: with partitions and indexes) or the SQLite file's used pages."""
+    if conn.dialect.name == "postgresql":
+        return conn.execute(
+            text("SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(:table)"),
+            {"table": TABLE},
+        ).scalar()
+    page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+    pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+    free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return (pages - free) * page_size
+
+
+def compact_urls(conn, after: Optional[str], batch_size: int) -> Dict:
+    """
+    Merge runs of identical observations for the next `batch_size` URLs after `after`.
+
+    Returns:
+        {"last_url": last URL of the batch (None when none were left),
+         "scanned": rows read, "merged": rows deleted, "ranges": rows extended}
+    """
+    url_query = select(RawBook.product_page_url).where(RawBook.product_page_url.is_not(None))
+    if after is not None:
+        url_query = url_query.where(RawBook.product_page_url > after)
+    urls = conn.execute(url_query.group_by(RawBook.product_page_url)
+                        .order_by(RawBook.product_page_url).limit(batch_size)).scalars().all()
+    if not urls:
+        return {"last_url": None, "scanned": 0, "merged": 0, "ranges": 0}
+
+    columns = [RawBook.product_page_url, RawBook.id, RawBook.timestamp, RawBook.valid_to, RawBook.observations]
+    columns += [getattr(RawBook, name) for name in OBSERVED_COLUMNS]
+    url_range = RawBook.product_page_url <= urls[-1]
+    if after is not None:
+        url_range = and_(RawBook.product_page_url > after, url_range)
+    rows = conn.execute(select(*columns).where(url_range).order_by(RawBook.product_page_url, RawBook.id))
+
+    scanned = 0
+    merged: List[int] = []
+    ranges: Dict[int, Dict] = {}
+    for _, observations in groupby(rows, key=lambda row: row[0]):
+        first = None
+        for _, row_id, started, valid_to, count, *observed in observations:
+            scanned += 1
+            if first is not None and observed == first["observed"]:
+                first["valid_to"] = max(first["valid_to"], valid_to or started)
+                first["observations"] += count or 1
+                ranges[first["b_id"]] = first
+                merged.append(row_id)
+            else:
+                first = {"b_id": row_id, "b_timestamp": started, "valid_to": valid_to or started,
+                         "observations": count or 1, "observed": observed}
+
+    if ranges:
+        stmt = (update(RawBook.__table__).where(RawBook.id == bindparam("b_id"))
+                .values(valid_to=bindparam("valid_to"), observations=bindparam("observations")))
+        if conn.dialect.name == "postgresql":
+            # Lets PostgreSQL prune partitions (SQLite stores timestamps as text in another format)
+            stmt = stmt.where(RawBook.timestamp == bindparam("b_timestamp"))
+        for chunk in chunked(ranges.values(), ID_CHUNK_SIZE):
+            conn.execute(stmt, [{key: r[key] for key in ("b_id", "b_timestamp", "valid_to", "observations")}
+                                for r in chunk])
+    for chunk in chunked(merged, ID_CHUNK_SIZE):
+        conn.execute(delete(RawBook.__table__).where(RawBook.id.in_(chunk)))
+    return {"last_url": urls[-1], "scanned": scanned, "merged": len(merged), "ranges": len(ranges)}
+
+
+def expire_rows(conn, cutoff: datetime, after: int, until: int, batch_size: int) -> Dict:
+    """
+    Delete up to `batch_size` observations with after < id <= until that
+    ended before `cutoff` and have a newer row for their URL.
+
+    Returns:
+        {"last_id": id to continue after (None when done), "expired": rows deleted}
+    """
+    newer = aliased(RawBook)
+    ids = conn.execute(
+        select(RawBook.id)
+        .where(RawBook.id > after, RawBook.id <= until, RawBook.timestamp < cutoff)
+        .where(or_(RawBook.valid_to.is_(None), RawBook.valid_to < cutoff))
+        .where(exists().where(newer.product_page_url == RawBook.product_page_url, newer.id > RawBook.id))
+        .order_by(RawBook.id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return {"last_id": None, "expired": 0}
+    conn.execute(delete(RawBook.__table__).where(RawBook.id.in_(ids)))
+    return {"last_id": ids[-1], "expired": len(ids)}
+
+
+def ensure_partitions(conn, months_ahead: int = RAW_BOOKS_PARTITIONS_AHEAD, start: Optional[date] = None) -> int:
+    """
+    Create the monthly partitions from `start` (default: this month) to `months_ahead` months ahead.
+
+    Rows of a new month already in the DEFAULT partition are moved into it.
+    Returns the number of partitions created.
+    """
+    today = datetime.now(timezone.utc).date()
+    month = _month(start or today)
+    created = 0
+    while month <= _month(today, months_ahead):
+        name = f"{TABLE}_p{month:%Y_%m}"
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is None:
+            bounds = {"lower": month.isoformat() + " 00:00:00+00", "upper": _month(month, 1).isoformat() + " 00:00:00+00"}
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+            conn.execute(text(
+                f'WITH moved AS (DELETE FROM {TABLE}_default WHERE "timestamp" >= CAST(:lower AS timestamptz)'
+                f' AND "timestamp" < CAST(:upper AS timestamptz) RETURNING *) INSERT INTO {name} SELECT * FROM moved'
+            ), bounds)
+            conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+                              f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"))
+            logger.info(f"Created partition {name}")
+            created += 1
+        month = _month(month, 1)
+    return created
+
+
+def drop_expired_partitions(conn, cutoff: datetime) -> int:
+    """Drop the monthly partitions that end before `cutoff` and hold no rows. Returns how many."""
+    partitions = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": TABLE}).scalars().all()
+    dropped = 0
+    for name in sorted(partitions):
+        match = PARTITION_RE.match(name)
+        if match is None:
+            continue
+        upper = _month(date(int(match[1]), int(match[2]), 1), 1)
+        if datetime(upper.year, upper.month, 1, tzinfo=timezone.utc) > cutoff:
+            continue
+        if conn.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+            conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            logger.info(f"Dropped expired partition {name}")
+            dropped += 1
+    return dropped
+
+
+def partition_raw_books(months_ahead: int = RAW_BOOKS_PARTITIONS_AHEAD) -> Dict:
+    """
+    One-off storage conversion for compaction and retention.
+
+    PostgreSQL: raw_books becomes a table partitioned by month on timestamp,
+    primary key (id, timestamp), with its rows copied over in one
+    transaction; the id sequence and indexes carry over. SQLite: the file is
+    switched to auto_vacuum=INCREMENTAL, which takes one full VACUUM.
+    Running it again only creates missing partitions.
+    """
+    engine = get_engine()
+    if engine.dialect.name == "sqlite":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+                conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.exec_driver_sql("VACUUM")
+                logger.info("Switched the SQLite file to incremental auto-vacuum")
+        return {"dialect": "sqlite", "auto_vacuum": "incremental"}
+    if engine.dialect.name != "postgresql":
+        raise ValueError(f"Partitioning not supported for dialect: {engine.dialect.name}")
+
+    with engine.begin() as conn:
+        if not _is_partitioned(conn):
+            old = f"{TABLE}_unpartitioned"
+            first = conn.execute(text(f'SELECT MIN("timestamp") FROM {TABLE}')).scalar()
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE}).scalar()
+            conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {old}"))
+            conn.execute(text(
+                f"CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS, "
+                f'CONSTRAINT {TABLE}_id_timestamp_pkey PRIMARY KEY (id, "timestamp")) PARTITION BY RANGE ("timestamp")'
+            ))
+            conn.execute(text(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"))
+            ensure_partitions(conn, months_ahead, start=first.date() if first else None)
+            conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {old}"))
+            if sequence:
+                conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+            conn.execute(text(f"DROP TABLE {old}"))
+            for index in RawBook.__table__.indexes:
+                index.create(conn)
+            logger.info(f"Partitioned {TABLE} by month")
+        else:
+            ensure_partitions(conn, months_ahead)
+        partitions = conn.execute(text(
+            "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = to_regclass(:table)"), {"table": TABLE}).scalar()
+    return {"dialect": "postgresql", "partitions": partitions}
+
+
+def compact_raw_books(retention_days: int = RAW_BOOKS_RETENTION_DAYS, batch_size: int = RAW_COMPACTION_BATCH_SIZE,
+                      vacuum: bool = False, session=None, now: Optional[datetime] = None) -> Dict:
+    """
+    Collapse repeated observations into validity ranges and apply retention.
+
+    Args:
+        retention_days: delete observations that ended longer ago than this,
+            except the latest per URL (0 keeps everything)
+        batch_size: URLs per compaction batch / rows per retention batch,
+            one transaction each
+        vacuum: finish with VACUUM (ANALYZE) on PostgreSQL / a full VACUUM
+            on SQLite (not with incremental auto-vacuum, not with `session`)
+        session: optional caller-owned session; every batch then runs in its
+            transaction and the caller commits
+        now: reference time for retention (default: now, UTC)
+
+    Returns:
+        Report with rows scanned / merged / expired, ranges extended,
+        partitions created / dropped, bytes before / after / reclaimed and
+        seconds taken
+    """
+    started = time.perf_counter()
+    report = {"scanned": 0, "merged": 0, "ranges": 0, "expired": 0,
+              "partitions_created": 0, "partitions_dropped": 0}
+    with session_scope(session) as s:
+        conn = s.connection()
+        dialect = conn.dialect.name
+        partitioned = _is_partitioned(conn)
+        report["bytes_before"] = used_bytes(conn)
+        if partitioned:
+            report["partitions_created"] = ensure_partitions(conn)
+
+    last_url = None
+    while True:
+        with session_scope(session) as s:
+            batch = compact_urls(s.connection(), last_url, batch_size)
+        if batch["last_url"] is None:
+            break
+        last_url = batch["last_url"]
+        for key in ("scanned", "merged", "ranges"):
+            report[key] += batch[key]
+
+    if retention_days > 0:
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+        if dialect == "sqlite":
+            # Stored as naive UTC text: compare like with like
+            cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+        with session_scope(session) as s:
+            until = s.connection().execute(select(func.max(RawBook.id)).where(RawBook.timestamp < cutoff)).scalar()
+        last_id = 0
+        while until is not None:
+            with session_scope(session) as s:
+                batch = expire_rows(s.connection(), cutoff, last_id, until, batch_size)
+            if batch["last_id"] is None:
+                break
+            last_id = batch["last_id"]
+            report["expired"] += batch["expired"]
+        if partitioned:
+            with session_scope(session) as s:
+                report["partitions_dropped"] = drop_expired_partitions(s.connection(), cutoff)
+
+    with session_scope(session) as s:
+        conn = s.connection()
+        incremental = dialect == "sqlite" and conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+        if incremental:
+            conn.exec_driver_sql("PRAGMA incremental_vacuum")
+    if vacuum and session is None and not incremental:
+        with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql(f"VACUUM (ANALYZE) {TABLE}" if dialect == "postgresql" else "VACUUM")
+    with session_scope(session) as s:
+        report["bytes_after"] = used_bytes(s.connection())
+
+    report["bytes_reclaimed"] = report["bytes_before"] - report["bytes_after"]
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Compacted {TABLE}: {report['merged']} rows merged into {report['ranges']} ranges, "
+                f"{report['expired']} expired, {report['bytes_reclaimed']:,} bytes reclaimed")
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Compact raw_books into validity ranges and apply retention.")
+    parser.add_argument("--retention-days", type=int, default=RAW_BOOKS_RETENTION_DAYS,
+                        help="delete observations that ended longer ago, except the latest per URL (0: keep all)")
+    parser.add_argument("--batch-size", type=int, default=RAW_COMPACTION_BATCH_SIZE,
+                        help="URLs (compaction) / rows (retention) per transaction")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards")
+    parser.add_argument("--partition", action="store_true",
+                        help="first convert raw_books to monthly partitions (PostgreSQL) / "
+                             "incremental auto-vacuum (SQLite)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+    if args.partition:
+        print(partition_raw_books())
+    print(compact_raw_books(retention_days=args.retention_days, batch_size=args.batch_size, vacuum=args.vacuum))
+
+
+if __name__ == "__main__":
+    main()
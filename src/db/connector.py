@@ -2,17 +2,27 @@
 Used every run ro write/read data.
 DB operations (insert/query"""
 
+import hashlib
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from contextlib import contextmanager
-from typing import List, Dict, Any
-from src.config import DATABASE_URL
+import threading
+from pathlib import Path
+from itertools import islice
+from sqlalchemy import create_engine, event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from src.config import (
+    DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_PREPARE_THRESHOLD, DB_PROFILE,
+    DB_STATEMENT_TIMEOUT_MS, DB_STREAM_CHUNK_SIZE, RAW_INSERT_CHUNK_SIZE, SQLITE_MMAP_SIZE, UPSERT_CHUNK_SIZE,
+    ensure_dir,
+)
 from src.db.models import RawBook, Book
+from src.metrics import METRICS
 
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
-logger = logging.getLogger(__name__)  
+logger = logging.getLogger(__name__)
 
 #engine: connection configuration + driver
 #session : a conversation with the DB 
@@ -29,16 +39,98 @@ logger = logging.getLogger(__name__)
    → [{title: "Book", price: 51.77, rating: 3, ...}, ...]  (typed!)
                 ↓
 4. UPSERT CLEANED:
-   upsert_books(cleaned_rows) → saves to books table"""
+   upsert_books(cleaned_rows) → saves to books table
+   (bulk_upsert_books(cleaned_rows) → same, set-based in chunks)"""
 
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning: WAL lets readers run alongside the writer,
+    synchronous=NORMAL is durable in WAL mode with far fewer fsyncs, and mmap
+    serves reads from the page cache."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE, **kwargs) -> Engine:
+    """
+    Create an engine with the performance profile for the URL's dialect.
+
+    Args:
+        url: SQLAlchemy database URL
+        profile: "tuned" (dialect-specific settings) or "default" (plain create_engine)
+        **kwargs: extra create_engine() arguments; they override the profile
+
+    Returns:
+        Engine
+    """
+    if profile not in ("tuned", "default"):
+        raise ValueError(f"Unknown DB_PROFILE {profile!r} (expected 'tuned' or 'default')")
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "sqlite" and parsed.database and parsed.database != ":memory:":
+        ensure_dir(Path(parsed.database).parent)
+    options: Dict[str, Any] = {"echo": False}
+
+    if profile == "tuned" and backend == "postgresql":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            pool_recycle=DB_POOL_RECYCLE,
+            connect_args={
+                "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
+                "prepare_threshold": DB_PREPARE_THRESHOLD,
+            },
+        )
+    options.update(kwargs)
+
+    new_engine = create_engine(url, **options)
+    if profile == "tuned" and backend == "sqlite":
+        event.listen(new_engine, "connect", _sqlite_pragmas)
+    return new_engine
+
+
+# Shared by every DB entry point (sessions, init_db, benchmarks); built on
+# first use so importing this module doesn't connect or create data/books.db
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """The shared engine for DATABASE_URL, created on the first call."""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                new_engine = make_engine()
+                _session_factory = sessionmaker(bind=new_engine, autoflush=False, autocommit=False)
+                _engine = new_engine
+    return _engine
+
+
+def get_sessionmaker() -> sessionmaker:
+    """Session factory bound to get_engine()."""
+    get_engine()
+    return _session_factory
+
+
+def __getattr__(name: str):
+    # `from src.db.connector import engine` / `SessionLocal` keep working, lazily
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @contextmanager
 def get_session():
     """Context manager for DB sessions with auto commit/rollback."""
-    session = SessionLocal()
+    session = get_sessionmaker()()
     try:
         yield session
         session.commit()
@@ -48,53 +140,159 @@ def get_session():
         raise
     finally:
         session.close()
+
+
+# Bumped every time a transaction that wrote books commits; cached reads
+# (src.db.queries) taken at an older version are stale
+_books_version = 0
+
+
+def books_version() -> int:
+    """Number of committed transactions that have written books so far (in this process)."""
+    return _books_version
+
+
+def mark_books_written(session) -> None:
+    """Flag `session`: books_version() moves on once its transaction commits."""
+    session.info["books_written"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _books_committed(session) -> None:
+    global _books_version
+    if session.info.pop("books_written", False):
+        _books_version += 1
+
+
+@contextmanager
+def session_scope(session=None):
+    """
+    Reuse the caller's session (the caller commits), or open a new
+    get_session() that commits on exit.
+    """
+    if session is not None:
+        yield session
+    else:
+        with get_session() as new_session:
+            yield new_session
+
+
+def chunked(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Split any iterable (list or generator) into lists of at most `size` rows."""
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_query(statement, chunk_size: int = DB_STREAM_CHUNK_SIZE,
+                 session=None) -> Iterator[List[Any]]:
+    """
+    Run a SELECT and yield its rows in lists of at most `chunk_size`, without
+    loading the whole result. Uses a server-side cursor on PostgreSQL.
+
+    Args:
+        statement: SQLAlchemy select()
+        chunk_size: rows per fetch round-trip
+        session: optional caller-owned session
+
+    Returns:
+        Iterator of row lists
+    """
+    with session_scope(session) as s:
+        result = s.execute(statement, execution_options={"stream_results": True, "yield_per": chunk_size})
+        for partition in result.partitions():
+            yield partition
+
+
+# Column order shared by the executemany and COPY paths
+RAW_BOOK_COLUMNS = ("title", "price_raw", "rating_raw", "availability_raw", "category", "product_page_url")
+
+
+def raw_book_values(r: Dict[str, Any]) -> tuple:
+    """Map one scraped row to raw_books values in RAW_BOOK_COLUMNS order."""
+    return (
+        r.get("title"),
+        r.get("price"),  # Scraper returns 'price', not 'price_raw'
+        str(r.get("rating")) if r.get("rating") is not None else None,
+        r.get("availability"),
+        r.get("category"),
+        r.get("product_page_url"),
+    )
+
 #{'title': 'A Light in the Attic', 'price': '51.77', 'availability': 'In stock', 'rating': 3}
 
-def insert_raw_books(rows: List[Dict[str, Any]]) -> int:
+def insert_raw_books(rows: Iterable[Dict[str, Any]], session=None,
+                     chunk_size: int = RAW_INSERT_CHUNK_SIZE) -> int:
     """
     Insert a list/iterable of scraped raw book dicts into raw_books table.
+    
+    raw_books is append-only and never read back in the same session, so no
+    ORM objects are built: rows are written in chunks of `chunk_size` with
+    COPY FROM STDIN on PostgreSQL and a Core executemany INSERT elsewhere.
+    Any iterable works, including a generator straight from scraper().
+    Pass `session` to write inside the caller's transaction.
     Returns number of inserted rows.
     """
     if not rows:
         return 0
-    
-    objects = []
-    for r in rows:
-        objects.append(
-            RawBook(
-                title=r.get("title"),
-                price_raw=r.get("price"),  # Scraper returns 'price', not 'price_raw'
-                rating_raw=str(r.get("rating")) if r.get("rating") is not None else None,
-                availability_raw=r.get("availability"),
-                category=r.get("category"),
-                product_page_url=r.get("product_page_url"),
-            )
-        )
-    
-    with get_session() as session:
-        session.add_all(objects)
-        
-    return len(objects)
 
-def upsert_books(cleaned_rows: List[Dict[str, Any]]) -> int:
+    count = 0
+    with session_scope(session) as s:
+        if s.get_bind().dialect.name == "postgresql":
+            copy_sql = f"COPY {RawBook.__tablename__} ({', '.join(RAW_BOOK_COLUMNS)}) FROM STDIN"
+            cursor = s.connection().connection.driver_connection.cursor()
+            try:
+                for chunk in chunked(rows, chunk_size):
+                    with cursor.copy(copy_sql) as copy:
+                        for r in chunk:
+                            copy.write_row(raw_book_values(r))
+                    count += len(chunk)
+                    # Raw driver cursor: not seen by the engine's round-trip hook
+                    METRICS.incr("db_roundtrips")
+            finally:
+                cursor.close()
+        else:
+            stmt = insert(RawBook.__table__)
+            for chunk in chunked(rows, chunk_size):
+                s.execute(stmt, [dict(zip(RAW_BOOK_COLUMNS, raw_book_values(r))) for r in chunk])
+                count += len(chunk)
+
+    return count
+
+def upsert_books(cleaned_rows: List[Dict[str, Any]], index=None) -> int:
     """
     Insert or update cleaned books into the 'books' table.
     
     Logic:
     - If product_page_url already exists → UPDATE price, rating, availability
+      (skipped when its content_hash shows nothing changed)
     - If product_page_url is new → INSERT as new row
     - Returns count of affected (inserted + updated) rows
+
+    With a BookIndex (`index`) the insert / update / skip decision comes
+    from it instead of a SELECT per row, updates go straight to the row id,
+    and the written books are added to the index once committed.
     """
     if not cleaned_rows :
         return 0
     #{'title': 'A Light in the Attic', 'price': 'Â£51.77', 'availability':
     # 'In stock', 'rating': 3, 'product_page_url': 
     # 'https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html'}
+    if index is not None:
+        return _upsert_books_indexed(cleaned_rows, index)
     with get_session() as session:
+        mark_books_written(session)
         count = 0
         for row in cleaned_rows:
             exists = session.query(Book).filter_by(product_page_url=row["product_page_url"]).first()
+            digest = content_hash(row)
 
+            if exists and exists.content_hash == digest:
+                # Same values as stored: nothing to write
+                continue
             if exists:
                 # UPDATE path: modify existing record
                 exists.title = row.get("title")
@@ -102,6 +300,7 @@ def upsert_books(cleaned_rows: List[Dict[str, Any]]) -> int:
                 exists.rating = row.get("rating")
                 exists.availability = row.get("availability")
                 exists.category = row.get("category")
+                exists.content_hash = digest
                 logger.info(f"Updated book: {row['title']}")   
             else:
                 # INSERT path: create new record
@@ -112,7 +311,7 @@ def upsert_books(cleaned_rows: List[Dict[str, Any]]) -> int:
                     availability=row.get("availability"),
                     category=row.get("category"),
                     product_page_url=row.get("product_page_url"),
-
+                    content_hash=digest,
                 )
                 session.add(new_book)
                 logger.info(f"Inserted new book: {row['title']}")
@@ -122,8 +321,191 @@ def upsert_books(cleaned_rows: List[Dict[str, Any]]) -> int:
     return count
 
 
+def _upsert_books_indexed(cleaned_rows: List[Dict[str, Any]], index) -> int:
+    """upsert_books() with every existence / change check answered by `index` (last row per URL wins)."""
+    by_url = {row["product_page_url"]: row for row in cleaned_rows}
+    count = 0
+    with index.staged(), get_session() as session:
+        mark_books_written(session)
+        known = index.lookup(by_url, session=session)
+        new_books = []
+        for url, row in by_url.items():
+            digest = content_hash(row)
+            values = {col: row.get(col) for col in BOOK_CONTENT_COLUMNS}
+            if url in known:
+                book_id, stored = known[url]
+                if stored == digest:
+                    continue
+                session.execute(update(Book).where(Book.id == book_id).values(**values, content_hash=digest))
+                index.put(url, book_id, digest)
+                logger.info(f"Updated book: {row['title']}")
+            else:
+                book = Book(**values, product_page_url=url, content_hash=digest)
+                session.add(book)
+                new_books.append(book)
+                logger.info(f"Inserted new book: {row['title']}")
+            count += 1
+        # One flush assigns the ids of all new books
+        session.flush()
+        for book in new_books:
+            index.put(book.product_page_url, book.id, book.content_hash)
+    return count
+
+
+# Cleaned values a book's content_hash covers
+BOOK_CONTENT_COLUMNS = ("title", "price", "rating", "availability", "category")
+# Columns overwritten when a product_page_url already exists
+BOOK_UPDATE_COLUMNS = BOOK_CONTENT_COLUMNS + ("content_hash",)
+
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Short hash of a cleaned row's BOOK_CONTENT_COLUMNS, stored in books.content_hash."""
+    key = "\x1f".join("\x00" if (v := row.get(col)) is None else str(v) for col in BOOK_CONTENT_COLUMNS)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def existing_hashes(urls: Iterable[str], session=None) -> Dict[str, Optional[str]]:
+    """
+    Stored content_hash per product_page_url, for the given URLs already in books
+    (None for rows written before hashes were kept).
+    """
+    hashes = {}
+    with session_scope(session) as s:
+        conn = s.connection()
+        for batch in chunked(dict.fromkeys(urls), UPSERT_CHUNK_SIZE):
+            hashes.update(conn.execute(
+                select(Book.product_page_url, Book.content_hash).where(Book.product_page_url.in_(batch))
+            ).all())
+    return hashes
+
+
+def diff_books(cleaned_rows: Iterable[Dict[str, Any]], session=None,
+               stored: Optional[Dict[str, Optional[str]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Change data capture against books: split cleaned rows into new, changed
+    and unchanged by comparing content hashes per product_page_url.
+    `stored` is an existing_hashes() result to reuse instead of querying.
+
+    Returns:
+        (rows to write, {"new": n, "changed": m, "unchanged": k}); the same
+        URL appearing twice counts once, with the last row winning
+    """
+    by_url = {row["product_page_url"]: row for row in cleaned_rows}
+    if stored is None:
+        stored = existing_hashes(by_url, session=session)
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    changed = []
+    for url, row in by_url.items():
+        if url not in stored:
+            counts["new"] += 1
+        elif stored[url] == content_hash(row):
+            counts["unchanged"] += 1
+            continue
+        else:
+            counts["changed"] += 1
+        changed.append(row)
+    return changed, counts
+
+
+def _dialect_insert(session):
+    """Return the dialect-specific insert() that supports ON CONFLICT."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise ValueError(f"Bulk upsert not supported for dialect: {dialect}")
+
+
+def bulk_upsert_books(cleaned_rows: Iterable[Dict[str, Any]],
+                      chunk_size: int = UPSERT_CHUNK_SIZE, session=None,
+                      stored_hashes: Optional[Dict[str, Optional[str]]] = None,
+                      index=None) -> Dict[str, int]:
+    """
+    Set-based version of upsert_books.
+
+    Each chunk is written by executing one
+    INSERT ... ON CONFLICT (product_page_url) DO UPDATE statement over the
+    whole chunk, preceded by a single SELECT of the stored content hashes
+    of the chunk's URLs: rows whose hash is unchanged are left out of the
+    write, and the rest are split into inserted and updated rows.
+    Pass `session` to write inside the caller's transaction, and
+    `stored_hashes` (an existing_hashes() result covering the rows) to skip
+    the SELECT.
+    With a BookIndex (`index`) the stored hashes come from it instead, and
+    the written books (ids via RETURNING) are staged in it; the index is
+    committed here when this call owns the transaction, by the caller
+    otherwise.
+    A URL repeated in a later chunk is compared with what the earlier chunk
+    wrote, so each new URL is counted as inserted once.
+    Returns {"inserted": n, "updated": m, "unchanged": k}.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    # url -> content_hash written by an earlier chunk of this call, which
+    # stored_hashes and the index (until it commits) do not know about
+    written = {}
+    # Our own transaction: the index takes the written books once it commits
+    staged = index.staged() if index is not None and session is None else nullcontext()
+
+    with staged, session_scope(session) as session:
+        dialect_insert = _dialect_insert(session)
+        # Built once and run executemany-style per chunk (no per-chunk SQL compile)
+        stmt = dialect_insert(Book)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Book.product_page_url],
+            set_={col: stmt.excluded[col] for col in BOOK_UPDATE_COLUMNS},
+        )
+        if index is not None:
+            stmt = stmt.returning(Book.id, Book.product_page_url)
+
+        for chunk in chunked(cleaned_rows, chunk_size):
+            # ON CONFLICT cannot touch the same row twice in one statement: last row wins
+            by_url = {}
+            for row in chunk:
+                values = {
+                    "title": row.get("title"),
+                    "price": row.get("price"),
+                    "rating": row.get("rating"),
+                    "availability": row.get("availability"),
+                    "category": row.get("category"),
+                    "product_page_url": row["product_page_url"],
+                }
+                values["content_hash"] = content_hash(values)
+                by_url[row["product_page_url"]] = values
+
+            if stored_hashes is None and index is not None:
+                stored = index.hashes(by_url, session=session)
+            elif stored_hashes is None:
+                stored = dict(session.execute(
+                    select(Book.product_page_url, Book.content_hash).where(Book.product_page_url.in_(list(by_url)))
+                ).all())
+            else:
+                stored = {url: stored_hashes[url] for url in by_url if url in stored_hashes}
+            stored.update((url, written[url]) for url in by_url if url in written)
+            # Unchanged rows are not written at all (no row rewrite, no index churn)
+            changed = [v for url, v in by_url.items() if url not in stored or stored[url] != v["content_hash"]]
+
+            if changed:
+                mark_books_written(session)
+            if changed and index is not None:
+                for book_id, url in session.execute(stmt, changed):
+                    index.put(url, book_id, by_url[url]["content_hash"])
+            elif changed:
+                session.execute(stmt, changed)
+
+            written.update((v["product_page_url"], v["content_hash"]) for v in changed)
+
+            counts["inserted"] += len(by_url) - len(stored)
+            counts["updated"] += len(changed) - (len(by_url) - len(stored))
+            counts["unchanged"] += len(by_url) - len(changed)
+
+    logger.info(f"Bulk upsert: {counts['inserted']} inserted, {counts['updated']} updated, "
+                f"{counts['unchanged']} unchanged")
+    return counts
+
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
     # Test INSERT path
     print("\n=== TEST 1: Insert new book ===")
     cleaned_demo = [{'title': 'A Light in the Attic', 'price': 50.2, 'availability':
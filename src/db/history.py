@@ -0,0 +1,192 @@
+"""
+Price/availability history on top of the book_snapshots table.
+
+record_snapshots() appends a snapshot only for books whose price or
+availability differs from their latest one, so the table grows with the
+real churn. Every read is an index seek or range scan:
+
+    price_history(book_id, start, end)     PK range (book_id, observed_at)
+    snapshots_as_of(at, book_ids)          one PK seek per book (latest <= at)
+    price_changes(start, end, "down")      observed_at range + two PK seeks per changed book
+    previous_price(Book.id)                two PK seeks per book
+
+so they stay fast when the table holds hundreds of millions of rows.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import aliased
+
+from src.config import UPSERT_CHUNK_SIZE
+from src.db.connector import chunked, session_scope
+from src.db.models import Book, BookSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _latest_before(book_id_column, at: Optional[datetime] = None, attr: str = "observed_at"):
+    """Correlated scalar subquery: `attr` of the latest snapshot of `book_id_column` at or before `at`."""
+    snap = aliased(BookSnapshot)
+    query = select(getattr(snap, attr)).where(snap.book_id == book_id_column)
+    if at is not None:
+        query = query.where(snap.observed_at <= at)
+    return query.order_by(snap.observed_at.desc()).limit(1).scalar_subquery()
+
+
+def previous_price(book_id_column):
+    """
+    Correlated scalar subquery: price of the snapshot before the latest one of
+    `book_id_column` (NULL for books with fewer than two snapshots). Two PK seeks.
+    """
+    snap = aliased(BookSnapshot)
+    return (
+        select(snap.price)
+        .where(snap.book_id == book_id_column, snap.observed_at < _latest_before(snap.book_id))
+        .order_by(snap.observed_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def latest_snapshots_query(book_ids: Iterable[int], at: Optional[datetime] = None):
+    """select() of the latest snapshot (at or before `at`) per book id."""
+    return (
+        select(BookSnapshot.book_id, BookSnapshot.observed_at, BookSnapshot.price, BookSnapshot.availability)
+        .where(BookSnapshot.book_id.in_(list(book_ids)))
+        .where(BookSnapshot.observed_at == _latest_before(BookSnapshot.book_id, at))
+    )
+
+
+def record_snapshots(cleaned_rows: Iterable[Dict], session=None, observed_at: Optional[datetime] = None,
+                     index=None) -> Dict[int, Optional[float]]:
+    """
+    Append a snapshot for every book whose price or availability changed.
+
+    Args:
+        cleaned_rows: cleaned rows already upserted into books
+        session: optional caller-owned session (write inside its transaction)
+        observed_at: snapshot time (default: now, UTC)
+        index: optional BookIndex giving the book ids (no SELECT on books)
+
+    Returns:
+        dict book_id -> price before this snapshot (None for a book's first
+        one), for every snapshot written
+    """
+    observed_at = observed_at or datetime.now(timezone.utc)
+    by_url = {row["product_page_url"]: row for row in cleaned_rows}
+    written = {}
+    with session_scope(session) as s:
+        conn = s.connection()
+        for batch in chunked(by_url, UPSERT_CHUNK_SIZE):
+            if index is not None:
+                ids = index.ids(batch, session=s)
+            else:
+                ids = dict(conn.execute(
+                    select(Book.product_page_url, Book.id).where(Book.product_page_url.in_(batch))
+                ).all())
+            latest = {
+                book_id: (price, availability)
+                for book_id, _, price, availability in conn.execute(latest_snapshots_query(ids.values()))
+            }
+            values = []
+            for url, book_id in ids.items():
+                current = (by_url[url].get("price"), by_url[url].get("availability"))
+                if latest.get(book_id) != current:
+                    values.append({"book_id": book_id, "observed_at": observed_at,
+                                   "price": current[0], "availability": current[1]})
+                    written[book_id] = latest[book_id][0] if book_id in latest else None
+            if values:
+                conn.execute(insert(BookSnapshot), values)
+    logger.info(f"Recorded {len(written)} book snapshots")
+    return written
+
+
+def price_history(book_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  session=None) -> List[tuple]:
+    """(observed_at, price, availability) of one book in [start, end], oldest first."""
+    query = select(BookSnapshot.observed_at, BookSnapshot.price, BookSnapshot.availability).where(
+        BookSnapshot.book_id == book_id
+    )
+    if start is not None:
+        query = query.where(BookSnapshot.observed_at >= start)
+    if end is not None:
+        query = query.where(BookSnapshot.observed_at <= end)
+    with session_scope(session) as s:
+        return [tuple(row) for row in s.connection().execute(query.order_by(BookSnapshot.observed_at))]
+
+
+def snapshots_as_of(at: datetime, book_ids: Optional[Iterable[int]] = None,
+                    session=None) -> Dict[int, tuple]:
+    """
+    Latest known (price, availability) per book at time `at`.
+
+    Args:
+        at: point in time
+        book_ids: books to look up (default: every book in books)
+        session: optional caller-owned session
+
+    Returns:
+        dict book_id -> (observed_at, price, availability); books without a
+        snapshot by then are absent
+    """
+    result = {}
+    with session_scope(session) as s:
+        conn = s.connection()
+        if book_ids is None:
+            book_ids = conn.execute(select(Book.id)).scalars()
+        for batch in chunked(book_ids, UPSERT_CHUNK_SIZE):
+            for book_id, observed_at, price, availability in conn.execute(latest_snapshots_query(batch, at)):
+                result[book_id] = (observed_at, price, availability)
+    return result
+
+
+def price_changes(start: datetime, end: datetime, direction: Optional[str] = None,
+                  session=None) -> List[tuple]:
+    """
+    Books whose price differs between `start` and `end` (e.g. "dropped this week").
+
+    Only books with a snapshot inside (start, end] can have changed, so
+    those are found through the observed_at index first; their prices at
+    both ends are then one primary-key seek each.
+
+    Args:
+        start: window start (price as of this time is the "old" price)
+        end: window end
+        direction: "down", "up" or None for both
+        session: optional caller-owned session
+
+    Returns:
+        List of (book_id, product_page_url, old_price, new_price); books
+        first seen inside the window are not included
+    """
+    if direction not in (None, "down", "up"):
+        raise ValueError(f"Unknown direction {direction!r} (expected 'down', 'up' or None)")
+
+    changed = (
+        select(BookSnapshot.book_id)
+        .where(BookSnapshot.observed_at > start, BookSnapshot.observed_at <= end)
+        .distinct()
+        .subquery()
+    )
+    compared = (
+        select(
+            changed.c.book_id,
+            Book.product_page_url,
+            _latest_before(changed.c.book_id, start, "price").label("old_price"),
+            _latest_before(changed.c.book_id, end, "price").label("new_price"),
+        )
+        .join(Book, Book.id == changed.c.book_id)
+        .subquery()
+    )
+    query = select(compared).where(compared.c.old_price.is_not(None))
+    if direction == "down":
+        query = query.where(compared.c.new_price < compared.c.old_price)
+    elif direction == "up":
+        query = query.where(compared.c.new_price > compared.c.old_price)
+    else:
+        query = query.where(compared.c.new_price != compared.c.old_price)
+
+    with session_scope(session) as s:
+        return [tuple(row) for row in s.connection().execute(query.order_by(compared.c.book_id))]
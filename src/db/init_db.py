@@ -6,22 +6,52 @@ Run:
 	python -m src.db.init_db
 """
 import logging
-from sqlalchemy import create_engine
-from src.config import DATABASE_URL
+from sqlalchemy import inspect, text
+from src.db.connector import get_engine
 from src.db.models import Base
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 logger = logging.getLogger(__name__)
 
 
 def create_tables():
 		"""Create all tables defined in src.db.models."""
-		engine = create_engine(DATABASE_URL, echo=False)
 		#base.metadata "goes through" the created tables 
-		Base.metadata.create_all(engine)
+		Base.metadata.create_all(get_engine())
+		add_missing_columns()
+		add_missing_indexes()
 		logger.info("Tables created successfully")
-		engine.dispose()
+
+
+def add_missing_columns():
+		"""
+		create_all() never alters existing tables: add nullable model columns
+		(e.g. books.content_hash) that an older database does not have yet.
+		"""
+		engine = get_engine()
+		inspector = inspect(engine)
+		with engine.begin() as conn:
+			for table in Base.metadata.sorted_tables:
+				existing = {col["name"] for col in inspector.get_columns(table.name)}
+				for column in table.columns:
+					if column.name not in existing and column.nullable:
+						col_type = column.type.compile(dialect=engine.dialect)
+						conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+						logger.info(f"Added column {table.name}.{column.name}")
+
+
+def add_missing_indexes():
+		"""create_all() skips existing tables: create model indexes (e.g. ix_raw_books_timestamp) they lack."""
+		engine = get_engine()
+		inspector = inspect(engine)
+		with engine.begin() as conn:
+			for table in Base.metadata.sorted_tables:
+				existing = {index["name"] for index in inspector.get_indexes(table.name)}
+				for index in table.indexes:
+					if index.name not in existing:
+						index.create(conn)
+						logger.info(f"Created index {index.name}")
 
 
 if __name__ == "__main__":
+		logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 		create_tables()
@@ -3,7 +3,7 @@ SQLAlchemy ORM models for the books database,
 defines how does the DB look like
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, func, Float
+from sqlalchemy import Column, Integer, String, DateTime, func, Float, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 # Base class all ORM models inherit from
@@ -11,6 +11,11 @@ Base = declarative_base()
 
 
 class RawBook(Base):
+    """
+    Append-only scraped observations. src.db.compaction collapses consecutive
+    identical observations of a URL into one row valid from `timestamp` to
+    `valid_to` (NULL: observed once), seen `observations` times.
+    """
     __tablename__ = "raw_books"
 
     # Columns
@@ -22,6 +27,13 @@ class RawBook(Base):
     category = Column(String, nullable=True)
     product_page_url = Column(String, nullable=True, index=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    valid_to = Column(DateTime(timezone=True), nullable=True)
+    observations = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        # Retention scans by time; BRIN on PostgreSQL (rows arrive in time order)
+        Index("ix_raw_books_timestamp", "timestamp", postgresql_using="brin"),
+    )
 
 class Book(Base):
     __tablename__ = "books"
@@ -33,4 +45,38 @@ class Book(Base):
     availability = Column(Integer, nullable=True)
     category = Column(String, nullable=True)
     product_page_url = Column(String, nullable=False, unique=True, index=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
\ No newline at end of file
+    # Hash of the cleaned values (connector.content_hash): rows whose hash is unchanged are not rewritten
+    content_hash = Column(String(16), nullable=True)
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Read API (src/db/queries.py): one index per filter, each ending in the (price, id)
+        # keyset order; PostgreSQL also carries the filter columns for index-only filtering
+        Index("ix_books_category_price", "category", "price", "id", postgresql_include=["rating", "availability"]),
+        Index("ix_books_price", "price", "id", postgresql_include=["rating", "availability"]),
+        Index("ix_books_rating_price", "rating", "price", "id", postgresql_include=["availability"]),
+    )
+
+
+class BookSnapshot(Base):
+    """
+    Price/availability history of a book: one row per observed change
+    (unchanged observations are not stored).
+
+    The primary key (book_id, observed_at) serves per-book time ranges and
+    latest-as-of lookups; the observed_at index serves "what changed in this
+    window" scans. On SQLite the table is WITHOUT ROWID, so rows are stored
+    clustered by the primary key; on PostgreSQL observed_at gets a BRIN index,
+    which stays tiny on an append-in-time-order table.
+    """
+    __tablename__ = "book_snapshots"
+
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    observed_at = Column(DateTime(timezone=True), primary_key=True)
+    price = Column(Float, nullable=True)
+    availability = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_book_snapshots_observed_at", "observed_at", postgresql_using="brin"),
+        {"sqlite_with_rowid": False},
+    )
@@ -0,0 +1,276 @@
+"""
+Read API on the books table for downstream consumers.
+
+    books_page(category=..., min_price=..., ...)   one page of books, ordered
+                                                   by (price, id) or id, and
+                                                   the cursor of the next page
+    iter_books(...)                                every matching book, streamed
+                                                   in chunks (server-side cursor
+                                                   on PostgreSQL)
+    cheapest_per_category(n)                       the n cheapest books of each
+                                                   category
+
+Pages are keyset-paginated: the next page starts after the (price, id) of
+the last row (WHERE (price, id) > cursor), so page 10,000 costs the same as
+page 1, unlike OFFSET. Each filter has an index ending in that order
+(ix_books_category_price, ix_books_price, ix_books_rating_price), so a page
+is one index range scan of `limit` rows, and the n cheapest of a category
+are its first n index entries.
+
+books_page() and cheapest_per_category() results are kept in a small TTL
+cache (QUERY_CACHE_TTL, QUERY_CACHE_MAX_ENTRIES). Everything that writes
+books (upsert_books, bulk_upsert_books, rebuild_books) flags its session,
+and when that transaction commits connector.books_version() moves on,
+which empties the cache; results loaded while a write committed are not
+cached. Calls with a caller-owned `session` bypass the cache, as that
+transaction may see uncommitted writes.
+
+Run:
+    python -m src.db.queries --category Poetry --max-price 20 --in-stock
+    python -m src.db.queries --cheapest 3
+"""
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, tuple_, union_all
+
+from src.config import (
+    DB_STREAM_CHUNK_SIZE, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL, QUERY_MAX_PAGE_SIZE, QUERY_PAGE_SIZE,
+)
+from src.db.connector import books_version, chunked, session_scope, stream_query
+from src.db.models import Book
+
+# Columns of every returned book, in this order
+READ_COLUMNS = ("id", "title", "price", "rating", "availability", "category", "product_page_url")
+# Keyset order of each sort, unique thanks to id
+ORDERS = {"price": ("price", "id"), "id": ("id",)}
+# Categories per UNION ALL statement in cheapest_per_category (SQLite allows 500 terms)
+CATEGORIES_PER_STATEMENT = 100
+
+
+class QueryCache:
+    """Thread-safe TTL + LRU cache of read results, emptied when books_version() moves on."""
+
+    def __init__(self, ttl: float = QUERY_CACHE_TTL, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._version = books_version()
+        self._lock = threading.Lock()
+
+    def _check_version(self) -> int:
+        version = books_version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+        return version
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Cached value of `key`, or load() it (and cache it unless books were written meanwhile)."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return load()
+        with self._lock:
+            version = self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = load()
+        with self._lock:
+            if self._check_version() == version:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+CACHE = QueryCache()
+
+
+def _book(row: Sequence) -> Dict[str, Any]:
+    return dict(zip(READ_COLUMNS, row))
+
+
+def books_query(category: Optional[str] = None, min_price: Optional[float] = None,
+                max_price: Optional[float] = None, rating: Optional[int] = None,
+                min_rating: Optional[int] = None, in_stock: Optional[bool] = None,
+                order: str = "price", after: Optional[Sequence] = None):
+    """
+    select() of the matching books in keyset order.
+
+    Args:
+        category: exact category
+        min_price / max_price: inclusive price range
+        rating / min_rating: exact rating / rating at least this
+        in_stock: True for availability > 0, False for the rest
+        order: "price" (cheapest first, then id) or "id"
+        after: cursor (the key of the last row already read) to start after
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown order {order!r} (expected one of {tuple(ORDERS)})")
+    keys = [getattr(Book, name) for name in ORDERS[order]]
+    if after is not None and len(after) != len(keys):
+        raise ValueError(f"Cursor {after!r} does not match order {order!r} {ORDERS[order]}")
+    query = select(*(getattr(Book, name) for name in READ_COLUMNS))
+    if category is not None:
+        query = query.where(Book.category == category)
+    # Past a cursor at or above min_price the bound is implied, and leaving it out
+    # makes SQLite start the index range at the cursor instead of at min_price
+    if min_price is not None and not (after is not None and order == "price" and after[0] >= min_price):
+        query = query.where(Book.price >= min_price)
+    if max_price is not None:
+        query = query.where(Book.price <= max_price)
+    if rating is not None:
+        query = query.where(Book.rating == rating)
+    if min_rating is not None:
+        query = query.where(Book.rating >= min_rating)
+    if in_stock is True:
+        query = query.where(Book.availability > 0)
+    elif in_stock is False:
+        query = query.where((Book.availability <= 0) | Book.availability.is_(None))
+    if after is not None:
+        query = query.where(tuple_(*keys) > tuple_(*after) if len(keys) > 1 else keys[0] > after[0])
+    return query.order_by(*keys)
+
+
+def books_page(category: Optional[str] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, rating: Optional[int] = None,
+               min_rating: Optional[int] = None, in_stock: Optional[bool] = None,
+               order: str = "price", after: Optional[Sequence] = None, limit: int = QUERY_PAGE_SIZE,
+               session=None) -> Dict[str, Any]:
+    """
+    One page of matching books (filters as in books_query()).
+
+    Args:
+        after: the "next" cursor of the previous page (None: first page)
+        limit: rows per page, at most QUERY_MAX_PAGE_SIZE
+        session: optional caller-owned session (bypasses the cache)
+
+    Returns:
+        {"books": [book dicts], "next": cursor of the following page, None on the last page}
+    """
+    if not 0 < limit <= QUERY_MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {QUERY_MAX_PAGE_SIZE}")
+    query = books_query(category, min_price, max_price, rating, min_rating, in_stock, order,
+                        tuple(after) if after is not None else None)
+
+    def load() -> Tuple[tuple, ...]:
+        # limit + 1 rows tell whether another page follows
+        with session_scope(session) as s:
+            return tuple(tuple(row) for row in s.connection().execute(query.limit(limit + 1)))
+
+    key = ("page", category, min_price, max_price, rating, min_rating, in_stock, order,
+           tuple(after) if after is not None else None, limit)
+    rows = load() if session is not None else CACHE.get_or_load(key, load)
+    books = [_book(row) for row in rows[:limit]]
+    following = None
+    if len(rows) > limit:
+        following = tuple(books[-1][name] for name in ORDERS[order])
+    return {"books": books, "next": following}
+
+
+def iter_books(category: Optional[str] = None, min_price: Optional[float] = None,
+               max_price: Optional[float] = None, rating: Optional[int] = None,
+               min_rating: Optional[int] = None, in_stock: Optional[bool] = None,
+               order: str = "price", chunk_size: int = DB_STREAM_CHUNK_SIZE,
+               session=None) -> Iterator[List[Dict[str, Any]]]:
+    """Every matching book (filters as in books_query()), in lists of at most `chunk_size`; never cached."""
+    query = books_query(category, min_price, max_price, rating, min_rating, in_stock, order)
+    for rows in stream_query(query, chunk_size=chunk_size, session=session):
+        yield [_book(row) for row in rows]
+
+
+def categories(session=None) -> List[str]:
+    """Distinct non-NULL categories, sorted (read from ix_books_category_price)."""
+    with session_scope(session) as s:
+        query = select(Book.category).where(Book.category.is_not(None)).distinct().order_by(Book.category)
+        return list(s.connection().execute(query).scalars())
+
+
+def cheapest_per_category(n: int = 5, in_stock: Optional[bool] = None,
+                          category_names: Optional[Sequence[str]] = None,
+                          session=None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    The `n` cheapest books of each category (ties broken by id).
+
+    Every category is its own ORDER BY price, id LIMIT n branch of a UNION
+    ALL, i.e. a seek into ix_books_category_price that reads n entries,
+    instead of ranking the whole table with a window function.
+
+    Args:
+        n: books per category
+        in_stock: as in books_query()
+        category_names: categories to include (default: all)
+        session: optional caller-owned session (bypasses the cache)
+
+    Returns:
+        dict category -> book dicts, cheapest first
+    """
+    if n < 1:
+        raise ValueError("n must be at least 1")
+
+    def load() -> Tuple[tuple, ...]:
+        with session_scope(session) as s:
+            names = category_names if category_names is not None else categories(session=s)
+            rows = []
+            for batch in chunked(names, CATEGORIES_PER_STATEMENT):
+                branches = [books_query(category=name, in_stock=in_stock).limit(n).subquery().select()
+                            for name in batch]
+                rows.extend(tuple(row) for row in s.connection().execute(union_all(*branches)))
+            return tuple(rows)
+
+    key = ("cheapest", n, in_stock, tuple(category_names) if category_names is not None else None)
+    rows = load() if session is not None else CACHE.get_or_load(key, load)
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        book = _book(row)
+        result.setdefault(book["category"], []).append(book)
+    for books in result.values():
+        books.sort(key=lambda b: (b["price"], b["id"]))
+    return result
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Query books: one keyset page, or the cheapest per category.")
+    parser.add_argument("--category")
+    parser.add_argument("--min-price", type=float)
+    parser.add_argument("--max-price", type=float)
+    parser.add_argument("--rating", type=int)
+    parser.add_argument("--min-rating", type=int)
+    parser.add_argument("--in-stock", action="store_true", default=None)
+    parser.add_argument("--order", choices=tuple(ORDERS), default="price")
+    parser.add_argument("--after", type=json.loads, help='cursor printed by the previous page, e.g. "[12.5, 40]"')
+    parser.add_argument("--limit", type=int, default=QUERY_PAGE_SIZE)
+    parser.add_argument("--cheapest", type=int, metavar="N", help="print the N cheapest books per category")
+    args = parser.parse_args(argv)
+
+    if args.cheapest:
+        for category, books in cheapest_per_category(args.cheapest, in_stock=args.in_stock).items():
+            print(json.dumps({"category": category, "books": books}))
+        return
+    page = books_page(args.category, args.min_price, args.max_price, args.rating, args.min_rating, args.in_stock,
+                      args.order, args.after, args.limit)
+    for book in page["books"]:
+        print(json.dumps(book))
+    print(json.dumps({"next": page["next"]}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Rebuild `books` from `raw_books` inside the database.
+
+rebuild_books() takes the latest raw row per product_page_url (highest id),
+cleans it with the same rules as clean_row() and upserts the result into
+books with one INSERT ... SELECT ... ON CONFLICT DO UPDATE statement, so a
+full re-clean of millions of raw rows never leaves the database:
+
+    PostgreSQL  substring() regexes and CASE expressions mirroring
+                to_price / to_rating / to_availability
+    SQLite      to_price / to_rating / to_availability / content_hash
+                registered as SQL functions (memoized: raw values repeat a lot)
+
+Rows clean_row() would drop (no title or URL) and rows without a price are
+skipped, and books whose cleaned values are unchanged are not rewritten.
+SQLite computes content_hash in the statement. PostgreSQL has no blake2b
+in SQL, so the statement writes NULL and backfill_content_hashes() then
+re-hashes those books in Python, in id-ordered chunks, before
+rebuild_books() returns. Either way the hashes match what the pipeline
+computes, so the next run sees the rebuilt books as unchanged.
+
+Run:
+    python -m src.db.rebuild
+"""
+import logging
+from functools import lru_cache
+from typing import Dict
+
+from sqlalchemy import Float, Integer, and_, bindparam, case, cast, func, literal, null, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.config import UPSERT_CHUNK_SIZE
+from src.db.connector import (
+    BOOK_CONTENT_COLUMNS, BOOK_UPDATE_COLUMNS, content_hash, mark_books_written, session_scope,
+)
+from src.db.models import Book, RawBook
+from src.processing.clean import INTEGER_RE, NUMBER_RE, WORD_TO_NUM, to_availability, to_price, to_rating
+
+logger = logging.getLogger(__name__)
+
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Characters str.strip() removes (ASCII whitespace)
+_WHITESPACE = " \t\n\r\x0b\x0c"
+
+
+def _memoized(fn):
+    """NULL-safe, memoized scalar cleaner for sqlite3.create_function."""
+    cached = lru_cache(maxsize=65536)(fn)
+    return lambda value: None if value is None else cached(value)
+
+
+def register_sqlite_functions(dbapi_connection) -> None:
+    """Register the scalar cleaners and content_hash on a sqlite3 connection."""
+    dbapi_connection.create_function("clean_price", 1, _memoized(to_price), deterministic=True)
+    dbapi_connection.create_function("clean_rating", 1, _memoized(lambda r: to_rating(str(r))),
+                                     deterministic=True)
+    dbapi_connection.create_function("clean_availability", 1, _memoized(to_availability), deterministic=True)
+    dbapi_connection.create_function(
+        "book_content_hash", len(BOOK_CONTENT_COLUMNS),
+        lambda *values: content_hash(dict(zip(BOOK_CONTENT_COLUMNS, values))), deterministic=True,
+    )
+
+
+def latest_raw_books():
+    """Subquery of the newest raw_books row per product_page_url."""
+    latest = select(func.max(RawBook.id).label("id")).group_by(RawBook.product_page_url).subquery()
+    return select(RawBook).join(latest, RawBook.id == latest.c.id).subquery("raw")
+
+
+def _postgres_columns(raw) -> Dict:
+    """clean_row() as PostgreSQL expressions over a raw_books row."""
+    number = func.substring(raw.c.price_raw, literal(NUMBER_RE.pattern))
+    rating_text = func.lower(func.btrim(raw.c.rating_raw, _WHITESPACE))
+    rating_number = cast(func.substring(raw.c.rating_raw, literal(NUMBER_RE.pattern)), Float)
+    availability_text = func.lower(func.btrim(raw.c.availability_raw, _WHITESPACE))
+    return {
+        "title": func.btrim(raw.c.title, _WHITESPACE),
+        "price": cast(number, Float),
+        "rating": case(
+            *[(rating_text == word, value) for word, value in WORD_TO_NUM.items()],
+            (rating_number.between(0, 5), cast(func.round(rating_number), Integer)),
+            else_=None,
+        ),
+        "availability": case(
+            (or_(availability_text.contains("out of stock"), availability_text.contains("unavailable")), None),
+            (func.substring(availability_text, literal(INTEGER_RE.pattern)).is_not(None),
+             cast(func.substring(availability_text, literal(INTEGER_RE.pattern)), Integer)),
+            (or_(availability_text.contains("in stock"), availability_text.contains("available")), 1),
+            else_=None,
+        ),
+        "category": func.nullif(func.btrim(raw.c.category, _WHITESPACE), ""),
+        "product_page_url": func.btrim(raw.c.product_page_url, _WHITESPACE),
+    }
+
+
+def _sqlite_columns(raw) -> Dict:
+    """clean_row() as calls to the functions from register_sqlite_functions()."""
+    return {
+        "title": func.trim(raw.c.title, _WHITESPACE),
+        "price": func.clean_price(raw.c.price_raw),
+        "rating": func.clean_rating(raw.c.rating_raw),
+        "availability": func.clean_availability(raw.c.availability_raw),
+        "category": func.nullif(func.trim(raw.c.category, _WHITESPACE), ""),
+        "product_page_url": func.trim(raw.c.product_page_url, _WHITESPACE),
+    }
+
+
+def rebuild_statement(dialect: str):
+    """The INSERT ... SELECT ... ON CONFLICT statement rebuilding books on `dialect`."""
+    raw = latest_raw_books()
+    columns = _postgres_columns(raw) if dialect == "postgresql" else _sqlite_columns(raw)
+    cleaned = select(*(expr.label(name) for name, expr in columns.items())).subquery("cleaned")
+
+    values = {
+        "title": cleaned.c.title,
+        "price": cleaned.c.price,
+        "rating": cleaned.c.rating,
+        "availability": cleaned.c.availability,
+        "category": cleaned.c.category,
+    }
+    if dialect == "postgresql":
+        values["content_hash"] = null()
+    else:
+        values["content_hash"] = func.book_content_hash(*(values[col] for col in BOOK_CONTENT_COLUMNS))
+    values["product_page_url"] = cleaned.c.product_page_url
+
+    source = select(*(expr.label(name) for name, expr in values.items())).where(
+        and_(cleaned.c.title != "", cleaned.c.product_page_url != "", cleaned.c.price.is_not(None))
+    )
+    if dialect not in DIALECT_INSERTS:
+        raise ValueError(f"Rebuild not supported for dialect: {dialect}")
+    stmt = DIALECT_INSERTS[dialect](Book).from_select(list(values), source)
+    return stmt.on_conflict_do_update(
+        index_elements=[Book.product_page_url],
+        set_={col: stmt.excluded[col] for col in BOOK_UPDATE_COLUMNS},
+        # Unchanged books are not rewritten
+        where=or_(*(Book.__table__.c[col].is_distinct_from(stmt.excluded[col]) for col in BOOK_CONTENT_COLUMNS)),
+    )
+
+
+def backfill_content_hashes(session=None, chunk_size: int = UPSERT_CHUNK_SIZE) -> int:
+    """
+    Set content_hash on every book that has none (walked by id in chunks).
+
+    Args:
+        session: optional caller-owned session (runs inside its transaction)
+        chunk_size: books read and updated per round-trip
+
+    Returns:
+        Number of books hashed
+    """
+    columns = [Book.__table__.c[col] for col in BOOK_CONTENT_COLUMNS]
+    stmt = update(Book.__table__).where(Book.id == bindparam("b_id")).values(content_hash=bindparam("b_hash"))
+    hashed, last_id = 0, 0
+    with session_scope(session) as s:
+        conn = s.connection()
+        while True:
+            rows = conn.execute(
+                select(Book.id, *columns).where(Book.content_hash.is_(None), Book.id > last_id)
+                .order_by(Book.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return hashed
+            conn.execute(stmt, [{"b_id": row[0], "b_hash": content_hash(dict(zip(BOOK_CONTENT_COLUMNS, row[1:])))}
+                                for row in rows])
+            hashed += len(rows)
+            last_id = rows[-1][0]
+
+
+def rebuild_books(session=None) -> Dict[str, int]:
+    """
+    Re-clean the latest raw row of every book and upsert it into books in one statement.
+
+    Args:
+        session: optional caller-owned session (runs inside its transaction)
+
+    Returns:
+        {"inserted": n, "updated": m}; books whose cleaned values did not
+        change are not counted
+    """
+    with session_scope(session) as s:
+        conn = s.connection()
+        dialect = conn.dialect.name
+        if dialect == "sqlite":
+            register_sqlite_functions(conn.connection.dbapi_connection)
+        mark_books_written(s)
+        before = conn.execute(select(func.count()).select_from(Book)).scalar()
+        written = conn.execute(rebuild_statement(dialect)).rowcount
+        after = conn.execute(select(func.count()).select_from(Book)).scalar()
+        if dialect != "sqlite":
+            backfill_content_hashes(session=s)
+
+    counts = {"inserted": after - before, "updated": written - (after - before)}
+    logger.info(f"Rebuilt books from raw_books: {counts['inserted']} inserted, {counts['updated']} updated")
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    print(rebuild_books())
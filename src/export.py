@@ -0,0 +1,217 @@
+"""
+Columnar export of the `books` and `raw_books` tables for analysis.
+
+export_table() streams a table out of the database in DB_STREAM_CHUNK_SIZE
+chunks (server-side cursor on PostgreSQL) and writes it as a Hive-partitioned
+dataset under EXPORT_DIR, so only one chunk is ever held in memory:
+
+    data/export/books/category=Poetry/run_date=2024-05-01/part-0.parquet
+    data/export/raw_books/category=Poetry/run_date=2024-05-01/part-0.parquet
+
+run_date is the date of the row's timestamp (the run that scraped a raw row,
+or first inserted a book). Each export replaces the previous one of the
+table atomically.
+
+Two formats are supported:
+
+    parquet  compressed, smallest on disk; readers decode the column chunks
+    ipc      uncompressed Arrow IPC files; reads are zero-copy
+
+open_export() / read_export() open an exported table through pyarrow.dataset
+on a memory-mapping filesystem, with column projection and partition pruning
+(e.g. `pc.field("category") == "Poetry"` only opens that directory).
+
+pyarrow is optional: it is only imported when an export is written or read.
+"""
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+from sqlalchemy import DateTime, Float, Integer, select
+
+from src.config import DB_STREAM_CHUNK_SIZE, EXPORT_DIR, EXPORT_FORMAT, EXPORT_FORMATS, ensure_dir
+from src.db.connector import stream_query
+from src.db.models import Book, RawBook
+
+logger = logging.getLogger(__name__)
+
+TABLES = {"books": Book, "raw_books": RawBook}
+FORMATS = EXPORT_FORMATS
+# Extra partition column derived from each row's timestamp
+RUN_DATE = "run_date"
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Columnar export needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def _check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {FORMATS})")
+    return fmt
+
+
+def check_export(fmt: str) -> None:
+    """Fail before a pipeline run starts if `fmt` is unknown or pyarrow is missing."""
+    _check_format(fmt)
+    _pyarrow()
+
+
+def arrow_schema(model):
+    """Arrow schema of a model's columns, plus the run_date partition column."""
+    pa = _pyarrow()
+    fields = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, Integer):
+            type_ = pa.int64()
+        elif isinstance(column.type, Float):
+            type_ = pa.float64()
+        elif isinstance(column.type, DateTime):
+            type_ = pa.timestamp("us", tz="UTC") if column.type.timezone else pa.timestamp("us")
+        else:
+            type_ = pa.string()
+        fields.append(pa.field(column.name, type_, nullable=column.nullable))
+    fields.append(pa.field(RUN_DATE, pa.string()))
+    return pa.schema(fields)
+
+
+def _partitioning(schema):
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(_pyarrow().schema([schema.field("category"), schema.field(RUN_DATE)]), flavor="hive")
+
+
+def _record_batches(model, schema, chunk_size: int, session=None) -> Iterator:
+    """Yield one RecordBatch per stream_query() chunk of the table."""
+    pa = _pyarrow()
+    columns = list(model.__table__.columns)
+    ts = [c.name for c in columns].index("timestamp")
+    statement = select(*columns).order_by(model.id)
+    for rows in stream_query(statement, chunk_size=chunk_size, session=session):
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        arrays.append(pa.array([row[ts].date().isoformat() if row[ts] else None for row in rows], pa.string()))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_table(table: str = "books", fmt: str = EXPORT_FORMAT, export_dir=EXPORT_DIR,
+                 chunk_size: int = DB_STREAM_CHUNK_SIZE, session=None) -> Dict:
+    """
+    Write one table to a partitioned Parquet / Arrow IPC dataset.
+
+    Args:
+        table: "books" or "raw_books"
+        fmt: "parquet" or "ipc"
+        export_dir: root of the exported datasets (default: EXPORT_DIR)
+        chunk_size: rows fetched from the database and converted per batch
+        session: optional caller-owned session
+
+    Returns:
+        dict with "table", "format", "rows", "files", "bytes" and "path"
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+
+    model = TABLES[table]
+    _check_format(fmt)
+    schema = arrow_schema(model)
+    target = ensure_dir(export_dir) / table
+    tmp = target.with_name(f"{table}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    counts = {"rows": 0}
+
+    def batches():
+        for batch in _record_batches(model, schema, chunk_size, session=session):
+            counts["rows"] += batch.num_rows
+            yield batch
+
+    file_options = ds.IpcFileFormat().make_write_options(compression=None) if fmt == "ipc" else None
+    ds.write_dataset(
+        batches(), str(tmp), schema=schema, format=fmt, partitioning=_partitioning(schema), file_options=file_options,
+        basename_template=f"part-{{i}}.{'parquet' if fmt == 'parquet' else 'arrow'}",
+        max_rows_per_group=chunk_size, existing_data_behavior="overwrite_or_ignore",
+    )
+
+    # Swap the new export in only once it is complete
+    if target.exists():
+        shutil.rmtree(target)
+    if tmp.exists():
+        os.replace(tmp, target)
+    else:
+        target.mkdir(parents=True)  # empty table
+    (target / "_FORMAT").write_text(fmt, encoding="utf-8")
+
+    files = list(target.rglob("part-*"))
+    result = {"table": table, "format": fmt, "rows": counts["rows"], "files": len(files),
+              "bytes": sum(p.stat().st_size for p in files), "path": str(target)}
+    logger.info(f"Exported {result['rows']} {table} rows to {result['files']} {fmt} files ({target})")
+    return result
+
+
+def export_tables(tables: Sequence[str] = tuple(TABLES), fmt: str = EXPORT_FORMAT, export_dir=EXPORT_DIR,
+                  chunk_size: int = DB_STREAM_CHUNK_SIZE, session=None) -> Dict[str, Dict]:
+    """export_table() for each table; returns table -> result."""
+    return {table: export_table(table, fmt, export_dir, chunk_size, session=session) for table in tables}
+
+
+def open_export(table: str = "books", export_dir=EXPORT_DIR):
+    """
+    Open an exported table as a pyarrow.dataset.Dataset.
+
+    Files are memory-mapped instead of read, and "category" / "run_date"
+    come from the directory names, so filters on them skip whole files.
+    """
+    _pyarrow()
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    root = Path(export_dir) / table
+    marker = root / "_FORMAT"
+    if not marker.exists():
+        raise FileNotFoundError(f"No export of {table} under {export_dir} (run python -m src.export)")
+    fmt = _check_format(marker.read_text(encoding="utf-8").strip())
+    schema = arrow_schema(TABLES[table])
+    return ds.dataset(
+        str(root.resolve()), schema=schema, format=fmt,
+        partitioning=_partitioning(schema), filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def read_export(table: str = "books", columns: Optional[Sequence[str]] = None, filter=None,
+                export_dir=EXPORT_DIR):
+    """
+    Read an exported table into a pyarrow.Table.
+
+    Args:
+        table: "books" or "raw_books"
+        columns: columns to read (default: all)
+        filter: pyarrow.compute expression, e.g. pc.field("category") == "Poetry"
+        export_dir: root of the exported datasets
+
+    Returns:
+        pyarrow.Table (call .to_pandas() for a DataFrame)
+    """
+    return open_export(table, export_dir).to_table(columns=list(columns) if columns else None, filter=filter)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export books / raw_books to partitioned Parquet or Arrow IPC.")
+    parser.add_argument("--tables", nargs="+", choices=tuple(TABLES), default=list(TABLES))
+    parser.add_argument("--format", choices=FORMATS, default=EXPORT_FORMAT, dest="fmt")
+    parser.add_argument("--output", default=str(EXPORT_DIR), help="export root (default: %(default)s)")
+    args = parser.parse_args(argv)
+    for result in export_tables(args.tables, args.fmt, args.output).values():
+        print(result)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    main()
@@ -0,0 +1,274 @@
+"""
+Pipeline instrumentation: per-stage wall/CPU time, rows/s and peak memory,
+fetch latency histogram and retry counts, time spent parsing and waiting on
+the politeness throttle, DB round-trips.
+
+Recording goes through the module-level METRICS object so deep helpers
+(fetch_response, the engine event hook) don't need it passed around:
+
+    METRICS.reset(profile=False)
+    with METRICS.stage("clean") as stage:
+        cleaned = clean_rows(rows)
+        stage.rows = len(cleaned)
+    METRICS.snapshot()  # -> dict, also written by write_report()
+
+Stages with the same name accumulate (streaming runs enter them once per
+batch). Peak memory is the process max RSS by default; with profile=True
+tracemalloc runs and each stage reports its own peak of traced Python
+allocations, and cProfile captures the whole run.
+
+Worker processes of the sharded crawl keep their own counters, which are
+not merged back.
+"""
+import cProfile
+import io
+import json
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.config import REPORTS_DIR, ensure_dir
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds of the fetch latency buckets, in milliseconds
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Process high-water RSS in MB (None where the resource module is unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if peak > 1 << 32 else 1024), 1)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return float(bound)
+        return round(self.max, 1)
+
+    def to_dict(self) -> dict:
+        labels = [f"<={b}ms" for b in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max, 1),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class Stage:
+    """Accumulated measurements of one pipeline stage."""
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.calls = 0
+        self.peak_mb: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_s": round(self.wall, 3),
+            "cpu_s": round(self.cpu, 3),
+            "rows": self.rows,
+            "rows_per_s": round(self.rows / self.wall, 1) if self.wall > 0 else None,
+            "peak_mb": self.peak_mb,
+            "calls": self.calls,
+        }
+
+
+class _StageRun:
+    """Handle returned by Metrics.stage(); set `rows` to the rows the stage produced."""
+
+    def __init__(self):
+        self.rows = 0
+
+
+class Metrics:
+    """Thread-safe collector behind METRICS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, profile: bool = False) -> None:
+        """Start a new run; with profile=True start tracemalloc and cProfile."""
+        self.stop_profiling()
+        self.stages: Dict[str, Stage] = {}
+        self.counters: Dict[str, int] = {}
+        self.durations: Dict[str, float] = {}
+        self.fetch_latency = Histogram()
+        self.profile = profile
+        self._profiler = None
+        self._tracemalloc_top = None
+        self._profile_text = None
+        if profile:
+            tracemalloc.start()
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Accumulate time spent in a sub-step (e.g. parsing, throttle waits) across threads."""
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def observe_fetch(self, seconds: float) -> None:
+        """Record the latency of one HTTP attempt."""
+        with self._lock:
+            self.fetch_latency.observe(seconds)
+            self.counters["fetches"] = self.counters.get("fetches", 0) + 1
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure wall time, CPU time and peak memory of the enclosed block."""
+        run = _StageRun()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield run
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if tracemalloc.is_tracing():
+                peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            else:
+                peak = peak_rss_mb()
+            with self._lock:
+                stage = self.stages.setdefault(name, Stage())
+                stage.wall += wall
+                stage.cpu += cpu
+                stage.rows += run.rows
+                stage.calls += 1
+                if peak is not None:
+                    stage.peak_mb = max(stage.peak_mb or 0.0, peak)
+
+    def timings(self) -> Dict[str, float]:
+        return {name: round(stage.wall, 3) for name, stage in self.stages.items()}
+
+    def stop_profiling(self, top: int = 25) -> None:
+        """Stop cProfile/tracemalloc (if running) and keep their top entries for the report."""
+        profiler = getattr(self, "_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            import pstats  # only for profile=True runs (slow to import)
+
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+            self._profile_text = out.getvalue()
+            self._profiler = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            self._tracemalloc_top = [
+                {"where": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:top]
+            ]
+            tracemalloc.stop()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {
+                "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+                "fetch_latency": self.fetch_latency.to_dict(),
+                "counters": dict(self.counters),
+                "durations_s": {name: round(t, 3) for name, t in self.durations.items()},
+                "peak_rss_mb": peak_rss_mb(),
+            }
+        if self._tracemalloc_top is not None:
+            result["tracemalloc_top"] = self._tracemalloc_top
+        return result
+
+    @staticmethod
+    def format_stages(snapshot: dict) -> str:
+        """Plain-text table of the per-stage numbers of a snapshot()."""
+        lines = [f"{'stage':<11} {'wall s':>8} {'cpu s':>8} {'rows':>8} {'rows/s':>10} {'peak MB':>8}"]
+        for name, st in snapshot["stages"].items():
+            lines.append(f"{name:<11} {st['wall_s']:>8.3f} {st['cpu_s']:>8.3f} {st['rows']:>8} "
+                         f"{st['rows_per_s'] or 0:>10.1f} {st['peak_mb'] or 0:>8.1f}")
+        latency = snapshot["fetch_latency"]
+        counters = snapshot["counters"]
+        lines.append(f"fetches {latency['count']} (p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms), "
+                     f"retries {counters.get('fetch_retries', 0)}, DB round-trips {counters.get('db_roundtrips', 0)}")
+        return "\n".join(lines)
+
+    def write_report(self, summary: Optional[dict] = None, directory=None) -> Path:
+        """
+        Write the metrics (and the run summary) as JSON under REPORTS_DIR.
+
+        With profiling on, the cProfile listing is written next to it as
+        profile_<timestamp>.txt.
+        """
+        self.stop_profiling()
+        directory = ensure_dir(directory or REPORTS_DIR)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = directory / f"metrics_{stamp}.json"
+        payload = {"summary": summary, "metrics": self.snapshot()}
+        path.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
+        if self._profile_text:
+            (directory / f"profile_{stamp}.txt").write_text(self._profile_text, encoding="utf-8")
+        return path
+
+
+METRICS = Metrics()
+
+
+def _count_roundtrip(conn, cursor, statement, parameters, context, executemany):
+    METRICS.incr("db_roundtrips")
+    if executemany:
+        METRICS.incr("db_executemany")
+
+
+def instrument_engine(engine) -> None:
+    """Count every statement sent through `engine` as a DB round-trip (idempotent)."""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _count_roundtrip):
+        event.listen(engine, "before_cursor_execute", _count_roundtrip)
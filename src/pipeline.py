@@ -1,48 +1,447 @@
+import argparse
+import importlib
 import logging
+from functools import partial
+from typing import Optional
+from urllib.parse import urljoin
 # Hints:
 # - Keep imports minimal and specific to the steps below
-from src.scrape.scraper import scraper              # Step 1: scrape
-from src.db.connector import insert_raw_books, upsert_books  # Step 2 & 4: DB writes
-from src.processing.clean import clean_row          # Step 3: cleaning
+# - BeautifulSoup, requests and SQLAlchemy are only imported once a run starts (_DEFERRED),
+#   so `import src.pipeline` and `python -m src.pipeline --help` stay fast
+from src.processing.clean import clean_batch        # Step 3: cleaning (vectorized clean_row)
+from src.metrics import METRICS, instrument_engine  # per-stage timings, fetch/DB counters
+from src.checkpoint import Checkpoint                # --resume: durable progress per batch
+from src.config import (
+    BASE_URL, BOOK_INDEX_MAX_ENTRIES, CHECKPOINT_PATH, EXPORT_FORMATS as FORMATS, PARSE_WORKERS,
+    PIPELINE_BATCH_SIZE, SCRAPE_ENGINE, SCRAPE_WORKERS,
+)
 
-def run_pipeline(max_pages: int) -> dict:
+# src.scrape.scraper.BASE, without importing the scraper
+BASE = f"{BASE_URL}/"
+
+# Stage helpers imported on first use by _load_stages(). Once loaded they are
+# plain module globals, so they can still be replaced (e.g. pipeline.scraper in tests).
+_DEFERRED = {
+    "scraper": "src.scrape.scraper",                    # Step 1: scrape
+    "sharded_scraper": "src.scrape.sharded",            # Step 1 with --workers > 1
+    "async_scraper_sync": "src.scrape.async_scraper",   # Step 1 with --engine async
+    "ParsePool": "src.processing.parallel",             # Steps 1 & 2 with --parse-workers
+    "existing_hashes": "src.db.connector",              # Step 3: change detection
+    "diff_books": "src.db.connector",
+    "insert_raw_books": "src.db.connector",             # Step 4 & 5: DB writes
+    "bulk_upsert_books": "src.db.connector",
+    "record_snapshots": "src.db.history",               # Step 5: price/availability history
+    "get_session": "src.db.connector",                  # streaming: one transaction per batch
+    "chunked": "src.db.connector",
+    "get_engine": "src.db.connector",
+    "BookIndex": "src.db.book_index",                   # url -> (id, hash) of books, warmed once per run
+    "FetchIndex": "src.scrape.http_index",              # incremental: skip unchanged pages
+    "ResponseCache": "src.scrape.cache",                # on-disk response cache
+    "detect_anomalies": "src.processing.anomaly",       # optional anomaly stage
+    "load_stats": "src.processing.anomaly",
+    "check_export": "src.export",                       # --export: columnar copy for analysis
+    "export_tables": "src.export",
+}
+
+
+def _load_stages() -> None:
+    """Import the _DEFERRED helpers that are not loaded (or replaced) yet."""
+    namespace = globals()
+    for name, module in _DEFERRED.items():
+        if name not in namespace:
+            namespace[name] = getattr(importlib.import_module(module), name)
+
+
+def __getattr__(name: str):
+    # pipeline.scraper, pipeline.bulk_upsert_books, ... before the first run
+    if name in _DEFERRED:
+        _load_stages()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+STAGES = ("scrape", "clean", "diff", "raw_insert", "upsert")
+
+
+def scrape_rows(max_pages: int, index=None, cache=None, workers: int = 1, shard_by: str = "pages",
+                base_url: str = BASE, checkpoint: Optional[Checkpoint] = None,
+                scrape_engine: str = SCRAPE_ENGINE, parse_pool=None):
+    """
+    Row generator: the single-process scraper, or the sharded crawl when workers > 1.
+    With scrape_engine="async" the single-process scrape runs on the asyncio
+    engine (src.scrape.async_scraper) instead of the thread pool.
+    With a `parse_pool` the scraper parses product pages in its worker processes.
+    With a `checkpoint` the scrape starts where the checkpointed run stopped.
+    """
+    _load_stages()
+    if workers > 1:
+        return sharded_scraper(max_pages=max_pages, workers=workers, shard_by=shard_by, base_url=base_url)
+    if scrape_engine == "async":
+        scrape = async_scraper_sync
+    else:
+        scrape = partial(scraper, index=index, parse_pool=parse_pool)
+    if checkpoint is None:
+        return scrape(max_pages=max_pages, cache=cache, base_url=base_url)
+
+    start_url, pages_left, done = checkpoint.start(base_url, urljoin(base_url, "index.html"), max_pages)
+    if start_url is None or pages_left <= 0:
+        return iter(())
+    return checkpoint.track(scrape(start_path=start_url, max_pages=pages_left, cache=cache,
+                                   base_url=base_url, skip_urls=done, on_page=checkpoint.on_page))
+
+
+def clean_rows(scraped_rows, parse_pool=None) -> list:
+    """
+    Clean scraped rows in one columnar pass, dropping rows that can't be cleaned.
+    With a `parse_pool` large batches are cleaned by its worker processes.
+    """
+    if parse_pool is not None:
+        return parse_pool.clean(scraped_rows)
+    return clean_batch(scraped_rows)
+
+
+def diff_rows(cleaned_rows, session=None, book_index=None):
+    """
+    Change detection: (new or changed cleaned rows, {"new", "changed", "unchanged"},
+    stored content hashes) for one batch. With a BookIndex the stored hashes
+    come from memory instead of a SELECT.
+    """
+    _load_stages()
+    urls = (r["product_page_url"] for r in cleaned_rows)
+    if book_index is not None:
+        stored = book_index.hashes(urls, session=session)
+    else:
+        stored = existing_hashes(urls, session=session)
+    changed_rows, changes = diff_books(cleaned_rows, stored=stored)
+    return changed_rows, changes, stored
+
+
+def raw_rows_to_keep(scraped_rows, cleaned_rows, changed_rows) -> list:
+    """Scraped rows worth appending to raw_books: new or changed books, plus rows that failed cleaning."""
+    changed = {r["product_page_url"] for r in changed_rows}
+    cleaned = {r["product_page_url"] for r in cleaned_rows}
+    return [r for r in scraped_rows
+            if r.get("product_page_url") in changed or r.get("product_page_url") not in cleaned]
+
+
+def run_pipeline(max_pages: int, stream: bool = False, batch_size: int = PIPELINE_BATCH_SIZE,
+                 incremental: bool = False, cache: bool = False, anomalies: bool = False,
+                 workers: int = SCRAPE_WORKERS, shard_by: str = "pages", profile: bool = False,
+                 base_url: str = BASE, resume: bool = False, checkpoint_path=CHECKPOINT_PATH,
+                 export: Optional[str] = None, scrape_engine: str = SCRAPE_ENGINE,
+                 book_index: bool = BOOK_INDEX_MAX_ENTRIES > 0, parse_workers: int = PARSE_WORKERS) -> dict:
     """
     Returns a summary dict for quick visibility.
+
+    Books whose cleaned values did not change since the last run are
+    skipped by change detection: they are neither appended to raw_books nor
+    rewritten in books. "changes" counts new / changed / unchanged books.
+    New or changed prices/availabilities are appended to book_snapshots
+    ("snapshots" counts them).
+
+    With stream=True rows flow through the stages in micro-batches of
+    `batch_size`, each committed on its own (see run_pipeline_streaming).
+    With incremental=True unchanged pages are skipped using the local
+    FetchIndex; "unchanged" counts the books that were skipped.
+    With cache=True pages come from the on-disk ResponseCache when fresh;
+    "cache" reports its hit/miss counters.
+    With anomalies=True the upserted books are scored by detect_anomalies();
+    price jumps are only checked for books whose price moved in this run.
+    "anomalies" holds the flag counts and the CSV report path.
+    With workers > 1 the catalogue is crawled by that many processes, sharded
+    by page ranges or categories (see src.scrape.sharded). A shard that still
+    fails after SHARD_RETRIES retries fails the run with RuntimeError: in
+    batch mode nothing is stored, when streaming the batches committed so far
+    are kept.
+    base_url points the scrape at another copy of the site (e.g. the local
+    fixture server in benchmarks/server.py).
+    With resume=True the run is restartable: it streams (implies stream=True),
+    records progress in a Checkpoint at `checkpoint_path` after every
+    committed batch, and continues from an existing checkpoint instead of
+    starting at index.html; "checkpoint" reports where it started.
+    With scrape_engine="async" pages are fetched by the asyncio engine
+    (src.scrape.async_scraper, needs httpx); not combinable with incremental
+    or workers > 1.
+    With export="parquet" or "ipc", books and raw_books are written to
+    partitioned columnar files under EXPORT_DIR once the run is stored
+    (see src.export); "export" reports rows, files and bytes per table.
+    With book_index=True (default unless BOOK_INDEX_MAX_ENTRIES=0) a BookIndex
+    of books is warmed once, and change detection, upserts and snapshots
+    look books up in it instead of querying per batch; "book_index" reports
+    its hits, misses and evictions.
+    With parse_workers > 0 (-1: one per available core) product pages are
+    parsed and large batches cleaned in a ParsePool of that many processes
+    (src.processing.parallel) while fetching stays in this process; not
+    combinable with workers > 1, incremental or the async engine.
+
+    "timings" has the wall time per stage; "metrics" has the full
+    instrumentation (CPU time, rows/s, peak memory, fetch latency histogram,
+    retries, DB round-trips), also written to "metrics_report" under
+    REPORTS_DIR. profile=True adds cProfile and tracemalloc captures.
     """
+    _load_stages()
+    if workers > 1 and (incremental or cache or resume):
+        raise ValueError("workers > 1 cannot be combined with incremental, cache or resume")
+    if scrape_engine == "async" and (incremental or workers > 1):
+        raise ValueError("the async scrape engine cannot be combined with incremental or workers > 1")
+    if parse_workers and (workers > 1 or incremental or scrape_engine == "async"):
+        raise ValueError("parse_workers cannot be combined with workers > 1, incremental or the async engine")
+    if export:
+        check_export(export)
+    METRICS.reset(profile=profile)
+    instrument_engine(get_engine())
+    index = FetchIndex() if incremental else None
+    response_cache = ResponseCache() if cache else None
+    checkpoint = Checkpoint(checkpoint_path) if resume else None
+    parse_pool = ParsePool(parse_workers) if parse_workers else None
+    try:
+        books = BookIndex.warm() if book_index else None
+        if stream or resume:
+            summary = run_pipeline_streaming(max_pages, batch_size, index=index, cache=response_cache,
+                                             anomalies=anomalies, workers=workers, shard_by=shard_by,
+                                             base_url=base_url, checkpoint=checkpoint,
+                                             scrape_engine=scrape_engine, book_index=books,
+                                             parse_pool=parse_pool)
+        else:
+            summary = _run_pipeline_batch(max_pages, index=index, cache=response_cache, anomalies=anomalies,
+                                          workers=workers, shard_by=shard_by, base_url=base_url,
+                                          scrape_engine=scrape_engine, book_index=books, parse_pool=parse_pool)
+        summary["cache"] = response_cache.stats() if response_cache is not None else None
+        summary["book_index"] = books.stats() if books is not None else None
+        summary.setdefault("checkpoint", None)
+        summary["export"] = None
+        if export:
+            with METRICS.stage("export") as stage:
+                summary["export"] = export_tables(fmt=export)
+                stage.rows = sum(result["rows"] for result in summary["export"].values())
+        summary["timings"] = {**dict.fromkeys(STAGES, 0.0), **METRICS.timings()}
+        report = METRICS.write_report(summary)
+        summary["metrics"] = METRICS.snapshot()
+        summary["metrics_report"] = str(report)
+        return summary
+    finally:
+        if index is not None:
+            index.close()
+        if response_cache is not None:
+            response_cache.close()
+        if parse_pool is not None:
+            parse_pool.close()
+        METRICS.stop_profiling()
+
+
+def _run_pipeline_batch(max_pages: int, index=None, cache=None, anomalies: bool = False,
+                        workers: int = 1, shard_by: str = "pages", base_url: str = BASE,
+                        scrape_engine: str = SCRAPE_ENGINE, book_index=None, parse_pool=None) -> dict:
     # 1) SCRAPE
-    scraped_rows = list(scraper(max_pages=max_pages))
+    with METRICS.stage("scrape") as stage:
+        scraped_rows = list(scrape_rows(max_pages, index=index, cache=cache, workers=workers, shard_by=shard_by,
+                                        base_url=base_url, scrape_engine=scrape_engine, parse_pool=parse_pool))
+        stage.rows = len(scraped_rows)
     logging.info(f"Scraped {len(scraped_rows)} books")
 
-    # 2) INSERT RAW
-    raw_inserted = insert_raw_books(scraped_rows)
-    logging.info(f"Inserted {raw_inserted} raw books")
-
-    # 3) CLEAN
-    cleaned_rows = []
-    for r in scraped_rows:
-        cleaned = clean_row({
-            "title": r.get("title"),
-            "price": r.get("price"),
-            "rating": r.get("rating"),
-            "availability": r.get("availability"),
-            "product_page_url": r.get("product_page_url"),
-        })
-        if cleaned:
-            cleaned_rows.append(cleaned)
+    # 2) CLEAN
+    with METRICS.stage("clean") as stage:
+        cleaned_rows = clean_rows(scraped_rows, parse_pool=parse_pool)
+        stage.rows = len(cleaned_rows)
     logging.info(f"Cleaned {len(cleaned_rows)} books")
 
-    # 4) UPSERT CLEANED
+    # 3) DIFF: keep only new or changed books
+    with METRICS.stage("diff") as stage:
+        changed_rows, changes, stored = diff_rows(cleaned_rows, book_index=book_index)
+        stage.rows = len(changed_rows)
+    logging.info(f"Changes: {changes}")
+
+    # 4) INSERT RAW
+    with METRICS.stage("raw_insert") as stage:
+        raw_inserted = stage.rows = insert_raw_books(raw_rows_to_keep(scraped_rows, cleaned_rows, changed_rows))
+    logging.info(f"Inserted {raw_inserted} raw books")
 
-    upserted = upsert_books(cleaned_rows)
+    # 5) UPSERT CLEANED
+    with METRICS.stage("upsert") as stage:
+        counts = bulk_upsert_books(changed_rows, stored_hashes=stored, index=book_index)
+        snapshots = record_snapshots(changed_rows, index=book_index)
+        upserted = stage.rows = counts["inserted"] + counts["updated"]
     logging.info(f"Upserted {upserted} books into canonical table")
 
+    if index is not None:
+        index.commit()
+
+    # 6) ANOMALIES (optional): score only the books upserted in this run
+    anomaly_counts = None
+    if anomalies:
+        with METRICS.stage("anomalies") as stage:
+            anomaly_counts = detect_anomalies(urls=[r["product_page_url"] for r in changed_rows],
+                                              previous=snapshots)
+            stage.rows = anomaly_counts["scored"]
+
     return {
         "scraped": len(scraped_rows),
         "raw_inserted": raw_inserted,
         "cleaned": len(cleaned_rows),
         "upserted": upserted,
+        "inserted": counts["inserted"],
+        "updated": counts["updated"],
+        "changes": changes,
+        "snapshots": len(snapshots),
+        "unchanged": index.unchanged if index is not None else 0,
+        "anomalies": anomaly_counts,
     }
 
+
+def run_pipeline_streaming(max_pages: int, batch_size: int = PIPELINE_BATCH_SIZE, index=None,
+                           cache=None, anomalies: bool = False, workers: int = 1,
+                           shard_by: str = "pages", base_url: str = BASE,
+                           checkpoint: Optional[Checkpoint] = None,
+                           scrape_engine: str = SCRAPE_ENGINE, book_index=None, parse_pool=None) -> dict:
+    """
+    Streaming variant of run_pipeline with bounded memory.
+
+    Scraped rows are pulled from the scraper generator `batch_size` at a time;
+    each batch is cleaned, diffed, raw-inserted and upserted in one transaction that is
+    committed before the next batch is scraped. Only one batch is held in memory,
+    and batches committed before a crash stay in the database. With an `index`,
+    product pages are marked as seen only once their batch is committed.
+    With anomalies=True each committed batch is scored against table stats
+    loaded once (after the first commit) into a single CSV report.
+    With a `checkpoint` every committed batch is recorded in it, and the
+    checkpoint is removed once the scrape is done.
+    With a `book_index` the books written by a batch are added to it once
+    the batch is committed. With a `parse_pool` parsing (and the cleaning of
+    large batches) runs in its worker processes.
+    """
+    _load_stages()
+    summary = {"scraped": 0, "raw_inserted": 0, "cleaned": 0, "upserted": 0, "inserted": 0, "updated": 0,
+               "changes": {"new": 0, "changed": 0, "unchanged": 0}, "snapshots": 0}
+    batches = chunked(scrape_rows(max_pages, index=index, cache=cache, workers=workers, shard_by=shard_by,
+                                  base_url=base_url, checkpoint=checkpoint, scrape_engine=scrape_engine,
+                                  parse_pool=parse_pool),
+                     batch_size)
+    # Position the run started from (scrape_rows() has loaded or created the checkpoint)
+    started = checkpoint.position() if checkpoint is not None else None
+    anomaly_counts, anomaly_stats, report_path = None, None, None
+
+    while True:
+        # 1) SCRAPE (the scraper generator only does work when the next batch is pulled)
+        with METRICS.stage("scrape") as stage:
+            batch = next(batches, None)
+            stage.rows = len(batch) if batch else 0
+        if batch is None:
+            break
+
+        with get_session() as session:
+            # 2) CLEAN
+            with METRICS.stage("clean") as stage:
+                cleaned_rows = clean_rows(batch, parse_pool=parse_pool)
+                stage.rows = len(cleaned_rows)
+
+            # 3) DIFF
+            with METRICS.stage("diff") as stage:
+                changed_rows, changes, stored = diff_rows(cleaned_rows, session=session, book_index=book_index)
+                stage.rows = len(changed_rows)
+
+            # 4) INSERT RAW
+            with METRICS.stage("raw_insert") as stage:
+                raw_inserted = stage.rows = insert_raw_books(raw_rows_to_keep(batch, cleaned_rows, changed_rows),
+                                                             session=session)
+
+            # 5) UPSERT CLEANED (commit happens when the session block exits)
+            with METRICS.stage("upsert") as stage:
+                counts = bulk_upsert_books(changed_rows, session=session, stored_hashes=stored, index=book_index)
+                snapshots = record_snapshots(changed_rows, session=session, index=book_index)
+                stage.rows = counts["inserted"] + counts["updated"]
+        if book_index is not None:
+            book_index.commit()
+        if index is not None:
+            index.commit(urls=[r["product_page_url"] for r in batch])
+        if checkpoint is not None:
+            checkpoint.commit(r["product_page_url"] for r in batch)
+
+        # 6) ANOMALIES (optional)
+        if anomalies:
+            with METRICS.stage("anomalies") as stage:
+                anomaly_stats = anomaly_stats or load_stats()
+                flagged = detect_anomalies(urls=[r["product_page_url"] for r in changed_rows],
+                                           stats=anomaly_stats, report_path=report_path, previous=snapshots)
+                report_path = flagged.pop("report")
+                anomaly_counts = {k: (anomaly_counts or {}).get(k, 0) + v for k, v in flagged.items()}
+                anomaly_counts["report"] = report_path
+                stage.rows = flagged["scored"]
+
+        summary["scraped"] += len(batch)
+        summary["raw_inserted"] += raw_inserted
+        summary["cleaned"] += len(cleaned_rows)
+        summary["inserted"] += counts["inserted"]
+        summary["updated"] += counts["updated"]
+        summary["upserted"] += counts["inserted"] + counts["updated"]
+        summary["snapshots"] += len(snapshots)
+        for key, n in changes.items():
+            summary["changes"][key] += n
+        logging.info(f"Committed batch of {len(batch)} books ({summary['scraped']} so far)")
+
+    if index is not None:
+        index.commit(urls=[])  # listing pages, and product pages whose body did not change
+    summary["unchanged"] = index.unchanged if index is not None else 0
+    if checkpoint is not None:
+        summary["checkpoint"] = {**started, "batches": len(checkpoint.state["batches"]) - started["batches"]}
+        checkpoint.finish()
+    summary["anomalies"] = anomaly_counts
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape books.toscrape.com, clean and store the results.")
+    parser.add_argument("--max-pages", type=int, default=1, help="listing pages to scrape (default: 1)")
+    parser.add_argument("--stream", action="store_true",
+                        help="process and commit rows in micro-batches instead of all at once")
+    parser.add_argument("--batch-size", type=int, default=PIPELINE_BATCH_SIZE,
+                        help=f"rows per micro-batch with --stream (default: {PIPELINE_BATCH_SIZE})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="use conditional GETs and skip books whose pages did not change")
+    parser.add_argument("--cache", action="store_true",
+                        help="serve pages from the on-disk response cache (HTTP_CACHE_TTL) when fresh")
+    parser.add_argument("--anomalies", action="store_true",
+                        help="flag suspicious prices, ratings, stock counts and price jumps (CSV under reports/)")
+    parser.add_argument("--workers", type=int, default=SCRAPE_WORKERS,
+                        help="crawl processes; > 1 enables the sharded crawl (capped by SCRAPE_MAX_WORKERS)")
+    parser.add_argument("--shard-by", choices=("pages", "categories"), default="pages",
+                        help="with --workers: shard by catalogue page ranges or by category")
+    parser.add_argument("--base-url", default=BASE,
+                        help="site root to scrape (default: %(default)s; e.g. the benchmarks/server.py fixture server)")
+    parser.add_argument("--profile", action="store_true",
+                        help="also capture cProfile and tracemalloc (written next to the metrics JSON)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"checkpoint every committed batch to {CHECKPOINT_PATH.name} and continue an "
+                             "interrupted run from it (implies --stream)")
+    parser.add_argument("--engine", choices=("threads", "async"), default=SCRAPE_ENGINE,
+                        help="scrape with the thread pool (requests) or the asyncio engine (httpx, HTTP/2); "
+                             "the async engine keeps up to SCRAPE_IN_FLIGHT requests in flight")
+    parser.add_argument("--export", choices=FORMATS,
+                        help="after the run, export books and raw_books to partitioned Parquet / Arrow IPC "
+                             "files under EXPORT_DIR (needs pyarrow)")
+    parser.add_argument("--no-book-index", dest="book_index", action="store_false",
+                        help="query books per batch instead of warming the in-memory url -> (id, hash) index")
+    parser.add_argument("--parse-workers", type=int, nargs="?", const=-1, default=PARSE_WORKERS, metavar="N",
+                        help="parse product pages and clean large batches in N processes (alone: one per "
+                             "available core) while fetching continues in this one")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if args.workers > 1 and (args.incremental or args.cache or args.resume):
+        parser.error("--workers > 1 cannot be combined with --incremental, --cache or --resume")
+    if args.engine == "async" and (args.incremental or args.workers > 1):
+        parser.error("--engine async cannot be combined with --incremental or --workers > 1")
+    if args.parse_workers and (args.workers > 1 or args.incremental or args.engine == "async"):
+        parser.error("--parse-workers cannot be combined with --workers > 1, --incremental or --engine async")
+
+    summary = run_pipeline(args.max_pages, stream=args.stream, batch_size=args.batch_size,
+                           incremental=args.incremental, cache=args.cache, anomalies=args.anomalies,
+                           workers=args.workers, shard_by=args.shard_by, profile=args.profile,
+                           base_url=args.base_url, resume=args.resume, export=args.export,
+                           scrape_engine=args.engine, book_index=args.book_index,
+                           parse_workers=args.parse_workers)
+    metrics = summary.pop("metrics")
+    print(summary)
+    print(METRICS.format_stages(metrics))
+
+
 if __name__ == "__main__":
-    summary = run_pipeline(1)
-    print(summary)
\ No newline at end of file
+    main()
@@ -0,0 +1,291 @@
+"""
+Anomaly detection over the canonical `books` table.
+
+Each book gets a bitmask of flags, computed with numpy over one chunk of rows
+at a time so the table is never loaded fully into memory:
+
+    PRICE_INVALID         price missing, not finite or <= 0
+    PRICE_OUTLIER         |z| of price within its category above ANOMALY_Z_THRESHOLD
+                          (books without a category, or in one of fewer than
+                          ANOMALY_MIN_CATEGORY_SIZE priced books, use the global stats)
+    RATING_INVALID        rating missing or outside 1..5
+    AVAILABILITY_OUTLIER  |z| of the stock count above ANOMALY_Z_THRESHOLD
+    PRICE_JUMP            relative change vs the previous price above ANOMALY_PRICE_JUMP
+
+Means and standard deviations come from one SQL GROUP BY, so
+scoring only the rows upserted in this run (`urls=...`) still compares them
+against the whole table. The previous price of a book comes from its
+book_snapshots history (src.db.history). The pipeline passes the prices
+record_snapshots() replaced in this run (`previous=...`), so only books
+whose price or availability moved now can get PRICE_JUMP, and a later
+title-only change does not flag the same move again. Without them, the
+snapshot before the newest one is used (the book's last move).
+
+With a columnar export (src.export) on disk, load_stats_from_export()
+computes the same statistics from the memory-mapped books files instead.
+
+Flagged books are appended to a CSV report under REPORTS_DIR.
+"""
+import csv
+import logging
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from sqlalchemy import func, select
+
+from src.config import (
+    ANOMALY_CHUNK_SIZE, ANOMALY_MIN_CATEGORY_SIZE, ANOMALY_PRICE_JUMP, ANOMALY_Z_THRESHOLD, EXPORT_DIR, REPORTS_DIR,
+    ensure_dir,
+)
+from src.db.connector import chunked, session_scope
+from src.db.history import previous_price
+from src.db.models import Book
+
+logger = logging.getLogger(__name__)
+
+PRICE_INVALID = 1
+PRICE_OUTLIER = 2
+RATING_INVALID = 4
+AVAILABILITY_OUTLIER = 8
+PRICE_JUMP = 16
+
+FLAG_NAMES = {
+    PRICE_INVALID: "price_invalid",
+    PRICE_OUTLIER: "price_outlier",
+    RATING_INVALID: "rating_invalid",
+    AVAILABILITY_OUTLIER: "availability_outlier",
+    PRICE_JUMP: "price_jump",
+}
+
+REPORT_COLUMNS = ("id", "product_page_url", "category", "price", "previous_price", "rating",
+                  "availability", "flags")
+
+# SQLite allows 32766 bound parameters per statement; stay well below it
+_URL_LOOKUP_SIZE = 1000
+
+
+class Stats(NamedTuple):
+    """Table-wide statistics the z-scores are computed against."""
+    price_mean: float
+    price_std: float
+    availability_mean: float
+    availability_std: float
+    by_category: Dict[str, tuple]  # category -> (price mean, price std)
+
+
+def _mean_std(count, total, total_sq):
+    if not count:
+        return math.nan, math.nan
+    mean = total / count
+    return mean, math.sqrt(max(total_sq / count - mean * mean, 0.0))
+
+
+def load_stats(session=None) -> Stats:
+    """Price and availability mean/std per category and globally, from a single aggregate query."""
+    with session_scope(session) as s:
+        per_category = s.connection().execute(
+            select(
+                Book.category,
+                func.count(Book.price), func.sum(Book.price), func.sum(Book.price * Book.price),
+                func.count(Book.availability), func.sum(Book.availability),
+                func.sum(Book.availability * Book.availability),
+            ).group_by(Book.category)
+        ).all()
+    return _stats(per_category)
+
+
+def load_stats_from_export(export_dir=EXPORT_DIR) -> Stats:
+    """
+    load_stats() computed from the columnar books export (src.export) instead
+    of the database: only the category, price and availability columns are
+    read, from memory-mapped files.
+    """
+    import pyarrow.compute as pc
+
+    from src.export import read_export
+
+    table = read_export("books", columns=["category", "price", "availability"], export_dir=export_dir)
+    table = table.append_column("price_sq", pc.multiply(table["price"], table["price"]))
+    table = table.append_column("availability_sq", pc.multiply(table["availability"], table["availability"]))
+    grouped = table.group_by("category").aggregate([
+        ("price", "count"), ("price", "sum"), ("price_sq", "sum"),
+        ("availability", "count"), ("availability", "sum"), ("availability_sq", "sum"),
+    ])
+    names = ("category", "price_count", "price_sum", "price_sq_sum",
+             "availability_count", "availability_sum", "availability_sq_sum")
+    return _stats(list(zip(*(grouped[name].to_pylist() for name in names))))
+
+
+def _stats(per_category) -> Stats:
+    """Stats from (category, price count/sum/sum of squares, availability count/sum/sum of squares) rows."""
+    # Global sums are the sums of the per-category sums
+    totals = [sum(row[i] or 0 for row in per_category) for i in range(1, 7)]
+    price_mean, price_std = _mean_std(*totals[:3])
+    availability_mean, availability_std = _mean_std(*totals[3:])
+    by_category = {
+        row[0]: _mean_std(row[1], row[2], row[3])
+        for row in per_category
+        if row[0] is not None and row[1] >= ANOMALY_MIN_CATEGORY_SIZE
+    }
+    return Stats(price_mean, price_std, availability_mean, availability_std, by_category)
+
+
+def previous_prices(urls, session=None) -> Dict[str, Optional[float]]:
+    """
+    Price of each book before its latest change, from book_snapshots
+    (books with fewer than two snapshots are absent).
+
+    Args:
+        urls: list of product URLs, or a select() of product URLs (resolved in SQL)
+        session: optional caller-owned session
+
+    Returns:
+        dict url -> previous price
+    """
+    batches = chunked(urls, _URL_LOOKUP_SIZE) if isinstance(urls, list) else [urls]
+    previous = previous_price(Book.id)
+    prices = {}
+    with session_scope(session) as s:
+        conn = s.connection()
+        for batch in batches:
+            rows = conn.execute(select(Book.product_page_url, previous).where(Book.product_page_url.in_(batch)))
+            prices.update((url, price) for url, price in rows if price is not None)
+    return prices
+
+
+def _zscore(values, mean, std):
+    import numpy as np
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (values - mean) / std
+    return np.where(np.isfinite(z), np.abs(z), 0.0)
+
+
+def score_chunk(rows, stats: Stats, previous: Dict[str, Optional[float]]):
+    """
+    Flag bitmask per row for one chunk of books rows.
+
+    Args:
+        rows: sequence of (id, product_page_url, category, price, rating, availability)
+        stats: table-wide statistics from load_stats()
+        previous: url -> previous price (from previous_prices())
+
+    Returns:
+        (flags, previous_price) numpy arrays aligned with `rows`
+    """
+    import numpy as np
+    import pandas as pd
+
+    _, urls, categories, prices, ratings, availabilities = zip(*rows)
+    # None becomes NaN in float arrays
+    price = np.array(prices, dtype=float)
+    rating = np.array(ratings, dtype=float)
+    availability = np.array(availabilities, dtype=float)
+    prev = np.array([previous.get(url) for url in urls], dtype=float)
+
+    # Per-category mean/std through the category codes; small categories use the global stats
+    codes, uniques = pd.factorize(pd.Series(categories, dtype=object), use_na_sentinel=False)
+    fallback = (stats.price_mean, stats.price_std)
+    category_stats = np.array([stats.by_category.get(c, fallback) for c in uniques], dtype=float).reshape(-1, 2)
+    price_mean, price_std = category_stats[codes, 0], category_stats[codes, 1]
+
+    flags = np.zeros(len(rows), dtype=np.int64)
+    flags[~(np.isfinite(price) & (price > 0))] |= PRICE_INVALID
+    flags[_zscore(price, price_mean, price_std) > ANOMALY_Z_THRESHOLD] |= PRICE_OUTLIER
+    flags[~((rating >= 1) & (rating <= 5))] |= RATING_INVALID
+    flags[_zscore(availability, stats.availability_mean, stats.availability_std) > ANOMALY_Z_THRESHOLD] |= AVAILABILITY_OUTLIER
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jump = np.abs(price - prev) / prev
+    flags[np.isfinite(jump) & (prev > 0) & (jump > ANOMALY_PRICE_JUMP)] |= PRICE_JUMP
+    return flags, prev
+
+
+def _book_chunks(urls: Optional[Iterable[str]], chunk_size: int, session,
+                 previous: Optional[Dict[int, Optional[float]]] = None):
+    """
+    Yield (rows, previous prices) per chunk of books.
+
+    The whole table is walked by keyset pagination on id, and the previous
+    prices of a chunk are looked up with one query over its id range.
+    With `previous` (book id -> price) the prices come from it instead.
+    """
+    conn = session.connection()
+    columns = (Book.id, Book.product_page_url, Book.category, Book.price, Book.rating, Book.availability)
+    if urls is not None:
+        for batch in chunked(dict.fromkeys(urls), _URL_LOOKUP_SIZE):
+            rows = conn.execute(select(*columns).where(Book.product_page_url.in_(batch))).all()
+            if rows and previous is not None:
+                yield rows, {r[1]: previous[r[0]] for r in rows if previous.get(r[0]) is not None}
+            elif rows:
+                yield rows, previous_prices([r[1] for r in rows], session=session)
+        return
+
+    last_id = 0
+    while True:
+        rows = conn.execute(select(*columns).where(Book.id > last_id).order_by(Book.id).limit(chunk_size)).all()
+        if not rows:
+            return
+        chunk_urls = select(Book.product_page_url).where(Book.id.between(rows[0][0], rows[-1][0]))
+        yield rows, previous_prices(chunk_urls, session=session)
+        last_id = rows[-1][0]
+
+
+def detect_anomalies(urls: Optional[Iterable[str]] = None, chunk_size: int = ANOMALY_CHUNK_SIZE,
+                     stats: Optional[Stats] = None, report_path=None, session=None,
+                     previous: Optional[Dict[int, Optional[float]]] = None) -> dict:
+    """
+    Score books and write the flagged ones to a CSV report.
+
+    Args:
+        urls: only score these product URLs (e.g. the rows upserted in this run);
+            None scores the whole table
+        chunk_size: books rows read and scored per chunk
+        stats: precomputed load_stats() result (reused across micro-batches)
+        report_path: CSV to append flagged rows to
+            (default: REPORTS_DIR/anomalies_<timestamp>.csv)
+        session: optional caller-owned session
+        previous: with `urls`, book id -> price before this run (the
+            record_snapshots() result); only these books are checked for
+            PRICE_JUMP. None uses the book_snapshots history
+
+    Returns:
+        dict with "scored", "flagged", a count per flag name and "report"
+    """
+    import numpy as np
+
+    if report_path is None:
+        report_path = REPORTS_DIR / f"anomalies_{datetime.now():%Y%m%d_%H%M%S}.csv"
+    report_path = Path(report_path)
+    ensure_dir(report_path.parent)
+    counts = {"scored": 0, "flagged": 0, **dict.fromkeys(FLAG_NAMES.values(), 0)}
+
+    with session_scope(session) as s:
+        if stats is None:
+            stats = load_stats(session=s)
+        new_file = not report_path.exists()
+        with report_path.open("a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(REPORT_COLUMNS)
+            for rows, prices in _book_chunks(urls, chunk_size, s, previous):
+                flags, prev = score_chunk(rows, stats, prices)
+                counts["scored"] += len(rows)
+                for bit, name in FLAG_NAMES.items():
+                    counts[name] += int(np.count_nonzero(flags & bit))
+                for i in np.flatnonzero(flags):
+                    row_id, url, category, price, rating, availability = rows[i]
+                    names = "|".join(name for bit, name in FLAG_NAMES.items() if flags[i] & bit)
+                    previous_price = None if math.isnan(prev[i]) else float(prev[i])
+                    writer.writerow((row_id, url, category, price, previous_price, rating, availability, names))
+                    counts["flagged"] += 1
+
+    counts["report"] = str(report_path)
+    logger.info(f"Scored {counts['scored']} books, flagged {counts['flagged']} ({report_path})")
+    return counts
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    print(detect_anomalies())
@@ -1,14 +1,23 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, List
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Compiled once; shared by the scalar helpers and the columnar clean_frame
+NUMBER_RE = re.compile(r"(\d+(?:\.\d+)?)")
+INTEGER_RE = re.compile(r"(\d+)")
+
+WORD_TO_NUM = {
+    "zero": 0, "one": 1, "two": 2, "three": 3,
+    "four": 4, "five": 5
+}
+
 def to_price(raw_price: Optional[str]) -> Optional[float]:
     if not raw_price:
         return None
     try:
-        match = re.search(r"(\d+(?:\.\d+)?)", raw_price)
+        match = NUMBER_RE.search(raw_price)
         if match:
             return float(match.group(1))
         cleaned_price = (
@@ -31,18 +40,14 @@ def to_rating(raw_rating: Optional[str]) -> Optional[int]:
     if not raw_rating:
         return None
     
-    word_to_num = {
-        "zero": 0, "one": 1, "two": 2, "three": 3, 
-        "four": 4, "five": 5
-    }
     #string
     raw_lower = raw_rating.strip().lower()
     
-    if raw_lower in word_to_num:
-        return word_to_num[raw_lower]
+    if raw_lower in WORD_TO_NUM:
+        return WORD_TO_NUM[raw_lower]
     #numeric
     try:
-        match = re.search(r'(\d+(?:\.\d+)?)', raw_rating) #regex
+        match = NUMBER_RE.search(raw_rating) #regex
         if match:
             num = float(match.group(1))
             if 0 <= num <= 5:
@@ -69,7 +74,7 @@ def to_availability(raw_availability: Optional[str]) -> Optional[int]:
     if "out of stock" in text or "unavailable" in text:
         return None
 
-    match = re.search(r"(\d+)", text)
+    match = INTEGER_RE.search(text)
     if match:
         try:
             return int(match.group(1))
@@ -84,6 +89,17 @@ def to_availability(raw_availability: Optional[str]) -> Optional[int]:
     return None
 
 
+def to_category(raw_category: Optional[str]) -> Optional[str]:
+    """
+    Examples:
+        "  Poetry " -> "Poetry"
+        "" -> None
+    """
+    if not isinstance(raw_category, str):
+        return None
+    return raw_category.strip() or None
+
+
 #{'title': 'A Light in the Attic', 'price': 'Â£51.77',
 #  'availability': 'In stock', 'rating': 3, 
 # 'product_page_url': 'https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html'}
@@ -113,6 +129,182 @@ def clean_row(row: Dict) -> Optional[Dict]:
         "price": to_price(price_raw),
         "rating": to_rating(rating_str),
         "availability": to_availability(availability_raw),
+        "category": to_category(row.get("category")),
         "product_page_url": url,
     }
-    
\ No newline at end of file
+
+
+# ---------------------------------------------------------------------------
+# Columnar cleaning: same results as clean_row, computed over a whole batch.
+# Raw values repeat a lot (a few hundred prices, five rating words, a handful
+# of availability strings), so each column is dictionary-encoded with
+# pd.factorize, the scalar helper runs once per distinct value, and the
+# results are broadcast back with a numpy take.
+# pandas/numpy are imported lazily so `import src.processing.clean` stays cheap.
+# ---------------------------------------------------------------------------
+
+def _clean_distinct(values, fn):
+    """
+    Apply `fn` once per distinct value of `values`.
+    Returns (results, codes); missing values (None/NaN) get code -1, which
+    indexes the trailing None appended to results.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    return [fn(u) for u in uniques] + [None], codes
+
+
+def _take(results, codes) -> list:
+    """Broadcast per-distinct results back to one Python object per row."""
+    import numpy as np
+
+    table = np.empty(len(results), dtype=object)
+    table[:] = results
+    return table[codes].tolist()
+
+
+def _float_column(results, codes):
+    import numpy as np
+
+    table = np.array([np.nan if r is None else r for r in results], dtype="float64")
+    return table[codes]
+
+
+def _int_column(results, codes):
+    import numpy as np
+    import pandas as pd
+
+    table = np.array([0 if r is None else r for r in results], dtype="int64")
+    missing = np.array([r is None for r in results], dtype=bool)
+    return pd.arrays.IntegerArray(table[codes], missing[codes])
+
+
+def _required(values) -> List[str]:
+    """`(value or "").strip()` for title / product_page_url; NaN counts as missing."""
+    return [v.strip() if isinstance(v, str) else "" for v in values]
+
+
+def _clean_columns(titles, urls, prices, ratings, availabilities, categories):
+    """
+    Core of clean_frame / clean_batch over aligned raw columns
+    (raw price/rating/availability already coalesced as clean_row does).
+    Returns (titles, urls, keep mask, {column: (distinct results, codes)}).
+    """
+    import numpy as np
+
+    titles, urls = _required(titles), _required(urls)
+    keep = np.fromiter((bool(t and u) for t, u in zip(titles, urls)), dtype=bool, count=len(titles))
+
+    encoded = {
+        "price": _clean_distinct(prices, to_price),
+        # clean_row passes str(rating_raw) to to_rating
+        "rating": _clean_distinct(ratings, lambda r: to_rating(str(r))),
+        "availability": _clean_distinct(availabilities, to_availability),
+        "category": _clean_distinct(categories, to_category),
+    }
+    return titles, urls, keep, encoded
+
+
+def clean_frame(df):
+    """
+    Columnar clean_row: clean a whole DataFrame of raw rows at once.
+
+    Accepts scraper-shaped (price, rating, availability) and/or DB-shaped
+    (price_raw, rating_raw, availability_raw) columns. Rows without title or
+    product_page_url are dropped; the original index is kept so results can be
+    matched back to their raw rows.
+
+    Returns a DataFrame with title, price (float64, NaN for None),
+    rating and availability (nullable Int64), category and product_page_url.
+    """
+    import pandas as pd
+
+    def column(raw_col, col=None):
+        # Series equivalent of `row[raw_col] if row[raw_col] is not None else row[col]`
+        raw = df[raw_col] if raw_col in df else None
+        value = df[col] if col in df else None
+        if raw is None and value is None:
+            return [None] * len(df)
+        if raw is None:
+            return value.to_numpy(dtype=object)
+        if value is None:
+            return raw.to_numpy(dtype=object)
+        return raw.where(raw.notna(), value).to_numpy(dtype=object)
+
+    titles, urls, keep, encoded = _clean_columns(
+        column("title"), column("product_page_url"),
+        column("price_raw", "price"), column("rating_raw", "rating"),
+        column("availability_raw", "availability"), column("category"),
+    )
+    cleaned = pd.DataFrame({
+        "title": pd.Series(titles, index=df.index, dtype=object),
+        "price": _float_column(*encoded["price"]),
+        "rating": _int_column(*encoded["rating"]),
+        "availability": _int_column(*encoded["availability"]),
+        "category": pd.Series(_take(*encoded["category"]), index=df.index, dtype=object),
+        "product_page_url": pd.Series(urls, index=df.index, dtype=object),
+    }, index=df.index)
+    return cleaned[keep]
+
+
+def frame_to_rows(cleaned) -> List[Dict]:
+    """Convert a clean_frame result back to clean_row-shaped dicts (None, int, float)."""
+    import pandas as pd
+
+    def values(series):
+        return [None if v is pd.NA or v != v else v for v in series.astype(object).tolist()]
+
+    return [
+        {"title": t, "price": p, "rating": None if r is None else int(r),
+         "availability": None if a is None else int(a), "category": c, "product_page_url": u}
+        for t, p, r, a, c, u in zip(cleaned["title"].tolist(), values(cleaned["price"]), values(cleaned["rating"]),
+                                    values(cleaned["availability"]), values(cleaned["category"]),
+                                    cleaned["product_page_url"].tolist())
+    ]
+
+
+# Column order of the tuples clean_columns() returns (clean_row's keys)
+CLEAN_COLUMNS = ("title", "price", "rating", "availability", "category", "product_page_url")
+
+
+def batch_columns(rows: Iterable[Dict]) -> tuple:
+    """
+    Raw (titles, urls, prices, ratings, availabilities, categories) lists of a
+    batch, with price/rating/availability coalesced from the *_raw keys as
+    clean_row does.
+    """
+    rows = [r for r in rows if r]
+
+    def coalesce(raw_key, key):
+        return [v if (v := r.get(raw_key)) is not None else r.get(key) for r in rows]
+
+    return ([r.get("title") for r in rows], [r.get("product_page_url") for r in rows],
+            coalesce("price_raw", "price"), coalesce("rating_raw", "rating"),
+            coalesce("availability_raw", "availability"), [r.get("category") for r in rows])
+
+
+def clean_columns(columns: tuple) -> List[tuple]:
+    """
+    clean_batch() over batch_columns() output, returning one CLEAN_COLUMNS
+    tuple per kept row (cheap to pickle: used by the parse/clean process pool).
+    """
+    if not columns[0]:
+        return []
+    titles, urls, keep, encoded = _clean_columns(*columns)
+    return [
+        (t, p, r, a, c, u)
+        for t, p, r, a, c, u, k in zip(titles, _take(*encoded["price"]), _take(*encoded["rating"]),
+                                       _take(*encoded["availability"]), _take(*encoded["category"]), urls,
+                                       keep.tolist())
+        if k
+    ]
+
+
+def clean_batch(rows: Iterable[Dict]) -> List[Dict]:
+    """
+    Batch equivalent of `[c for c in map(clean_row, rows) if c]`.
+    Same column kernel as clean_frame, without building a DataFrame.
+    """
+    return [dict(zip(CLEAN_COLUMNS, cleaned)) for cleaned in clean_columns(batch_columns(rows))]
@@ -0,0 +1,109 @@
+"""
+Process pool for the CPU-bound stages (--parse-workers).
+
+Parsing product pages and cleaning rows are pure CPU work, and in a plain
+run they share one core with the fetch loop. A ParsePool moves them to
+worker processes while fetching stays in the main process:
+
+    scraper(parse_pool=pool)   the product pages of a listing page are
+                               fetched by the scraper's thread pool as
+                               before, then parsed in one pool task while
+                               the main process fetches the next pages
+    pool.clean(rows)           a batch of at least PARALLEL_CLEAN_MIN_ROWS
+                               rows is split into one column chunk per
+                               worker and cleaned with clean_columns()
+
+Only tuples and lists of strings and numbers cross the process boundary
+(HTML strings in, (category, availability) tuples out; raw columns in,
+cleaned row tuples out), never a dict per row. Workers use the platform's
+default start method, like the sharded crawl, and are all started (and
+import the parser) when the pool is created, before the scraper starts
+its fetch threads.
+
+Run:
+    python -m src.pipeline --max-pages 50 --cache --parse-workers
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.config import PARALLEL_CLEAN_MIN_ROWS, PARSE_AHEAD_PAGES, PARSE_WORKERS
+from src.processing.clean import CLEAN_COLUMNS, batch_columns, clean_batch, clean_columns
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> int:
+    """Cores this process may run on (its CPU affinity where the OS reports one)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        return os.cpu_count() or 1
+
+
+def _init_worker() -> None:
+    import src.scrape.scraper  # noqa: F401  (bs4 and the parser backend, once per worker)
+
+
+def parse_details_chunk(pages: Tuple[Optional[str], ...]) -> Tuple[Tuple[Optional[str], Optional[str]], ...]:
+    """(category, availability) per product page HTML; (None, None) for a missing or unparsable page."""
+    from src.scrape.scraper import parse_product_details
+
+    details = []
+    for html in pages:
+        try:
+            details.append(parse_product_details(html) if html is not None else (None, None))
+        except Exception as e:
+            logger.warning(f"Could not parse product page: {e!r}")
+            details.append((None, None))
+    return tuple(details)
+
+
+class ParsePool:
+    """ProcessPoolExecutor for product-page parsing and batch cleaning (use as a context manager)."""
+
+    def __init__(self, workers: int = PARSE_WORKERS, ahead: int = PARSE_AHEAD_PAGES,
+                 clean_min_rows: int = PARALLEL_CLEAN_MIN_ROWS):
+        """
+        Args:
+            workers: worker processes; -1 for one per available core
+            ahead: listing pages parsed ahead of the consumer, per worker
+            clean_min_rows: smaller batches are cleaned in this process
+        """
+        self.workers = available_cores() if workers < 0 else workers
+        if self.workers < 1:
+            raise ValueError("ParsePool needs at least one worker")
+        self.ahead = max(1, ahead * self.workers)
+        self.clean_min_rows = clean_min_rows
+        self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(),
+                                             initializer=_init_worker)
+        # One no-op per worker: start them now rather than from inside a running scrape
+        for future in [self._executor.submit(int) for _ in range(self.workers)]:
+            future.result()
+
+    def submit_details(self, pages: Sequence[Optional[str]]) -> Future:
+        """Parse product pages in a worker; the future resolves to parse_details_chunk()'s tuple."""
+        return self._executor.submit(parse_details_chunk, tuple(pages))
+
+    def clean(self, rows: Iterable[Dict]) -> List[Dict]:
+        """clean_batch(), split over the workers when the batch is large enough to pay for it."""
+        rows = list(rows)
+        if self.workers < 2 or len(rows) < self.clean_min_rows:
+            return clean_batch(rows)
+        columns = batch_columns(rows)
+        size = -(-len(columns[0]) // self.workers)
+        chunks = [tuple(column[start:start + size] for column in columns)
+                  for start in range(0, len(columns[0]), size)]
+        return [dict(zip(CLEAN_COLUMNS, row))
+                for cleaned in self._executor.map(clean_columns, chunks) for row in cleaned]
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
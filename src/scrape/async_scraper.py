@@ -0,0 +1,243 @@
+"""
+Asyncio scrape engine (--engine async).
+
+async_scraper() yields the same rows as scraper(), in the same listing order,
+but fetches product pages as coroutines on one httpx.AsyncClient: connections
+are kept alive and, when the `h2` package is installed, requests to a host are
+multiplexed over HTTP/2. Up to `in_flight` requests run at once, each costing
+a coroutine and a stream instead of a thread and a socket.
+
+Listing pages are read ahead while earlier product pages are still being
+fetched, with at most 2 * in_flight product requests scheduled but not yet
+yielded, so memory stays bounded. Every request still goes through the
+adaptive per-host RateLimiter (acquire_async), so in_flight is a ceiling, not
+a target: the politeness limit decides how many requests are really open.
+
+async_scraper_sync() runs the engine on an event loop in a background thread
+and is a plain generator with scraper()'s arguments, so run_pipeline() and
+Checkpoint.track() use it unchanged.
+
+httpx is optional: it is only imported when the async engine is used.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+from src.config import SCRAPE_IN_FLIGHT
+from src.metrics import METRICS
+from src.scrape.cache import ResponseCache
+from src.scrape.ratelimit import RateLimiter
+from src.scrape.scraper import BASE, HEADERS, build_row, parse_listing_page, parse_product_details, _retry_after
+
+logger = logging.getLogger(__name__)
+
+
+def make_async_client(in_flight: int = SCRAPE_IN_FLIGHT, http2: bool = True, timeout: float = 10.0):
+    """
+    httpx.AsyncClient with keep-alive connections for up to `in_flight`
+    requests, speaking HTTP/2 when asked to and `h2` is installed.
+    """
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError("The async scrape engine needs httpx: pip install 'httpx[http2]'") from e
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.info("h2 not installed: the async engine uses HTTP/1.1")
+            http2 = False
+    return httpx.AsyncClient(
+        http2=http2, headers=HEADERS, timeout=timeout, follow_redirects=True,
+        limits=httpx.Limits(max_connections=in_flight, max_keepalive_connections=in_flight),
+    )
+
+
+async def fetch_async(client, url: str, throttle: RateLimiter, cache: Optional[ResponseCache] = None,
+                      retries: int = 3) -> str:
+    """
+    Async counterpart of fetch(): cache lookup, then GET with the same retry,
+    backoff and rate-limiter bookkeeping as fetch_response().
+
+    Raises:
+        httpx.HTTPError: If all retry attempts fail
+    """
+    import httpx
+
+    if cache is not None:
+        html = cache.get(url)
+        if html is not None:
+            return html
+
+    not_before = 0.0
+    for attempt in range(1, retries + 1):
+        with METRICS.timed("throttle_wait"):
+            await throttle.acquire_async(url, not_before)
+        response = None
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            html = response.text
+            break
+        except httpx.HTTPError as exc:
+            response = response if response is not None else getattr(exc, "response", None)
+            logging.warning(f"Fetch failed (attempt {attempt}/{retries}) for {url}: {exc!r}")
+            if attempt == retries:
+                METRICS.incr("fetch_failures")
+                logging.error(f"Failed to fetch {url} after {retries} attempts")
+                raise
+            METRICS.incr("fetch_retries")
+            # The slot is released below; the retry waits in acquire_async() without holding it
+            not_before = time.monotonic() + (_retry_after(response) or 2 ** attempt)
+        finally:
+            elapsed = time.perf_counter() - started
+            METRICS.observe_fetch(elapsed)
+            status = response.status_code if response is not None else None
+            if status == 429:
+                METRICS.incr("fetch_throttled")
+            throttle.release(url, elapsed, status, _retry_after(response))
+
+    if cache is not None:
+        cache.put(url, html)
+    return html
+
+
+async def fetch_product_details_async(client, product_url: Optional[str], throttle: RateLimiter,
+                                      cache: Optional[ResponseCache] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Async counterpart of fetch_product_details(): (category, availability), (None, None) on failure."""
+    if not product_url:
+        return None, None
+    try:
+        html = await fetch_async(client, product_url, throttle, cache)
+        with METRICS.timed("parse"):
+            return parse_product_details(html)
+    except Exception as e:
+        logging.warning(f"Could not fetch product details for {product_url}: {e!r}")
+        return None, None
+
+
+async def async_scraper(start_path: str = "index.html", max_pages: int = 1, in_flight: Optional[int] = None,
+                        client=None, cache: Optional[ResponseCache] = None, base_url: str = BASE,
+                        limiter: Optional[RateLimiter] = None, skip_urls: Optional[Set[str]] = None,
+                        on_page: Optional[Callable[[str, Optional[str], List[str]], None]] = None,
+                        http2: bool = True) -> AsyncIterator[Dict[str, Optional[str]]]:
+    """
+    Scrape books.toscrape.com like scraper(), with async requests.
+
+    Args:
+        start_path: Starting path for scraping (default: "index.html")
+        max_pages: Maximum number of listing pages to scrape (default: 1)
+        in_flight: Max requests in flight (default: SCRAPE_IN_FLIGHT)
+        client: httpx.AsyncClient to use (default: make_async_client(), closed at the end)
+        cache: Optional ResponseCache shared by listing and product fetches
+        base_url: Site root `start_path` is resolved against (default: BASE)
+        limiter: RateLimiter to share with other scrapes (default: a new one
+            allowing `in_flight` requests in flight)
+        skip_urls: Product URLs not to fetch or yield (already saved by a resumed run)
+        on_page: Called as on_page(page_url, next_url, product_urls) for every
+            listing page, before any of its rows is yielded and after every
+            row of the previous page was
+        http2: Use HTTP/2 when `h2` is installed (default: True)
+
+    Yields:
+        Dict: Book information including title, price, rating, availability, url, and category
+    """
+    in_flight = in_flight or SCRAPE_IN_FLIGHT
+    own_client = client is None
+    client = client or make_async_client(in_flight, http2=http2)
+    throttle = limiter or RateLimiter(max_concurrency=in_flight)
+    slots = asyncio.Semaphore(in_flight)
+    # Product requests scheduled ahead of the consumer (read-ahead bound)
+    ahead = asyncio.Semaphore(2 * in_flight)
+    items: asyncio.Queue = asyncio.Queue()
+    tasks: Set[asyncio.Task] = set()
+
+    async def product_row(fields):
+        async with slots:
+            category, availability = await fetch_product_details_async(
+                client, fields["product_page_url"], throttle, cache)
+        return build_row(fields, category, availability)
+
+    async def walk():
+        """Read listing pages and schedule their product pages; items go to the consumer in order."""
+        try:
+            url = urljoin(base_url, start_path.lstrip("/"))
+            pages = 0
+            while url and pages < max_pages:
+                async with slots:
+                    html = await fetch_async(client, url, throttle, cache)
+                with METRICS.timed("parse"):
+                    fields, next_page = parse_listing_page(html, url)
+                await items.put(("page", (url, next_page, [f["product_page_url"] for f in fields])))
+                for f in fields:
+                    if skip_urls and f["product_page_url"] in skip_urls:
+                        continue
+                    await ahead.acquire()
+                    task = asyncio.create_task(product_row(f))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    await items.put(("row", task))
+                url = next_page
+                pages += 1
+        except Exception as e:
+            await items.put(("error", e))
+        finally:
+            await items.put(("done", None))
+
+    walker = asyncio.create_task(walk())
+    try:
+        while True:
+            kind, item = await items.get()
+            if kind == "done":
+                break
+            if kind == "error":
+                raise item
+            if kind == "page":
+                if on_page is not None:
+                    on_page(*item)
+                continue
+            row = await item
+            ahead.release()
+            yield row
+    finally:
+        walker.cancel()
+        for task in list(tasks):
+            task.cancel()
+        await asyncio.gather(walker, *tasks, return_exceptions=True)
+        if own_client:
+            await client.aclose()
+
+
+def async_scraper_sync(start_path: str = "index.html", max_pages: int = 1, in_flight: Optional[int] = None,
+                       cache: Optional[ResponseCache] = None, base_url: str = BASE,
+                       limiter: Optional[RateLimiter] = None, skip_urls: Optional[Set[str]] = None,
+                       on_page: Optional[Callable[[str, Optional[str], List[str]], None]] = None,
+                       http2: bool = True) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Synchronous generator over async_scraper() (same arguments).
+
+    The event loop runs in a background thread and keeps fetching while the
+    caller processes rows; each next() hands one row across. Closing the
+    generator early cancels the outstanding requests.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="async-scraper", daemon=True)
+    thread.start()
+    rows = async_scraper(start_path=start_path, max_pages=max_pages, in_flight=in_flight, cache=cache,
+                         base_url=base_url, limiter=limiter, skip_urls=skip_urls, on_page=on_page, http2=http2)
+    try:
+        while True:
+            try:
+                row = asyncio.run_coroutine_threadsafe(rows.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield row
+    finally:
+        asyncio.run_coroutine_threadsafe(rows.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
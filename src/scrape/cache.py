@@ -0,0 +1,137 @@
+"""
+On-disk HTTP response cache used in front of fetch().
+
+Bodies are stored in a SQLite file under DATA_DIR with a per-entry expiry
+time. When the total body size goes over `max_bytes`, the least recently
+used entries are evicted. Hits and misses are counted so the pipeline can
+report them.
+
+A hit does not write: its access time is kept in memory and written with
+the next put() (before eviction picks its victims) or close(), so reads of
+a warm cache stay reads.
+
+Any object with the same get / put / __contains__ / stats methods can be
+passed to the scraper instead (e.g. an in-memory dict-backed cache in tests).
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.config import HTTP_CACHE_MAX_BYTES, HTTP_CACHE_PATH, HTTP_CACHE_TTL, ensure_dir
+
+
+class ResponseCache:
+    """SQLite-backed url -> body cache with TTL and size-bounded LRU eviction (thread-safe)."""
+
+    def __init__(self, path=HTTP_CACHE_PATH, ttl: float = HTTP_CACHE_TTL,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # url -> last access time of hits not written to the table yet
+        self._touched: Dict[str, float] = {}
+        ensure_dir(Path(path).parent)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        # A cache can be rebuilt, so trade durability for cheap commits
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            " url TEXT PRIMARY KEY, body TEXT NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_http_cache_last_access ON http_cache (last_access)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        """True if a fresh entry exists (does not count as a hit or miss)."""
+        with self._lock:
+            row = self._conn.execute("SELECT expires_at FROM http_cache WHERE url = ?", (url,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def get(self, url: str) -> Optional[str]:
+        """Cached body for `url`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, size, expires_at FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None or row[2] <= now:
+                if row is not None:
+                    self._delete(url, row[1])
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._touched[url] = now
+            self.hits += 1
+            return row[0]
+
+    def put(self, url: str, body: str, ttl: Optional[float] = None) -> None:
+        """Store `body` for `url` for `ttl` seconds (default: the cache TTL), then evict LRU entries."""
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM http_cache WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, body, size, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (url, body, size, now + (self.ttl if ttl is None else ttl), now),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._touched.pop(url, None)
+            self._flush_access()
+            self._evict()
+            self._conn.commit()
+
+    def _flush_access(self) -> None:
+        """Write the access times of the hits since the last flush (committed by the caller)."""
+        if self._touched:
+            self._conn.executemany("UPDATE http_cache SET last_access = ? WHERE url = ?",
+                                   [(at, url) for url, at in self._touched.items()])
+            self._touched.clear()
+
+    def _delete(self, url: str, size: int) -> None:
+        self._conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+        self._total -= size
+
+    def _evict(self) -> None:
+        """Drop expired entries first, then least recently used ones, until under max_bytes."""
+        if self._total <= self.max_bytes:
+            return
+        expired = self._conn.execute(
+            "SELECT url, size FROM http_cache WHERE expires_at <= ?", (time.time(),)
+        ).fetchall()
+        for url, size in expired:
+            self._delete(url, size)
+            self.evictions += 1
+        while self._total > self.max_bytes:
+            victims = self._conn.execute(
+                "SELECT url, size FROM http_cache ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not victims:
+                break
+            for url, size in victims:
+                self._delete(url, size)
+                self.evictions += 1
+                if self._total <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM http_cache").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": entries, "bytes": self._total}
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+        self._conn.close()
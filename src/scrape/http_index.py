@@ -0,0 +1,129 @@
+"""
+Local index of HTTP validators and body hashes for incremental scraping.
+
+For every fetched URL it keeps the ETag, Last-Modified and a SHA-256 of the
+body, so the next run can send conditional GETs and skip pages whose content
+did not change. Listing pages also keep their parsed product cards and
+next-page link, so an unchanged listing page needs no download and no parsing.
+
+New entries are only staged in memory until commit(): the pipeline commits
+a product URL after its row is in the database, so a crash never marks
+unsaved rows as "unchanged". Entries whose body hash is the committed one
+(only the validators moved) are committed with any batch, as no row
+depends on them.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+
+from src.config import HTTP_INDEX_PATH, ensure_dir
+
+
+class IndexEntry(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_hash: str
+    links: Optional[dict] = None
+
+
+def body_hash(text: str) -> str:
+    """SHA-256 of a page body, used to detect unchanged content without validators."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class FetchIndex:
+    """SQLite-backed url -> IndexEntry map, safe to share between scraper threads."""
+
+    def __init__(self, path=HTTP_INDEX_PATH):
+        ensure_dir(Path(path).parent)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_index ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+            " body_hash TEXT NOT NULL, links TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._staged: Dict[str, IndexEntry] = {}
+        # Staged URLs whose body hash equals their committed one
+        self._same_body: Set[str] = set()
+        self.unchanged = 0
+
+    def _committed(self, url: str) -> Optional[IndexEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash, links FROM http_index WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, links = row
+        return IndexEntry(etag, last_modified, digest, json.loads(links) if links else None)
+
+    def get(self, url: str) -> Optional[IndexEntry]:
+        """Latest known entry for `url` (staged entries win over committed ones)."""
+        with self._lock:
+            if url in self._staged:
+                return self._staged[url]
+        return self._committed(url)
+
+    def stage(self, url: str, etag: Optional[str], last_modified: Optional[str], digest: str) -> None:
+        """Remember new validators/hash for `url`, keeping any known links."""
+        committed = self._committed(url)
+        with self._lock:
+            previous = self._staged.get(url, committed)
+            links = previous.links if previous and previous.body_hash == digest else None
+            self._staged[url] = IndexEntry(etag, last_modified, digest, links)
+            if committed is not None and committed.body_hash == digest:
+                self._same_body.add(url)
+            else:
+                self._same_body.discard(url)
+
+    def stage_links(self, url: str, links: dict) -> None:
+        """Attach the parsed cards and next link (listing pages) to the staged entry of `url`."""
+        with self._lock:
+            entry = self._staged.get(url)
+            if entry is not None:
+                self._staged[url] = entry._replace(links=links)
+
+    def mark_unchanged(self) -> None:
+        with self._lock:
+            self.unchanged += 1
+
+    def commit(self, urls: Optional[Iterable[str]] = None) -> int:
+        """
+        Persist staged entries. With `urls`, only those product URLs are
+        committed, plus every staged listing page and every entry whose body
+        is unchanged (both always safe).
+        Returns the number of committed entries.
+        """
+        wanted = set(urls) if urls is not None else None
+        with self._lock:
+            ready = {
+                url: entry for url, entry in self._staged.items()
+                if wanted is None or url in wanted or entry.links is not None or url in self._same_body
+            }
+            now = time.time()
+            self._conn.executemany(
+                "INSERT INTO http_index (url, etag, last_modified, body_hash, links, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(url) DO UPDATE SET etag = excluded.etag,"
+                " last_modified = excluded.last_modified, body_hash = excluded.body_hash,"
+                " links = excluded.links, updated_at = excluded.updated_at",
+                [
+                    (url, e.etag, e.last_modified, e.body_hash,
+                     json.dumps(e.links) if e.links is not None else None, now)
+                    for url, e in ready.items()
+                ],
+            )
+            self._conn.commit()
+            for url in ready:
+                del self._staged[url]
+                self._same_body.discard(url)
+        return len(ready)
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,208 @@
+"""
+Adaptive per-host rate limiting for the scraper.
+
+Every host gets a token bucket (requests per second plus a small burst) and
+an AIMD concurrency limit, both driven by the responses seen:
+
+    success faster than RATE_LIMIT_TARGET_LATENCY   rate += RATE_LIMIT_STEP, limit += 1 / limit
+    429 / 5xx / network error / slow response       rate and limit halved (once per cooldown)
+    Retry-After header                              host paused until then
+
+so throughput follows what the server can take instead of a fixed delay.
+
+Retries are scheduled rather than slept while holding a slot: a failed
+attempt releases its slot and the retry calls acquire() with a not-before
+time, so other requests to the host keep going in the meantime.
+
+    limiter = RateLimiter(max_concurrency=4)
+    limiter.acquire(url)
+    ... request ...
+    limiter.release(url, latency, status_code, retry_after)
+
+Coroutines use `await limiter.acquire_async(url)` instead, which waits
+without blocking the event loop; both kinds of callers can share one limiter.
+"""
+import asyncio
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from src.config import (
+    RATE_LIMIT_BURST, RATE_LIMIT_MAX_RPS, RATE_LIMIT_MIN_RPS, RATE_LIMIT_RPS, RATE_LIMIT_STEP,
+    RATE_LIMIT_TARGET_LATENCY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_congestion(status: Optional[int]) -> bool:
+    """True for responses that mean "slow down": no response at all, 429 or a 5xx."""
+    return status is None or status == 429 or status >= 500
+
+
+class _Host:
+    """Bucket and AIMD state of one host."""
+
+    def __init__(self, rate: float, burst: float, limit: float):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.limit = limit
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+
+    def refill(self, now: float, burst: float) -> None:
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimiter:
+    """
+    Token bucket + AIMD concurrency limit per host, shared between threads.
+
+    Args:
+        rate: initial requests per second per host (a rate above `max_rate`
+            starts at `max_rate`, with a warning)
+        max_rate: ceiling the rate grows to (the politeness limit)
+        min_rate: floor the rate is halved down to
+        burst: tokens a host can save up
+        max_concurrency: ceiling of requests in flight per host
+        target_latency: responses slower than this (seconds) count as congestion
+        step: requests per second added per fast success
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_RPS, max_rate: float = RATE_LIMIT_MAX_RPS,
+                 min_rate: float = RATE_LIMIT_MIN_RPS, burst: float = RATE_LIMIT_BURST,
+                 max_concurrency: int = 1, target_latency: float = RATE_LIMIT_TARGET_LATENCY,
+                 step: float = RATE_LIMIT_STEP):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        if rate > max_rate:
+            logger.warning(f"RateLimiter rate {rate:g}/s is above max_rate {max_rate:g}/s; "
+                           f"starting at {max_rate:g}/s")
+        self.initial_rate = max(self.min_rate, min(rate, max_rate))
+        self.burst = max(1.0, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency = target_latency
+        self.step = step
+        self._cond = threading.Condition()
+        self._hosts: Dict[str, _Host] = {}
+        # (event loop, future) of acquire_async() callers waiting for a release()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+    def _host(self, url: str) -> _Host:
+        host = urlparse(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _Host(self.initial_rate, self.burst, float(self.max_concurrency))
+        return state
+
+    def acquire(self, url: str, not_before: float = 0.0) -> None:
+        """
+        Block until a request to the host of `url` may start and take a slot.
+
+        Args:
+            url: request URL (limits are per host)
+            not_before: time.monotonic() before which the request must not start (retry backoff)
+        """
+        with self._cond:
+            state = self._host(url)
+            while True:
+                acquired, wait = self._try_acquire(state, not_before)
+                if acquired:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self, url: str, not_before: float = 0.0) -> None:
+        """acquire() for coroutines: waits on the event loop instead of blocking the thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                acquired, wait = self._try_acquire(self._host(url), not_before)
+                if acquired:
+                    return
+                waiter = (loop, loop.create_future())
+                self._waiters.add(waiter)
+            try:
+                await asyncio.wait((waiter[1],), timeout=wait)
+            finally:
+                with self._cond:
+                    self._waiters.discard(waiter)
+
+    def _try_acquire(self, state: _Host, not_before: float) -> Tuple[bool, Optional[float]]:
+        """Take a slot if possible: (True, None), else (False, seconds to wait or None until a release)."""
+        now = time.monotonic()
+        wait = max(not_before, state.paused_until) - now
+        if wait > 0:
+            return False, wait
+        if state.in_flight >= int(state.limit):
+            return False, None
+        state.refill(now, self.burst)
+        if state.tokens >= 1:
+            state.tokens -= 1
+            state.in_flight += 1
+            return True, None
+        return False, (1 - state.tokens) / state.rate
+
+    def release(self, url: str, latency: Optional[float] = None, status: Optional[int] = None,
+                retry_after: Optional[float] = None) -> None:
+        """
+        Give back the slot taken by acquire() and adapt the host's limits.
+
+        Args:
+            url: request URL
+            latency: seconds the attempt took
+            status: HTTP status, None when no response arrived
+            retry_after: seconds from the server's Retry-After header
+        """
+        with self._cond:
+            state = self._host(url)
+            state.in_flight = max(0, state.in_flight - 1)
+            now = time.monotonic()
+            if retry_after:
+                state.paused_until = max(state.paused_until, now + retry_after)
+
+            slow = latency is not None and latency > self.target_latency
+            if is_congestion(status) or slow:
+                # Halve at most once per cooldown so one burst of errors isn't counted many times
+                if now - state.last_decrease >= max(self.target_latency, 1.0 / state.rate):
+                    state.rate = max(self.min_rate, state.rate / 2)
+                    state.limit = max(1.0, state.limit / 2)
+                    state.tokens = min(state.tokens, 1.0)
+                    state.last_decrease = now
+            elif status < 400:
+                state.rate = min(self.max_rate, state.rate + self.step)
+                state.limit = min(float(self.max_concurrency), state.limit + 1 / state.limit)
+            self._cond.notify_all()
+            for loop, waiter in self._waiters:
+                loop.call_soon_threadsafe(_wake, waiter)
+            self._waiters.clear()
+
+    def state(self, url: str) -> dict:
+        """Current rate, concurrency limit and in-flight count for the host of `url`."""
+        with self._cond:
+            state = self._host(url)
+            return {"rate": state.rate, "limit": int(state.limit), "in_flight": state.in_flight,
+                    "paused_for": max(0.0, state.paused_until - time.monotonic())}
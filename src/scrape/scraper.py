@@ -1,16 +1,25 @@
-from bs4 import BeautifulSoup, Tag
-import requests
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 import time
-import random
-from typing import List, Dict, Optional
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Dict, Optional, Set
 from urllib.parse import urljoin
 
 import re
 from decimal import Decimal, InvalidOperation
 import logging
 
+from src.config import BASE_URL, SCRAPE_CONCURRENCY, HTML_PARSER
+from src.scrape.http_index import FetchIndex, body_hash
+from src.scrape.cache import ResponseCache
+from src.scrape.ratelimit import RateLimiter, parse_retry_after
+from src.metrics import METRICS
 
-BASE = 'https://books.toscrape.com/'
+if TYPE_CHECKING:
+    import requests  # imported where sessions are made, not by parse-only users (async engine)
+
+BASE = f"{BASE_URL}/"
 
 RATING_MAP = {
     "One": 1,
@@ -20,63 +29,212 @@ RATING_MAP = {
     "Five": 5,
 }
 
-def make_session() -> requests.Session:
+
+def resolve_parser(name: str = HTML_PARSER) -> str:
+    """BeautifulSoup backend: "auto" picks lxml when installed, else html.parser."""
+    if name != "auto":
+        return name
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
+
+PARSER = resolve_parser()
+
+
+def only_classes(*names: str) -> SoupStrainer:
+    """Strainer keeping just the elements (and their subtrees) with one of the given classes."""
+    return SoupStrainer(class_=re.compile(r"(?:^|\s)(?:%s)(?:\s|$)" % "|".join(names)))
+
+
+# Parse only the nodes the scraper reads instead of the whole page tree
+LISTING_NODES = only_classes("product_pod", "next")
+PRODUCT_DETAIL_NODES = only_classes("breadcrumb", "availability")
+PRODUCT_PAGE_NODES = only_classes("breadcrumb", "product_main")
+
+
+def make_soup(html: str, nodes: Optional[SoupStrainer] = None, parser: Optional[str] = None) -> BeautifulSoup:
+    """BeautifulSoup with the configured backend, restricted to `nodes` when given."""
+    return BeautifulSoup(html, parser or PARSER, parse_only=nodes)
+
+# Sent with every request (requests sessions and the async client)
+HEADERS = {"User-Agent": "MiniDataPipelineBot/1.0 (lakatosbalint1029@gmail.com)"}
+
+
+def make_session() -> "requests.Session":
     """
     Create and configure a requests Session with custom User-Agent.
     
     Returns:
         requests.Session: Configured session object for HTTP requests
     """
+    import requests
+
     session = requests.Session()
-    session.headers.update({"User-Agent": "MiniDataPipelineBot/1.0 (lakatosbalint1029@gmail.com)"})
+    session.headers.update(HEADERS)
     return session 
 
 
-def fetch(session: requests.Session, url: str, timeout: float = 10.0) -> str:
+def fetch_response(session: "requests.Session", url: str, timeout: float = 10.0,
+                   throttle: Optional[RateLimiter] = None,
+                   headers: Optional[Dict[str, str]] = None) -> "requests.Response":
     """
-    Fetch HTML content from a URL with retry logic and exponential backoff.
+    GET a URL with retry logic and exponential backoff.
     
     Args:
         session: requests.Session for HTTP requests
         url: Target URL to fetch
         timeout: Request timeout in seconds (default: 10.0)
+        throttle: Optional RateLimiter gating every attempt
+        headers: Optional extra request headers (e.g. conditional GET validators)
     
     Returns:
-        str: HTML content as text
+        requests.Response: the successful (2xx/3xx) response
     
     Raises:
         requests.RequestException: If all retry attempts fail
     """
+    import requests
+
     retries = 3
+    not_before = 0.0
     for attempt in range(1, retries + 1):
+        if throttle is not None:
+            with METRICS.timed("throttle_wait"):
+                throttle.acquire(url, not_before)
+        response = None
+        started = time.perf_counter()
         try:
-            response = session.get(url, timeout=timeout)
+            response = session.get(url, timeout=timeout, headers=headers)
             response.raise_for_status()
-            return response.text
+            return response
         except requests.RequestException as exc:
+            response = response if response is not None else getattr(exc, "response", None)
             logging.warning(f"Fetch failed (attempt {attempt}/{retries}) for {url}: {exc}")
 
             if attempt == retries:
+                METRICS.incr("fetch_failures")
                 logging.exception(f"Failed to fetch {url} after {retries} attempts")
                 raise
-            # exponential backoff
-            time.sleep(2 ** attempt)
+            METRICS.incr("fetch_retries")
+            # exponential backoff, or as long as the server asked for
+            delay = _retry_after(response) or 2 ** attempt
+            if throttle is None:
+                time.sleep(delay)
+            else:
+                # The slot is released below; the retry waits in acquire() without holding it
+                not_before = time.monotonic() + delay
+        finally:
+            elapsed = time.perf_counter() - started
+            METRICS.observe_fetch(elapsed)
+            if throttle is not None:
+                status = getattr(response, "status_code", 200) if response is not None else None
+                if status == 429:
+                    METRICS.incr("fetch_throttled")
+                throttle.release(url, elapsed, status, _retry_after(response))
+
+
+def _retry_after(response) -> Optional[float]:
+    headers = getattr(response, "headers", None) if response is not None else None
+    return parse_retry_after(headers.get("Retry-After")) if headers else None
 
-def parse_book_card(card: Tag, session: requests.Session) -> Dict[str, Optional[str]]:
+
+def fetch(session: "requests.Session", url: str, timeout: float = 10.0,
+          throttle: Optional[RateLimiter] = None, cache: Optional[ResponseCache] = None) -> str:
     """
-    Parse a book card element and extract book details including category from product page.
+    Fetch HTML content from a URL with retry logic and exponential backoff.
+    
+    Args:
+        session: requests.Session for HTTP requests
+        url: Target URL to fetch
+        timeout: Request timeout in seconds (default: 10.0)
+        throttle: Optional RateLimiter gating every attempt
+        cache: Optional ResponseCache; hits skip the network and the throttle
+    
+    Returns:
+        str: HTML content as text
+    
+    Raises:
+        requests.RequestException: If all retry attempts fail
+    """
+    if cache is not None:
+        html = cache.get(url)
+        if html is not None:
+            return html
+
+    html = fetch_response(session, url, timeout=timeout, throttle=throttle).text
+    if cache is not None:
+        cache.put(url, html)
+    return html
+
+
+def fetch_if_changed(session: "requests.Session", url: str, index: FetchIndex, timeout: float = 10.0,
+                     throttle: Optional[RateLimiter] = None, conditional: bool = True,
+                     cache: Optional[ResponseCache] = None) -> Optional[str]:
+    """
+    Incremental fetch: conditional GET plus body-hash comparison against `index`.
+    
+    Args:
+        session: requests.Session for HTTP requests
+        url: Target URL to fetch
+        index: FetchIndex with the validators/hash from previous runs
+        timeout: Request timeout in seconds (default: 10.0)
+        throttle: Optional RateLimiter gating every attempt
+        conditional: Send If-None-Match / If-Modified-Since and compare hashes (default: True)
+        cache: Optional ResponseCache; a cached body is hash-compared without any request
+    
+    Returns:
+        str: HTML content if the page is new or changed (staged in the index),
+        None if the server answered 304 or the body hash is unchanged
+    """
+    entry = index.get(url) if conditional else None
+
+    cached = cache.get(url) if cache is not None else None
+    if cached is not None:
+        digest = body_hash(cached)
+        if entry is not None and entry.body_hash == digest:
+            return None
+        index.stage(url, entry.etag if entry else None, entry.last_modified if entry else None, digest)
+        return cached
+
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    response = fetch_response(session, url, timeout=timeout, throttle=throttle, headers=headers or None)
+    if response.status_code == 304:
+        return None
+
+    html = response.text
+    if cache is not None:
+        cache.put(url, html)
+    digest = body_hash(html)
+    index.stage(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), digest)
+    if entry is not None and entry.body_hash == digest:
+        return None
+    return html
+
+
+def parse_card_fields(card: Tag, page_url: str = BASE) -> Dict[str, Optional[str]]:
+    """
+    Parse the fields available directly on a listing-page book card.
     
     Args:
         card: BeautifulSoup Tag representing a single book card
-        session: requests.Session for fetching the product page
+        page_url: URL of the listing page (card links are relative to it)
     
     Returns:
-        Dict containing title, price, availability, rating, product_page_url, and category
+        Dict containing title, price, rating and product_page_url
     """
     title_el = card.select_one("h3 a")
     title = title_el.get("title", "").strip() if title_el else ""
     href = title_el.get("href") if title_el else None
-    product_page_url = urljoin(BASE, href) if href else None
+    product_page_url = urljoin(page_url, href) if href else None
 
     price_el = card.select_one(".price_color")
     price_text = price_el.get_text(strip=True) if price_el else ""
@@ -85,8 +243,6 @@ def parse_book_card(card: Tag, session: requests.Session) -> Dict[str, Optional[
     rating_el = card.select_one("p.star-rating")
     rating = None
 
-    category, availability = fetch_product_details(session, product_page_url)
-
     if rating_el:
         classes = rating_el.get("class", [])
         rating_word = next((c for c in classes if c != "star-rating"), None)
@@ -95,42 +251,272 @@ def parse_book_card(card: Tag, session: requests.Session) -> Dict[str, Optional[
     return {
         "title": title,
         "price": price,
-        "availability": availability,
         "rating": rating,
         "product_page_url": product_page_url,
+    }
+
+
+def build_row(fields: Dict[str, Optional[str]], category: Optional[str],
+              availability: Optional[str]) -> Dict[str, Optional[str]]:
+    """Combine listing-card fields and product-page details into one scraped row."""
+    return {
+        "title": fields["title"],
+        "price": fields["price"],
+        "availability": availability,
+        "rating": fields["rating"],
+        "product_page_url": fields["product_page_url"],
         "category" : category
     }
 
 
-def scraper(start_path="index.html", max_pages=1):
+def parse_book_card(card: Tag, session: "requests.Session") -> Dict[str, Optional[str]]:
+    """
+    Parse a book card element and extract book details including category from product page.
+    
+    Args:
+        card: BeautifulSoup Tag representing a single book card
+        session: requests.Session for fetching the product page
+    
+    Returns:
+        Dict containing title, price, availability, rating, product_page_url, and category
+    """
+    fields = parse_card_fields(card)
+    category, availability = fetch_product_details(session, fields["product_page_url"])
+    return build_row(fields, category, availability)
+
+
+def parse_listing_page(html: str, page_url: str, parser: Optional[str] = None,
+                       strain: bool = True) -> tuple[List[Dict[str, Optional[str]]], Optional[str]]:
+    """
+    Parse a listing page into its book-card fields and the absolute next-page URL.
+    
+    Args:
+        html: Listing page HTML
+        page_url: URL the page was fetched from (to resolve the next link)
+        parser: BeautifulSoup backend (default: PARSER)
+        strain: Only build the card and pagination nodes (default: True)
+    """
+    soup = make_soup(html, LISTING_NODES if strain else None, parser)
+    fields = [parse_card_fields(card, page_url) for card in soup.select("article.product_pod")]
+    next_url = soup.select_one("li.next a")
+    return fields, (urljoin(page_url, next_url["href"]) if next_url else None)
+
+
+def scraper(start_path="index.html", max_pages=1, concurrency: Optional[int] = None,
+            session_factory: Callable[[], "requests.Session"] = make_session,
+            index: Optional[FetchIndex] = None, cache: Optional[ResponseCache] = None,
+            base_url: str = BASE, limiter: Optional[RateLimiter] = None,
+            skip_urls: Optional[Set[str]] = None,
+            on_page: Optional[Callable[[str, Optional[str], List[str]], None]] = None,
+            parse_pool=None):
     """
     Scrape book information from books.toscrape.com with pagination support.
     
+    With concurrency > 1 the product pages of each listing page are fetched by a
+    bounded thread pool (one session per worker thread). Rows are still yielded
+    in listing order.
+    
+    All listing and product requests go through an adaptive per-host
+    RateLimiter (src/scrape/ratelimit.py), so the request rate follows how
+    fast the server answers instead of a fixed delay between pages.
+    
+    With an `index` the scrape is incremental: pages are fetched with conditional
+    GETs, unchanged listing pages are replayed from the links stored in the index,
+    and books whose product page did not change are not yielded at all. New index
+    entries are only staged; the caller commits them (FetchIndex.commit) once the
+    rows are saved.
+    
+    With a `cache` pages are served from the on-disk ResponseCache when fresh;
+    cached pages skip the rate limiter entirely.
+    
+    With a `parse_pool` (src.processing.parallel.ParsePool) product pages are
+    parsed in worker processes, one task per listing page, while this process
+    goes on fetching the next listing pages (up to parse_pool.ahead pages
+    ahead of the rows yielded). Not combinable with `index`.
+    
     Args:
         start_path: Starting path for scraping (default: "index.html")
         max_pages: Maximum number of pages to scrape (default: 1)
+        concurrency: Max parallel product-page fetches (default: SCRAPE_CONCURRENCY)
+        session_factory: Callable creating a configured session (default: make_session)
+        index: Optional FetchIndex enabling incremental mode
+        cache: Optional ResponseCache shared by listing and product fetches
+        base_url: Site root `start_path` is resolved against (default: BASE;
+            e.g. the local fixture server in benchmarks/server.py)
+        limiter: RateLimiter to share with other scrapes (default: a new one
+            allowing `concurrency` requests in flight)
+        skip_urls: Product URLs not to fetch or yield (already saved by a resumed run)
+        on_page: Called as on_page(page_url, next_url, product_urls) for every
+            listing page, before any of its rows is yielded
+        parse_pool: Optional ParsePool parsing product pages off the fetch loop
     
     Yields:
         Dict: Book information including title, price, rating, availability, url, and category
     """
-    session = make_session()
-    url = urljoin(BASE, start_path.lstrip("/"))
+    if concurrency is None:
+        concurrency = SCRAPE_CONCURRENCY
+    if parse_pool is not None and index is not None:
+        raise ValueError("parse_pool cannot be combined with an incremental index")
+
+    session = session_factory()
+    url = urljoin(base_url, start_path.lstrip("/"))
     pages = 0
 
-    while url and pages < max_pages:
-        html = fetch(session, url)
-        soup = BeautifulSoup(html, "html.parser")
+    executor = None
+    throttle = limiter or RateLimiter(max_concurrency=concurrency)
+    local = threading.local()
+    if concurrency > 1:
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scraper")
+
+    def current_session():
+        if executor is None:
+            return session
+        if not hasattr(local, "session"):
+            local.session = session_factory()
+        return local.session
 
-        for card in soup.select("article.product_pod"):
-            yield parse_book_card(card, session)
+    def product_row(job):
+        product_url, fields = job
+        worker_session = current_session()
+        if index is None:
+            category, availability = fetch_product_details(worker_session, product_url, throttle=throttle,
+                                                           cache=cache)
+            return build_row(fields, category, availability)
+        return fetch_changed_product(worker_session, product_url, fields, index, throttle=throttle, cache=cache)
+
+    def product_html(job):
+        """Product page HTML for the parse pool (None when it could not be fetched)."""
+        product_url, _ = job
+        if not product_url:
+            return None
+        try:
+            return fetch(current_session(), product_url, throttle=throttle, cache=cache)
+        except Exception as e:
+            logging.warning(f"Could not fetch product details for {product_url}: {e}")
+            return None
+
+    # Listing pages whose product pages are being parsed in parse_pool:
+    # (on_page arguments, jobs, future of their (category, availability) tuples)
+    parsing = deque()
+
+    def parsed_rows(page):
+        page_args, jobs, details = page
+        if on_page is not None:
+            on_page(*page_args)
+        with METRICS.timed("parse"):
+            details = details.result()
+        for (_, fields), (category, availability) in zip(jobs, details):
+            yield build_row(fields, category, availability)
+
+    try:
+        while url and pages < max_pages:
+            entry = index.get(url) if index is not None else None
+            if index is None:
+                html = fetch(session, url, throttle=throttle, cache=cache)
+            else:
+                # Without stored links an unchanged listing page could not be replayed
+                has_links = entry is not None and entry.links is not None
+                html = fetch_if_changed(session, url, index, throttle=throttle, conditional=has_links,
+                                        cache=cache)
 
-        next_url = soup.select_one("li.next a")
-        url = urljoin(url, next_url["href"]) if next_url else None
-        pages += 1
-        time.sleep(1 + random.random())
+            if html is None:
+                # Unchanged listing page: reuse its cards, details come from changed product pages
+                logging.debug(f"Listing page unchanged: {url}")
+                if "cards" in entry.links:
+                    jobs = [(card["product_page_url"], card) for card in entry.links["cards"]]
+                else:  # indexed before cards were kept: rows come from product pages alone
+                    jobs = [(product_url, None) for product_url in entry.links["products"]]
+                next_page = entry.links["next"]
+            else:
+                with METRICS.timed("parse"):
+                    fields, next_page = parse_listing_page(html, url)
+                jobs = [(f["product_page_url"], f) for f in fields]
+                if index is not None:
+                    index.stage_links(url, {"cards": fields, "next": next_page})
 
-        
-def fetch_product_details(session: requests.Session, product_url: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+            page_args = (url, next_page, [product_url for product_url, _ in jobs])
+            if skip_urls:
+                jobs = [job for job in jobs if job[0] not in skip_urls]
+
+            if parse_pool is not None:
+                htmls = map(product_html, jobs) if executor is None else executor.map(product_html, jobs)
+                parsing.append((page_args, jobs, parse_pool.submit_details(list(htmls))))
+                while len(parsing) > parse_pool.ahead:
+                    yield from parsed_rows(parsing.popleft())
+            else:
+                if on_page is not None:
+                    on_page(*page_args)
+                # map() keeps input order, so rows come out in listing order
+                rows = map(product_row, jobs) if executor is None else executor.map(product_row, jobs)
+                for row in rows:
+                    if row is not None:
+                        yield row
+
+            url = next_page
+            pages += 1
+
+        while parsing:
+            yield from parsed_rows(parsing.popleft())
+    finally:
+        for _, _, details in parsing:
+            details.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_product_details(html: str, parser: Optional[str] = None,
+                          strain: bool = True) -> tuple[Optional[str], Optional[str]]:
+    """
+    Extract (category, availability) from a product page.
+    
+    The category is extracted from the breadcrumb structure:
+    Home > Books > [Category] > Book Title
+    
+    With strain=True only the breadcrumb and availability nodes are built.
+    """
+    return _product_details(make_soup(html, PRODUCT_DETAIL_NODES if strain else None, parser))
+
+
+def _product_details(soup: BeautifulSoup) -> tuple[Optional[str], Optional[str]]:
+    breadcrumb_links = soup.select("ul.breadcrumb li a")
+    category = breadcrumb_links[2].get_text(strip=True) if len(breadcrumb_links) > 2 else None
+
+    availability_el = soup.select_one("p.availability")
+    availability = availability_el.get_text(strip=True) if availability_el else None
+
+    return category, availability
+
+
+def parse_product_page(html: str, product_url: str) -> Dict[str, Optional[str]]:
+    """
+    Build a full scraped row from a product page alone (same fields as a
+    listing card + details), used when the listing page was not re-parsed.
+    """
+    soup = make_soup(html, PRODUCT_PAGE_NODES)
+    main = soup.select_one(".product_main") or soup
+
+    title_el = main.select_one("h1")
+    price_el = main.select_one(".price_color")
+    price_text = price_el.get_text(strip=True) if price_el else ""
+    rating_el = main.select_one("p.star-rating")
+    rating = None
+    if rating_el:
+        rating_word = next((c for c in rating_el.get("class", []) if c != "star-rating"), None)
+        rating = RATING_MAP.get(rating_word)
+
+    fields = {
+        "title": title_el.get_text(strip=True) if title_el else "",
+        "price": price_text.lstrip("£") if price_text else "",
+        "rating": rating,
+        "product_page_url": product_url,
+    }
+    category, availability = _product_details(soup)
+    return build_row(fields, category, availability)
+
+
+def fetch_product_details(session: "requests.Session", product_url: Optional[str],
+                          throttle: Optional[RateLimiter] = None,
+                          cache: Optional[ResponseCache] = None) -> tuple[Optional[str], Optional[str]]:
     """
     Fetch the product page and extract category and availability.
     
@@ -142,6 +528,8 @@ def fetch_product_details(session: requests.Session, product_url: Optional[str])
     Args:
         session: requests.Session for HTTP requests
         product_url: Full URL to the book's product page
+        throttle: Optional RateLimiter shared with other fetches
+        cache: Optional ResponseCache
     
     Returns:
         Tuple of (category, availability) where:
@@ -152,20 +540,47 @@ def fetch_product_details(session: requests.Session, product_url: Optional[str])
         return None, None
     
     try:
-        html = fetch(session, product_url)
-        soup = BeautifulSoup(html, "html.parser")
-        
-        breadcrumb_links = soup.select("ul.breadcrumb li a")
-        category = breadcrumb_links[2].get_text(strip=True) if len(breadcrumb_links) > 2 else None
-        
-        availability_el = soup.select_one("p.availability")
-        availability = availability_el.get_text(strip=True) if availability_el else None
-        
-        return category, availability
+        html = fetch(session, product_url, throttle=throttle, cache=cache)
+        with METRICS.timed("parse"):
+            return parse_product_details(html)
     
     except Exception as e:
         logging.warning(f"Could not fetch product details for {product_url}: {e}")
         return None, None
+
+
+def fetch_changed_product(session: "requests.Session", product_url: Optional[str],
+                          fields: Optional[Dict[str, Optional[str]]], index: FetchIndex,
+                          throttle: Optional[RateLimiter] = None,
+                          cache: Optional[ResponseCache] = None) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Incremental counterpart of fetch_product_details.
+    
+    Returns the scraped row if the product page is new or changed, or None if
+    it is unchanged. `fields` are the listing-card fields (parsed now or kept
+    in the index for an unchanged listing page), or None when they are not
+    known (the row is then built from the product page). If the product page
+    cannot be fetched the row is built from `fields` alone, with category
+    and availability None, as fetch_product_details() does.
+    """
+    if not product_url:
+        return build_row(fields, None, None) if fields else None
+
+    try:
+        html = fetch_if_changed(session, product_url, index, throttle=throttle, cache=cache)
+    except Exception as e:
+        logging.warning(f"Could not fetch product details for {product_url}: {e}")
+        return build_row(fields, None, None) if fields else None
+
+    if html is None:
+        index.mark_unchanged()
+        return None
+    with METRICS.timed("parse"):
+        if fields is None:
+            return parse_product_page(html, product_url)
+        category, availability = parse_product_details(html)
+    return build_row(fields, category, availability)
+
     
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
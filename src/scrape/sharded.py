@@ -0,0 +1,206 @@
+"""
+Multi-process sharded crawl.
+
+The catalogue is split into shards, either page ranges of
+catalogue/page-N.html or one shard per category. Shards go into a task queue
+served by worker processes. Each worker has its own requests.Session and
+adaptive RateLimiter and runs the regular scraper() over one shard at a
+time. Rows come back through a result queue (one None sentinel per worker
+when it finishes), and the parent yields each product_page_url only once.
+
+A shard whose scraper() raises is crawled again up to SHARD_RETRIES times
+(rows it already sent are deduplicated). If a shard still fails, or a worker
+dies without finishing, sharded_scraper() raises RuntimeError once the other
+shards are done, so a partial crawl never passes for a complete one.
+
+The number of workers is capped by SCRAPE_MAX_WORKERS, so the whole crawl
+stays under SCRAPE_MAX_WORKERS * RATE_LIMIT_MAX_RPS requests per second.
+"""
+import logging
+import multiprocessing
+import queue
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from src.config import SCRAPE_MAX_WORKERS, SCRAPE_WORKERS, SHARD_PAGES, SHARD_RETRIES
+from src.scrape.ratelimit import RateLimiter
+from src.scrape.scraper import BASE, fetch, make_session, make_soup, scraper
+
+# (start URL or path, max listing pages to follow from it)
+Shard = Tuple[str, int]
+
+PAGE_COUNT_RE = re.compile(r"of\s+(\d+)")
+
+# Rows per message on the result queue (one listing page)
+_ROWS_PER_MESSAGE = 20
+
+
+def page_count(html: str) -> int:
+    """Number of listing pages from the "Page 1 of 50" pager text (1 if there is no pager)."""
+    current = make_soup(html).select_one("li.current")
+    match = PAGE_COUNT_RE.search(current.get_text()) if current else None
+    return int(match.group(1)) if match else 1
+
+
+def category_urls(html: str, page_url: str) -> List[str]:
+    """Absolute URLs of the category listings in the sidebar (without the all-books link)."""
+    links = make_soup(html).select(".side_categories a[href]")
+    return [urljoin(page_url, a["href"]) for a in links if "category/books/" in a["href"]]
+
+
+def page_shards(total_pages: int, pages_per_shard: int = SHARD_PAGES) -> List[Shard]:
+    """Split catalogue/page-1..total_pages into ranges of `pages_per_shard` pages."""
+    return [
+        (f"catalogue/page-{first}.html", min(pages_per_shard, total_pages - first + 1))
+        for first in range(1, total_pages + 1, pages_per_shard)
+    ]
+
+
+def discover_shards(session: requests.Session, shard_by: str = "pages", max_pages: int = 1,
+                    pages_per_shard: int = SHARD_PAGES, base_url: str = BASE) -> List[Shard]:
+    """
+    Build the shard list from the first catalogue page.
+
+    Args:
+        session: session used for the discovery request
+        shard_by: "pages" (page ranges) or "categories" (one shard per category)
+        max_pages: with "pages", catalogue pages to crawl in total;
+            with "categories", listing pages to follow per category
+        pages_per_shard: pages per shard with "pages"
+        base_url: site root (default: BASE)
+
+    Returns:
+        List of (start URL, max pages) shards
+    """
+    first_page = urljoin(base_url, "catalogue/page-1.html")
+    html = fetch(session, first_page)
+    if shard_by == "pages":
+        return page_shards(min(page_count(html), max_pages), pages_per_shard)
+    if shard_by == "categories":
+        return [(url, max_pages) for url in category_urls(html, first_page)]
+    raise ValueError(f"Unknown shard_by {shard_by!r} (expected 'pages' or 'categories')")
+
+
+def _crawl_shards(tasks, results, session_factory: Callable[[], requests.Session], concurrency: int,
+                  base_url: str, retries: int = SHARD_RETRIES) -> None:
+    """
+    Worker process: crawl shards from `tasks` until its None, then post a None sentinel.
+    A shard that raises is crawled again up to `retries` times, then posted as failed.
+    """
+    session = session_factory()
+    # With one fetch at a time the whole shard reuses the process session
+    factory = (lambda: session) if concurrency <= 1 else session_factory
+    # Rate and concurrency learned on one shard carry over to the next
+    limiter = RateLimiter(max_concurrency=concurrency)
+    try:
+        while True:
+            shard = tasks.get()
+            if shard is None:
+                break
+            start, pages = shard
+            for attempt in range(retries + 1):
+                rows = []
+                try:
+                    for row in scraper(start_path=start, max_pages=pages, concurrency=concurrency,
+                                       session_factory=factory, base_url=base_url, limiter=limiter):
+                        rows.append(row)
+                        if len(rows) == _ROWS_PER_MESSAGE:
+                            results.put(("rows", rows))
+                            rows = []
+                except Exception:
+                    logging.exception(f"Shard {start} failed (attempt {attempt + 1} of {retries + 1})")
+                    if attempt == retries:
+                        results.put(("failed", start))
+                else:
+                    break
+                finally:
+                    if rows:
+                        results.put(("rows", rows))
+    finally:
+        results.put(None)
+
+
+def sharded_scraper(max_pages: int = 1, workers: Optional[int] = None, shard_by: str = "pages",
+                    pages_per_shard: int = SHARD_PAGES, shards: Optional[List[Shard]] = None,
+                    session_factory: Callable[[], requests.Session] = make_session,
+                    concurrency: int = 1, base_url: str = BASE,
+                    retries: int = SHARD_RETRIES) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Crawl shards in parallel worker processes and yield the merged rows.
+
+    Rows have the same shape as scraper() rows. They arrive in completion
+    order rather than catalogue order, and each product_page_url is yielded
+    once even when shards overlap. Rows of the shards that did finish are
+    yielded before a failed crawl raises.
+
+    Args:
+        max_pages: see discover_shards()
+        workers: worker processes (default: SCRAPE_WORKERS, capped at SCRAPE_MAX_WORKERS)
+        shard_by: "pages" or "categories" (ignored when `shards` is given)
+        pages_per_shard: pages per shard with shard_by="pages"
+        shards: explicit (start, max pages) shards instead of discovering them
+        session_factory: picklable callable creating a session in each worker
+        concurrency: product-page fetch threads inside each worker
+        base_url: site root (default: BASE)
+        retries: times a shard that raised is crawled again (default: SHARD_RETRIES)
+
+    Yields:
+        Dict: scraped book row
+
+    Raises:
+        RuntimeError: a shard still failed after `retries` retries, or a worker died
+    """
+    if shards is None:
+        shards = discover_shards(session_factory(), shard_by, max_pages, pages_per_shard, base_url)
+    workers = max(1, min(workers or SCRAPE_WORKERS, SCRAPE_MAX_WORKERS, len(shards) or 1))
+    logging.info(f"Crawling {len(shards)} shards with {workers} worker processes")
+
+    ctx = multiprocessing.get_context()
+    tasks, results = ctx.Queue(), ctx.Queue()
+    for shard in shards:
+        tasks.put(shard)
+    for _ in range(workers):
+        tasks.put(None)
+    processes = [
+        ctx.Process(target=_crawl_shards, args=(tasks, results, session_factory, concurrency, base_url, retries),
+                    name=f"shard-worker-{n}", daemon=True)
+        for n in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    seen = set()
+    failed = []
+    finished = 0
+    try:
+        while finished < workers:
+            try:
+                message = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in processes):
+                    raise RuntimeError("Shard workers exited without finishing the crawl")
+                continue
+            if message is None:
+                finished += 1
+                continue
+            kind, payload = message
+            if kind == "failed":
+                failed.append(payload)
+                continue
+            for row in payload:
+                url = row.get("product_page_url")
+                if url is not None:
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                yield row
+        if failed:
+            raise RuntimeError(f"{len(failed)} shard(s) failed: {failed}")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
@@ -0,0 +1,17 @@
+"""
+Throwaway SQLite database for the test scripts that use src.db.
+
+Under pytest, conftest.py has already pointed DATABASE_URL at a temporary
+database shared by the whole run. A script run on its own
+(PYTHONPATH=. python tests/test_history.py) gets a fresh one here instead of
+data/books.db. An explicit DATABASE_URL (e.g. a PostgreSQL test database)
+is left alone.
+
+Import it before anything from src.db, whose engine reads DATABASE_URL:
+
+    import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='books-test-')}/books.db")
@@ -0,0 +1,12 @@
+"""
+Point the test run at a throwaway SQLite database instead of data/books.db,
+and lift the per-host rate limit: scraper tests only talk to fake sessions
+and the local fixture server.
+"""
+import os
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="books-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'books.db')}"
+os.environ.setdefault("RATE_LIMIT_RPS", "1000")
+os.environ.setdefault("RATE_LIMIT_MAX_RPS", "1000")
@@ -0,0 +1,83 @@
+import csv
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+import src.metrics as metrics
+import src.pipeline as pipeline
+import src.processing.anomaly as anomaly
+from src.db.connector import bulk_upsert_books
+from src.db.history import record_snapshots
+from src.db.init_db import create_tables
+from src.processing.anomaly import detect_anomalies, load_stats
+from src.scrape.scraper import scraper
+
+create_tables()
+
+
+def url(i):
+    return f"https://example.com/anomaly_{i}/index.html"
+
+
+books = [{"title": f"Book {i}", "price": 20.0 + (i % 7) * 0.5, "rating": i % 5 + 1, "availability": 10 + i % 5,
+          "category": "Anomaly", "product_page_url": url(i)} for i in range(200)]
+books[3]["price"] = 900.0       # price outlier
+books[4]["rating"] = None       # unparsed rating
+books[5]["availability"] = 5000 # stock outlier
+# Normal prices overall, but far above the rest of its own category
+cheap = [{"title": f"Cheap {i}", "price": 1.0 + (i % 3) * 0.1, "rating": 3, "availability": 12,
+          "category": "Cheap", "product_page_url": f"https://example.com/cheap_{i}/index.html"} for i in range(40)]
+cheap[0]["price"] = 21.0
+bulk_upsert_books(books + cheap)
+
+# Snapshot history as the pipeline records it: an earlier run, then this one
+earlier = datetime.now(timezone.utc) - timedelta(days=1)
+record_snapshots([{**books[6], "price": 7.0}, {**books[7], "price": books[7]["price"] - 0.5}], observed_at=earlier)
+record_snapshots(books + cheap)  # book 6's price tripled since; book 7 moved by 50p only
+# Histories end at different times
+record_snapshots([{**cheap[1], "price": 1.05}], observed_at=datetime.now(timezone.utc) + timedelta(minutes=1))
+
+print("=== Testing detect_anomalies() on the whole table ===")
+report = os.path.join(tempfile.mkdtemp(), "anomalies.csv")
+counts = detect_anomalies(chunk_size=64, report_path=report)
+print(counts)
+
+with open(report, newline="") as f:
+    flagged = {row["product_page_url"]: row for row in csv.DictReader(f)}
+print({u.rsplit("/", 2)[1]: row["flags"] for u, row in flagged.items()})
+
+assert counts["scored"] >= 240
+assert set(load_stats().by_category) == {"Anomaly", "Cheap"}
+assert flagged["https://example.com/cheap_0/index.html"]["flags"] == "price_outlier"
+assert flagged[url(3)]["flags"] == "price_outlier"
+assert flagged[url(4)]["flags"] == "rating_invalid"
+assert flagged[url(5)]["flags"] == "availability_outlier"
+assert flagged[url(6)]["flags"] == "price_jump"
+assert float(flagged[url(6)]["previous_price"]) == 7.0
+assert url(7) not in flagged
+assert counts["flagged"] == len(flagged)
+assert sorted(u for u in flagged if "anomaly_" in u) == sorted(url(i) for i in (3, 4, 5, 6))
+
+print("=== Testing incremental scoring ===")
+report = os.path.join(tempfile.mkdtemp(), "anomalies.csv")
+counts = detect_anomalies(urls=[url(3), url(10), url(10)], report_path=report)
+print(counts)
+assert counts["scored"] == 2
+assert counts["flagged"] == counts["price_outlier"] == 1
+
+print("=== Testing that a price jump is flagged once by the pipeline ===")
+anomaly.REPORTS_DIR = anomaly.Path(tempfile.mkdtemp())  # keep reports/ clean
+metrics.REPORTS_DIR = tempfile.mkdtemp()
+jumpy = {"title": "Jumpy", "price": "£10.00", "availability": "In stock (3 available)", "rating": 3,
+         "category": "Anomaly", "product_page_url": "https://example.com/jumpy/index.html"}
+price_jumps = []
+for row in (jumpy, dict(jumpy, price="£30.00"), dict(jumpy, price="£30.00", title="Jumpy (2nd edition)")):
+    pipeline.scraper = lambda max_pages, row=row, **kwargs: iter([row])
+    summary = pipeline.run_pipeline(1, anomalies=True)
+    assert summary["updated"] + summary["inserted"] == 1
+    price_jumps.append(summary["anomalies"]["price_jump"])
+print("Price jumps per run:", price_jumps)
+assert price_jumps == [0, 1, 0]  # the title-only change does not flag the same move again
+pipeline.scraper = scraper
@@ -0,0 +1,87 @@
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from sqlalchemy import event
+
+from src.db.book_index import BookIndex
+from src.db.connector import bulk_upsert_books, content_hash, get_engine, get_session, upsert_books
+from src.db.history import record_snapshots
+from src.db.init_db import create_tables
+from src.db.models import Book, BookSnapshot
+
+create_tables()
+
+URL = "https://books.toscrape.com/catalogue/index-{}/index.html"
+
+
+def book(i, price=10.0):
+    return {"title": f"Book {i}", "price": price, "rating": 3, "availability": 5, "category": "Poetry",
+            "product_page_url": URL.format(i)}
+
+
+statements = []
+
+
+def record(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def books_selects():
+    """SELECTs that read the books table (INSERT ... RETURNING excluded)."""
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and "FROM books" in s]
+
+
+event.listen(get_engine(), "before_cursor_execute", record)
+
+print("=== Testing BookIndex.warm() ===")
+bulk_upsert_books([book(i) for i in range(10)])
+index = BookIndex.warm()
+assert index.complete and len(index) >= 10
+with get_session() as session:
+    stored = {b.product_page_url: (b.id, b.content_hash) for b in session.query(Book).filter(Book.product_page_url.like(URL.format("%")))}
+assert index.lookup(stored) == stored
+print("Index stats:", index.stats())
+
+print("=== Testing bulk_upsert_books(index=...) without SELECTs on books ===")
+statements.clear()
+rows = [book(i, price=11.0) for i in range(5)] + [book(i) for i in range(5, 15)]  # 5 changed, 5 same, 5 new
+counts = bulk_upsert_books(rows, index=index)
+snapshots = record_snapshots(rows, index=index)
+print("Counts:", counts, "snapshots:", snapshots)
+assert counts == {"inserted": 5, "updated": 5, "unchanged": 5}
+assert books_selects() == [], books_selects()
+with get_session() as session:
+    new_ids = dict(session.query(Book.product_page_url, Book.id).filter(
+        Book.product_page_url.in_([URL.format(i) for i in range(10, 15)])))
+    assert index.ids(new_ids) == new_ids
+    assert session.query(BookSnapshot).filter(BookSnapshot.book_id.in_(new_ids.values())).count() == 5
+assert index.hashes([URL.format(0)]) == {URL.format(0): content_hash(book(0, price=11.0))}
+
+print("=== Testing that a rolled-back transaction leaves the index unchanged ===")
+try:
+    with index.staged(), get_session() as session:
+        bulk_upsert_books([book(99)], session=session, index=index)
+        assert URL.format(99) in index.ids([URL.format(99)])  # visible to its own transaction
+        raise RuntimeError("rollback")
+except RuntimeError:
+    pass
+assert index.ids([URL.format(99)]) == {}
+
+print("=== Testing upsert_books(index=...) ===")
+statements.clear()
+assert upsert_books([book(0, price=12.0), book(1, price=11.0), book(20)], index=index) == 2
+assert books_selects() == []
+with get_session() as session:
+    assert session.query(Book.price).filter_by(product_page_url=URL.format(0)).scalar() == 12.0
+    book_20 = session.query(Book.id).filter_by(product_page_url=URL.format(20)).scalar()
+assert index.ids([URL.format(20)]) == {URL.format(20): book_20}
+
+print("=== Testing eviction ===")
+small = BookIndex.warm(max_entries=4)
+assert not small.complete and len(small) == 4 and small.evictions > 0
+statements.clear()
+counts = bulk_upsert_books([book(i, price=12.0) for i in range(3)], index=small)
+print("Counts:", counts, "stats:", small.stats())
+assert counts == {"inserted": 0, "updated": 2, "unchanged": 1}  # evicted books are found again
+assert len(books_selects()) == 1 and len(small) == 4
+
+event.remove(get_engine(), "before_cursor_execute", record)
@@ -0,0 +1,67 @@
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from src.db.init_db import create_tables
+from src.db.book_index import BookIndex
+from src.db.connector import bulk_upsert_books, diff_books, existing_hashes, get_session
+from src.db.models import Book
+
+create_tables()
+
+URL = "https://books.toscrape.com/catalogue/bulk-upsert-{}/index.html"
+
+print("=== Testing bulk_upsert_books() ===")
+first = [
+    {"title": f"Bulk {i}", "price": 10.0 + i, "rating": 3, "availability": 5, "product_page_url": URL.format(i)}
+    for i in range(5)
+]
+counts1 = bulk_upsert_books(first, chunk_size=2)
+print("First run:", counts1)
+assert counts1 == {"inserted": 5, "updated": 0, "unchanged": 0}
+
+second = [
+    {"title": "Bulk 0 (v2)", "price": 99.99, "rating": 5, "availability": 1, "product_page_url": URL.format(0)},
+    {"title": "Bulk 5", "price": 15.0, "rating": 2, "availability": 3, "product_page_url": URL.format(5)},
+    # duplicate URL inside one chunk: last row wins
+    {"title": "Bulk 0 (v3)", "price": 88.88, "rating": 4, "availability": 2, "product_page_url": URL.format(0)},
+]
+counts2 = bulk_upsert_books(second)
+print("Second run:", counts2)
+assert counts2 == {"inserted": 1, "updated": 1, "unchanged": 0}
+
+with get_session() as session:
+    book0 = session.query(Book).filter_by(product_page_url=URL.format(0)).one()
+    print("Updated row:", book0.title, book0.price, book0.rating, book0.availability)
+    assert (book0.title, book0.price, book0.rating, book0.availability) == ("Bulk 0 (v3)", 88.88, 4, 2)
+    assert session.query(Book).filter(Book.product_page_url.like(URL.format("%"))).count() == 6
+
+print("=== Testing a URL repeated across chunks ===")
+repeated = [
+    {"title": "Bulk 6", "price": 16.0, "rating": 2, "availability": 3, "product_page_url": URL.format(6)},
+    {"title": "Bulk 7", "price": 17.0, "rating": 2, "availability": 3, "product_page_url": URL.format(7)},
+    {"title": "Bulk 6 (v2)", "price": 16.5, "rating": 2, "availability": 3, "product_page_url": URL.format(6)},
+    {"title": "Bulk 7", "price": 17.0, "rating": 2, "availability": 3, "product_page_url": URL.format(7)},
+]
+counts_repeated = bulk_upsert_books(repeated, chunk_size=2, stored_hashes={})
+print("Repeated URLs with stored_hashes:", counts_repeated)
+assert counts_repeated == {"inserted": 2, "updated": 1, "unchanged": 1}
+index = BookIndex.warm()
+repeated = [dict(row, product_page_url=row["product_page_url"].replace("-6/", "-8/").replace("-7/", "-9/"))
+            for row in repeated]
+counts_indexed = bulk_upsert_books(repeated, chunk_size=2, index=index)
+print("Repeated URLs with a BookIndex:", counts_indexed)
+assert counts_indexed == counts_repeated
+assert index.hashes([URL.format(8), URL.format(9)]) == existing_hashes([URL.format(8), URL.format(9)])
+
+print("=== Testing change detection ===")
+third = [dict(first[i]) for i in range(1, 5)]
+third[0]["price"] = 42.0
+changed, diff = diff_books(third)
+print("Diff:", diff)
+assert diff == {"new": 0, "changed": 1, "unchanged": 3} and changed == [third[0]]
+counts3 = bulk_upsert_books(third)
+print("Third run:", counts3)
+assert counts3 == {"inserted": 0, "updated": 1, "unchanged": 3}
+assert bulk_upsert_books(third) == {"inserted": 0, "updated": 0, "unchanged": 4}
+
+print("Empty input:", bulk_upsert_books([]))
+assert bulk_upsert_books(iter([])) == {"inserted": 0, "updated": 0, "unchanged": 0}
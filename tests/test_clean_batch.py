@@ -0,0 +1,65 @@
+import pandas as pd
+
+from src.processing.clean import (
+    clean_batch, clean_frame, clean_row, frame_to_rows, to_availability, to_price, to_rating,
+)
+
+print("=== Testing clean_batch() / clean_frame() against clean_row() ===")
+
+# Same inputs as test_clean.py, test_clean_availability.py and test_clean_row.py
+prices = ['51.77', '£51.77', '  £99.99  ', None, '']
+ratings = ['Five', 'three', '4', '4.0', None, '']
+availabilities = ["In stock (22 available)", "15 in stock", "In stock", "Out of Stock", None, "Availability: TBD"]
+
+rows = []
+for i, (price, rating, availability) in enumerate(zip(prices * 2, ratings, availabilities)):
+    rows.append({
+        "title": f"Book {i}",
+        "price": price,
+        "rating": rating,
+        "availability": availability,
+        "product_page_url": f"https://books.toscrape.com/catalogue/book_{i}/index.html",
+    })
+rows += [
+    {
+        "title": "A Light in the Attic",
+        "price": "£51.77",
+        "rating": "Three",
+        "availability": "In stock (22 available)",
+        "product_page_url": "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html",
+    },
+    {
+        "title": "A Light in the Attic",
+        "price_raw": "£51.77",
+        "rating_raw": "Three",
+        "availability_raw": "In stock",
+        "product_page_url": "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html",
+    },
+    {"title": "", "price": "£10.00", "rating": "Two", "availability": "In stock", "product_page_url": ""},
+    # rating as the scraper returns it (int)
+    {"title": "Int rating", "price": "1.00", "rating": 3, "availability": "In stock", "product_page_url": "u"},
+]
+
+expected = [c for c in map(clean_row, rows) if c]
+batched = clean_batch(rows)
+print("clean_row:  ", expected[:2])
+print("clean_batch:", batched[:2])
+assert batched == expected
+
+frame = clean_frame(pd.DataFrame.from_records(rows))
+print(frame.dtypes.to_dict())
+assert list(frame["price"].fillna(-1)) == [-1 if c["price"] is None else c["price"] for c in expected]
+assert [to_price(p) for p in prices] == [51.77, 51.77, 99.99, None, None]
+assert [to_rating(r) for r in ratings] == [5, 3, 4, 4, None, None]
+assert [to_availability(a) for a in availabilities] == [22, 15, 1, None, None, None]
+
+assert clean_batch([]) == []
+assert clean_batch([None, {}]) == []
+
+print("=== Testing that category survives cleaning ===")
+categorised = [dict(row, category=category) for row, category in zip(rows, ["Poetry", "  Travel ", "", None] * 4)]
+assert [c["category"] for c in clean_batch(categorised)] == [c["category"] for c in map(clean_row, categorised) if c]
+assert clean_batch(categorised)[:4] == [dict(c, category=category) for c, category
+                                         in zip(expected[:4], ["Poetry", "Travel", None, None])]
+assert [c["category"] for c in frame_to_rows(clean_frame(pd.DataFrame.from_records(categorised)))][:2] == \
+    ["Poetry", "Travel"]
@@ -0,0 +1,68 @@
+import tempfile
+from datetime import datetime, timedelta
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from src.db.compaction import compact_raw_books
+from src.db.connector import make_engine
+from src.db.models import Base, RawBook
+
+# A database of its own: compaction rewrites every raw row in it
+engine = make_engine(f"sqlite:///{tempfile.mkdtemp()}/compaction.db")
+Base.metadata.create_all(engine)
+
+URL = "https://books.toscrape.com/catalogue/compaction-{}/index.html"
+NOW = datetime(2026, 1, 1)
+
+
+def obs(url, days_ago, price="£10.00", title="Book"):
+    return {"title": title, "price_raw": price, "rating_raw": "3", "availability_raw": "In stock",
+            "category": "Poetry", "product_page_url": URL.format(url), "timestamp": NOW - timedelta(days=days_ago)}
+
+
+def stored(url):
+    with Session(engine) as session:
+        return [(r.price_raw, r.timestamp, r.valid_to, r.observations) for r in
+                session.query(RawBook).filter_by(product_page_url=URL.format(url)).order_by(RawBook.id)]
+
+
+history = [
+    obs("a", 5), obs("a", 4), obs("a", 3), obs("a", 2, price="£12.00"), obs("a", 1),  # A A A B A
+    obs("once", 1),
+    obs("old", 400), obs("old", 300, price="£11.00"), obs("old", 10, price="£12.00"),
+    obs("gone", 400),                                                   # latest row of its URL: kept
+    obs("range", 400), obs("range", 200),                               # one range ending 200 days ago
+]
+# Bulk of repeats with long titles, so whole pages are freed
+history += [obs(f"bulk-{i}", days, title="x" * 200) for i in range(300) for days in (3, 2, 1)]
+
+with Session(engine) as session:
+    session.execute(insert(RawBook.__table__), history)
+    session.commit()
+
+print("=== Testing compact_raw_books() ===")
+with Session(engine) as session:
+    report = compact_raw_books(retention_days=365, batch_size=7, session=session, now=NOW)
+    session.commit()
+print("Report:", report)
+assert report["scanned"] == len(history)
+assert report["merged"] == 2 + 1 + 600 and report["ranges"] == 1 + 1 + 300
+assert report["expired"] == 1
+assert report["bytes_reclaimed"] > 0 and report["bytes_after"] == report["bytes_before"] - report["bytes_reclaimed"]
+
+a = stored("a")
+assert [(price, observations) for price, _, _, observations in a] == [("£10.00", 3), ("£12.00", None), ("£10.00", None)]
+assert a[0][1] == NOW - timedelta(days=5) and a[0][2] == NOW - timedelta(days=3)
+assert stored("once") == [("£10.00", NOW - timedelta(days=1), None, None)]
+assert [price for price, *_ in stored("old")] == ["£11.00", "£12.00"]
+assert len(stored("gone")) == 1
+assert stored("range") == [("£10.00", NOW - timedelta(days=400), NOW - timedelta(days=200), 2)]
+assert [observations for *_, observations in stored("bulk-7")] == [3]
+
+print("=== Testing that a second pass changes nothing ===")
+with Session(engine) as session:
+    again = compact_raw_books(retention_days=365, session=session, now=NOW)
+assert (again["merged"], again["ranges"], again["expired"]) == (0, 0, 0)
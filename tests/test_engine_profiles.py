@@ -0,0 +1,41 @@
+import tempfile
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from sqlalchemy import select, text
+
+from src.db.connector import engine, insert_raw_books, make_engine, stream_query
+from src.db.init_db import create_tables
+from src.db.models import RawBook
+
+print("=== Testing engine profiles ===")
+tuned = make_engine(f"sqlite:///{tempfile.mkdtemp()}/tuned.db", profile="tuned")
+plain = make_engine(f"sqlite:///{tempfile.mkdtemp()}/plain.db", profile="default")
+with tuned.connect() as conn:
+    tuned_pragmas = [conn.execute(text(f"PRAGMA {p}")).scalar() for p in ("journal_mode", "synchronous", "mmap_size")]
+with plain.connect() as conn:
+    plain_pragmas = [conn.execute(text(f"PRAGMA {p}")).scalar() for p in ("journal_mode", "synchronous", "mmap_size")]
+print("tuned:", tuned_pragmas, "default:", plain_pragmas)
+
+assert tuned_pragmas[0] == "wal"
+assert tuned_pragmas[1] == 1  # NORMAL
+assert tuned_pragmas[2] > 0
+assert plain_pragmas[0] == "delete"
+
+try:
+    make_engine("sqlite://", profile="fast")
+    raise AssertionError("unknown profile must raise")
+except ValueError as e:
+    print("Unknown profile:", e)
+
+print("=== Testing stream_query() ===")
+create_tables()
+rows = [{"title": f"Book {i}", "price": "£1.00", "availability": "In stock", "rating": 3,
+         "product_page_url": f"https://example.com/stream_{i}", "category": "Poetry"} for i in range(25)]
+insert_raw_books(rows)
+statement = select(RawBook.title).where(RawBook.product_page_url.like("%stream_%")).order_by(RawBook.id)
+chunks = list(stream_query(statement, chunk_size=10))
+print("Chunk sizes:", [len(c) for c in chunks])
+assert [len(c) for c in chunks] == [10, 10, 5]
+assert [r.title for c in chunks for r in c] == [f"Book {i}" for i in range(25)]
+print("Shared engine:", engine.url)
@@ -0,0 +1,89 @@
+import math
+import tempfile
+from pathlib import Path
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+import pytest
+
+pytest.importorskip("pyarrow")  # optional dependency of the export stage
+
+import pyarrow.compute as pc
+
+import src.metrics as metrics
+import src.pipeline as pipeline
+from benchmarks.fixtures import book as fixture_book
+from benchmarks.server import FixtureServer
+from src.db.connector import bulk_upsert_books, insert_raw_books
+from src.db.init_db import create_tables
+from src.export import export_table, export_tables, read_export
+from src.processing.anomaly import load_stats, load_stats_from_export
+from src.scrape.scraper import scraper
+
+create_tables()
+
+URL = "https://books.toscrape.com/catalogue/export-{}/index.html"
+CATEGORIES = ["Poetry", "Travel", "Science Fiction", None]
+
+rows = [{"title": f"Export {i}", "price": 10.0 + i, "rating": i % 5 + 1, "availability": i % 7,
+         "category": CATEGORIES[i % 4], "product_page_url": URL.format(i)} for i in range(40)]
+bulk_upsert_books(rows)
+insert_raw_books({"title": r["title"], "price": f"£{r['price']:.2f}", "availability": "In stock",
+                  "rating": "Three", "category": r["category"], "product_page_url": r["product_page_url"]}
+                 for r in rows)
+
+for fmt in ("parquet", "ipc"):
+    print(f"=== Testing export_tables() ({fmt}) ===")
+    export_dir = tempfile.mkdtemp()
+    results = export_tables(fmt=fmt, export_dir=export_dir, chunk_size=15)
+    print(results)
+    assert results["books"]["rows"] >= 40 and results["raw_books"]["rows"] >= 40
+    partitions = {p.name for p in Path(export_dir).glob("books/category=*")}
+    assert {"category=Science%20Fiction", "category=__HIVE_DEFAULT_PARTITION__"} <= partitions
+    assert all(p.suffix == (".parquet" if fmt == "parquet" else ".arrow")
+               for p in Path(export_dir).rglob("part-*"))
+
+    ours = pc.starts_with(pc.field("product_page_url"), URL.format("")[:-len("/index.html")])
+    books = read_export("books", filter=ours, export_dir=export_dir)
+    assert books.num_rows == 40
+    assert sorted(books["price"].to_pylist()) == [10.0 + i for i in range(40)]
+    assert books["category"].null_count == 10
+
+    print("=== Testing projection and partition pruning ===")
+    poetry = read_export("books", columns=["product_page_url", "price"], filter=ours & (pc.field("category") == "Poetry"),
+                         export_dir=export_dir)
+    assert poetry.column_names == ["product_page_url", "price"]
+    assert sorted(poetry["product_page_url"].to_pylist()) == sorted(URL.format(i) for i in range(0, 40, 4))
+    raw = read_export("raw_books", columns=["price_raw"], filter=pc.field("product_page_url") == URL.format(3),
+                      export_dir=export_dir)
+    assert raw["price_raw"].to_pylist() == ["£13.00"]
+
+    print("=== Testing load_stats_from_export() ===")
+    from_db, from_export = load_stats(), load_stats_from_export(export_dir)
+    assert math.isclose(from_db.price_mean, from_export.price_mean)
+    assert math.isclose(from_db.availability_std, from_export.availability_std)
+    assert from_db.by_category.keys() == from_export.by_category.keys()
+
+    print("=== Testing that a re-export replaces the previous one ===")
+    again = export_table("books", fmt, export_dir=export_dir)
+    assert again["rows"] == results["books"]["rows"] == read_export("books", export_dir=export_dir).num_rows
+
+with pytest.raises(FileNotFoundError):
+    read_export("books", export_dir=tempfile.mkdtemp())
+
+print("=== Testing the category partitions of books written by the pipeline ===")
+metrics.REPORTS_DIR = tempfile.mkdtemp()  # keep reports/ clean
+pipeline.scraper = scraper  # other test modules in this process may have replaced it
+with FixtureServer(total_books=40) as server:
+    pipeline.run_pipeline(2, base_url=server.base_url)
+export_dir = tempfile.mkdtemp()
+export_table("books", export_dir=export_dir)
+scraped = read_export("books", columns=["title", "category"],
+                      filter=pc.starts_with(pc.field("product_page_url"), server.base_url), export_dir=export_dir)
+assert scraped.num_rows == 40 and scraped["category"].null_count == 0
+assert (Path(export_dir) / "books" / "category=Mystery").is_dir()
+mystery = read_export("books", columns=["title"], export_dir=export_dir,
+                      filter=(pc.field("category") == "Mystery") &
+                      pc.starts_with(pc.field("product_page_url"), server.base_url))
+assert mystery["title"].to_pylist() == [b["title"] for b in map(fixture_book, range(1, 41))
+                                        if b["category"] == "Mystery"]
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+import requests
+
+from benchmarks.fixtures import book
+from benchmarks.server import FixtureServer
+from src.scrape.http_index import FetchIndex
+from src.scrape.scraper import scraper
+
+print("=== Testing the fixture server ===")
+with FixtureServer(total_books=45) as server:
+    session = requests.Session()
+    assert session.get(server.base_url + "catalogue/page-3.html").status_code == 200
+    assert session.get(server.base_url + "catalogue/page-4.html").status_code == 404
+    assert session.get(server.base_url + "catalogue/book-46_46/index.html").status_code == 404
+    category = session.get(server.base_url + "catalogue/category/books/mystery_3/index.html")
+    assert "Book 1:" in category.text and "Book 51:" not in category.text
+    first = session.get(server.base_url + "catalogue/book-7_7/index.html")
+    again = session.get(server.base_url + "catalogue/book-7_7/index.html", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+    rows = list(scraper(start_path="catalogue/page-2.html", max_pages=1, base_url=server.base_url))
+    print("First row of page 2:", rows[0])
+    assert [r["title"] for r in rows] == [book(i)["title"] for i in range(21, 41)]
+    assert rows[0]["product_page_url"] == server.base_url + "catalogue/book-21_21/index.html"
+    assert rows[0]["category"] == book(21)["category"]
+    assert rows[0]["availability"] == f"In stock ({book(21)['stock']} available)"
+
+    index_path = os.path.join(tempfile.mkdtemp(), "http_index.db")
+    for expected in (20, 0):
+        index = FetchIndex(index_path)
+        rows = list(scraper(start_path="catalogue/page-1.html", max_pages=1, base_url=server.base_url, index=index))
+        index.commit()
+        index.close()
+        print("Incremental run rows:", len(rows))
+        assert len(rows) == expected
+    print("Requests served:", server.requests)
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from sqlalchemy import text
+
+from src.db.connector import bulk_upsert_books, engine, get_session
+from src.db.history import latest_snapshots_query, price_changes, price_history, record_snapshots, snapshots_as_of
+from src.db.init_db import create_tables
+from src.db.models import Book
+
+create_tables()
+
+URL = "https://books.toscrape.com/catalogue/history-{}/index.html"
+T0 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DAY = timedelta(days=1)
+
+
+def observe(day, prices, availability=5):
+    rows = [{"title": f"History {i}", "price": price, "rating": 3, "availability": availability,
+             "product_page_url": URL.format(i)} for i, price in enumerate(prices)]
+    bulk_upsert_books(rows)
+    return len(record_snapshots(rows, observed_at=T0 + day * DAY))
+
+
+print("=== Testing record_snapshots() ===")
+written = [
+    observe(0, [10.0, 20.0, 30.0]),
+    observe(1, [10.0, 20.0, 30.0]),        # nothing changed
+    observe(2, [9.0, 20.0, 35.0]),         # book 0 down, book 2 up
+    observe(3, [9.0, 20.0, 35.0], 4),      # availability change only
+    observe(4, [9.0, 15.0, 35.0, 40.0], 4),  # book 1 down, book 3 new
+]
+print("Snapshots per run:", written)
+assert written == [3, 0, 2, 3, 2]
+
+with get_session() as session:
+    ids = [session.query(Book.id).filter_by(product_page_url=URL.format(i)).scalar() for i in range(4)]
+
+print("=== Testing price_history() ===")
+history = price_history(ids[0])
+print("Book 0:", history)
+assert [(price, availability) for _, price, availability in history] == [(10.0, 5), (9.0, 5), (9.0, 4)]
+assert [price for _, price, _ in price_history(ids[0], start=T0 + DAY, end=T0 + 2 * DAY)] == [9.0]
+
+print("=== Testing snapshots_as_of() ===")
+as_of = snapshots_as_of(T0 + DAY, ids)
+assert {book_id: price for book_id, (_, price, _) in as_of.items()} == {ids[0]: 10.0, ids[1]: 20.0, ids[2]: 30.0}
+latest = snapshots_as_of(T0 + 10 * DAY, ids)
+assert [latest[book_id][1:] for book_id in ids] == [(9.0, 4), (15.0, 4), (35.0, 4), (40.0, 4)]
+
+print("=== Testing price_changes() ===")
+dropped = price_changes(T0 + DAY, T0 + 4 * DAY, "down")
+print("Dropped:", dropped)
+assert dropped == [(ids[0], URL.format(0), 10.0, 9.0), (ids[1], URL.format(1), 20.0, 15.0)]
+assert [row[0] for row in price_changes(T0 + DAY, T0 + 4 * DAY, "up")] == [ids[2]]
+assert price_changes(T0 + 3 * DAY, T0 + 4 * DAY) == [(ids[1], URL.format(1), 20.0, 15.0)]  # book 3 is new
+
+print("=== Testing that as-of lookups use the primary key ===")
+with engine.connect() as conn:
+    compiled = latest_snapshots_query(ids, T0).compile(engine, compile_kwargs={"literal_binds": True})
+    plan = " ".join(str(row[-1]) for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+print(plan)
+assert "SCAN" not in plan
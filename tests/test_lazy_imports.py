@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("bs4", "requests", "sqlalchemy", "pandas", "numpy", "pyarrow", "httpx")
+
+
+def fresh_interpreter(code, **env):
+    """Run `code` in a new interpreter and return what it prints as JSON."""
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, **env}, check=True)
+    return json.loads(result.stdout)
+
+
+print("=== Testing that the entry points don't import heavy dependencies ===")
+for module in ("src.config", "src.processing.clean", "src.pipeline"):
+    loaded = fresh_interpreter(f"import json, sys, {module}; "
+                               f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    print(module, "loaded:", loaded)
+    assert loaded == [], (module, loaded)
+
+print("=== Testing python -m src.pipeline --help ===")
+result = subprocess.run([sys.executable, "-m", "src.pipeline", "--help"], cwd=ROOT, capture_output=True, text=True)
+assert result.returncode == 0 and "--max-pages" in result.stdout
+
+print("=== Testing that importing src.db.connector has no side effects ===")
+db_path = Path(tempfile.mkdtemp()) / "nested" / "books.db"
+state = fresh_interpreter(
+    "import json, logging, os, src.db.connector as c; "
+    "before = [os.path.exists(os.environ['DATABASE_URL'][10:]), bool(logging.getLogger().handlers)]; "
+    "c.get_engine().connect().close(); "
+    "print(json.dumps(before + [os.path.exists(os.environ['DATABASE_URL'][10:]), c.engine is c.get_engine()]))",
+    DATABASE_URL=f"sqlite:///{db_path}",
+)
+print("db file before, logging configured, db file after connect, shared engine:", state)
+assert state == [False, False, True, True]
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+import requests
+from sqlalchemy import text
+
+from src.db.connector import engine
+from src.metrics import METRICS, Histogram, instrument_engine
+from src.scrape.scraper import fetch_response
+
+print("=== Testing Histogram ===")
+hist = Histogram()
+for ms in [5, 5, 20, 40, 300, 20000]:
+    hist.observe(ms / 1000)
+summary = hist.to_dict()
+print(summary)
+assert summary["count"] == 6
+assert summary["p50_ms"] == 25.0
+assert summary["p95_ms"] == 20000.0
+assert summary["buckets"] == {"<=10ms": 2, "<=25ms": 1, "<=50ms": 1, "<=500ms": 1, ">10000ms": 1}
+
+print("=== Testing stages, DB round-trips and profiling ===")
+METRICS.reset(profile=True)
+instrument_engine(engine)
+instrument_engine(engine)  # idempotent
+with METRICS.stage("clean") as stage:
+    data = [str(i) * 10 for i in range(50_000)]
+    stage.rows = len(data)
+with METRICS.stage("clean") as stage:
+    stage.rows = 10
+with engine.connect() as conn:
+    for _ in range(3):
+        conn.execute(text("SELECT 1"))
+
+report_dir = tempfile.mkdtemp()
+path = METRICS.write_report({"scraped": 0}, directory=report_dir)
+snapshot = json.loads(path.read_text())["metrics"]
+print(METRICS.format_stages(snapshot))
+clean = snapshot["stages"]["clean"]
+assert clean["rows"] == 50_010 and clean["calls"] == 2
+assert clean["peak_mb"] > 1  # traced allocations of `data`
+assert snapshot["counters"]["db_roundtrips"] == 3
+assert snapshot["tracemalloc_top"]
+assert any(name.startswith("profile_") for name in os.listdir(report_dir))
+
+
+class FlakySession:
+    """Fails the first request, then answers."""
+    calls = 0
+
+    def get(self, url, timeout=None, headers=None):
+        FlakySession.calls += 1
+        if FlakySession.calls == 1:
+            raise requests.ConnectionError("connection reset")
+        return FakeResponse()
+
+
+class FakeResponse:
+    text = "<html></html>"
+
+    def raise_for_status(self):
+        pass
+
+
+print("=== Testing fetch retry / latency counters ===")
+METRICS.reset()
+fetch_response(FlakySession(), "https://books.toscrape.com/index.html")
+snapshot = METRICS.snapshot()
+print(snapshot["counters"], snapshot["fetch_latency"])
+assert snapshot["counters"]["fetch_retries"] == 1
+assert snapshot["counters"]["fetches"] == snapshot["fetch_latency"]["count"] == 2
@@ -0,0 +1,50 @@
+import tempfile
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+import src.pipeline as pipeline
+import src.metrics as metrics
+from benchmarks.server import FixtureServer
+from src.db.connector import get_session
+from src.db.init_db import create_tables
+from src.db.models import Book
+from src.processing.clean import clean_batch
+from src.processing.parallel import ParsePool, parse_details_chunk
+from src.scrape.scraper import scraper
+
+create_tables()
+metrics.REPORTS_DIR = tempfile.mkdtemp()  # keep reports/ clean
+
+print("=== Testing parse_details_chunk() ===")
+assert parse_details_chunk((None,)) == ((None, None),)
+
+with FixtureServer(total_books=100) as server, ParsePool(2, ahead=1, clean_min_rows=1) as pool:  # 5 listing pages
+    print("=== Testing scraper(parse_pool=...) ===")
+    serial_pages, parallel_pages = [], []
+    serial = list(scraper(max_pages=5, base_url=server.base_url,
+                          on_page=lambda url, *_: serial_pages.append(url)))
+    parallel = list(scraper(max_pages=5, base_url=server.base_url, parse_pool=pool,
+                            on_page=lambda url, *_: parallel_pages.append(url)))
+    print("First row:", parallel[0])
+    assert len(parallel) == 100 and parallel == serial, "pool parsing must give the same rows in the same order"
+    assert parallel_pages == serial_pages
+    assert all(row["category"] and row["availability"] for row in parallel)
+
+    print("=== Testing ParsePool.clean() ===")
+    rows = serial * 3 + [{"title": None, "price": "£1.00", "rating": 1, "availability": "In stock",
+                          "product_page_url": "x"}]
+    assert pool.clean(rows) == clean_batch(rows)
+
+    print("=== Testing run_pipeline(parse_workers=2) ===")
+    summary = pipeline.run_pipeline(5, stream=True, batch_size=30, base_url=server.base_url, parse_workers=2)
+    print("Summary:", {k: summary[k] for k in ("scraped", "cleaned", "inserted")})
+    assert summary["scraped"] == summary["cleaned"] == summary["inserted"] == 100
+    with get_session() as session:
+        assert session.query(Book).filter(Book.product_page_url.like(server.base_url + "%")).count() == 100
+
+    try:
+        pipeline.run_pipeline(1, workers=2, parse_workers=2, base_url=server.base_url)
+    except ValueError as e:
+        print("Rejected:", e)
+    else:
+        raise AssertionError("parse_workers with workers > 1 must be rejected")
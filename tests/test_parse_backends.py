@@ -0,0 +1,39 @@
+from benchmarks.fixtures import book, render_listing_page, render_product_page
+from src.scrape.scraper import parse_listing_page, parse_product_details, parse_product_page, resolve_parser
+
+print("=== Testing parser backends / strained parsing ===")
+backends = ["html.parser", resolve_parser("auto")]
+listing = render_listing_page(2, 100)
+product = render_product_page(7)
+url = "https://books.toscrape.com/catalogue/page-2.html"
+
+expected_listing = parse_listing_page(listing, url, parser="html.parser", strain=False)
+expected_details = parse_product_details(product, parser="html.parser", strain=False)
+print("Baseline:", expected_listing[0][0], expected_listing[1], expected_details)
+
+for backend in backends:
+    for strain in (False, True):
+        assert parse_listing_page(listing, url, parser=backend, strain=strain) == expected_listing
+        assert parse_product_details(product, parser=backend, strain=strain) == expected_details
+
+assert len(expected_listing[0]) == 20
+assert expected_listing[1] == "https://books.toscrape.com/catalogue/page-3.html"
+
+# A row rebuilt from the product page alone matches the listing card + details
+card = parse_listing_page(render_listing_page(1, 20), url)[0][6]
+row = parse_product_page(product, card["product_page_url"])
+print("From product page:", row)
+assert {k: row[k] for k in card} == card
+
+print("=== Testing product URLs on listing pages after the first ===")
+# Card links are relative to their listing page: "catalogue/<slug>/index.html"
+# on index.html, "<slug>/index.html" on catalogue/page-N.html
+page_2 = [card["product_page_url"] for card in expected_listing[0]]
+print("Page 2 product URL:", page_2[0])
+assert page_2 == [f"https://books.toscrape.com/catalogue/{book(i)['slug']}/index.html" for i in range(21, 41)]
+card_html = '<article class="product_pod"><h3><a href="{}" title="A Light in the Attic">A Light...</a></h3></article>'
+from_index = parse_listing_page(card_html.format("catalogue/a-light-in-the-attic_1000/index.html"),
+                                "https://books.toscrape.com/index.html")[0][0]
+from_page_2 = parse_listing_page(card_html.format("a-light-in-the-attic_1000/index.html"), url)[0][0]
+assert from_index["product_page_url"] == from_page_2["product_page_url"] == \
+    "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html"
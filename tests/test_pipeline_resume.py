@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+import src.pipeline as pipeline
+import src.metrics as metrics
+from benchmarks.server import FixtureServer
+from src.db.connector import bulk_upsert_books, get_session
+from src.db.init_db import create_tables
+from src.db.models import Book, RawBook
+
+create_tables()
+metrics.REPORTS_DIR = tempfile.mkdtemp()  # keep reports/ clean
+checkpoint_path = os.path.join(tempfile.mkdtemp(), "checkpoint.json")
+
+
+def stored(model, base_url):
+    with get_session() as session:
+        return session.query(model).filter(model.product_page_url.like(base_url + "%")).count()
+
+
+def upsert_failing_on(call):
+    calls = []
+
+    def upsert(rows, **kwargs):
+        calls.append(1)
+        if len(calls) == call:
+            raise RuntimeError("database went away")
+        return bulk_upsert_books(rows, **kwargs)
+    return upsert
+
+
+with FixtureServer(total_books=100) as server:  # 5 listing pages of 20 books
+    print("=== Testing a resumable run that crashes ===")
+    pipeline.bulk_upsert_books = upsert_failing_on(3)
+    try:
+        pipeline.run_pipeline(5, batch_size=30, base_url=server.base_url, resume=True,
+                              checkpoint_path=checkpoint_path)
+    except RuntimeError as e:
+        print("Crashed mid-run:", e)
+    state = json.load(open(checkpoint_path))
+    print("Checkpoint:", {k: v for k, v in state.items() if k not in ("done", "pending")})
+    # Batches 1-2 hold books 1-60: pages 1-2 complete, page 3 fully committed but not closed yet
+    assert state["batches"] == [1, 2]
+    assert state["pages_done"] == 2 and state["listing_url"].endswith("page-3.html")
+    assert len(state["done"]) == 20 and state["pending"] == []
+    assert stored(RawBook, server.base_url) == stored(Book, server.base_url) == 60
+
+    print("=== Testing --resume ===")
+    pipeline.bulk_upsert_books = bulk_upsert_books
+    requests_before = server.requests
+    summary = pipeline.run_pipeline(5, batch_size=30, base_url=server.base_url, resume=True,
+                                    checkpoint_path=checkpoint_path)
+    print("Resumed summary:", {k: summary[k] for k in ("scraped", "inserted", "checkpoint")})
+    assert summary["checkpoint"]["resumed"] and summary["checkpoint"]["pages_done"] == 2
+    assert summary["checkpoint"]["batches"] == 2
+    assert summary["scraped"] == summary["inserted"] == 40
+    assert server.requests - requests_before == 3 + 40  # listing pages 3-5 and the 40 new books
+    assert stored(RawBook, server.base_url) == stored(Book, server.base_url) == 100
+    assert not os.path.exists(checkpoint_path)
+
+    print("=== Testing a fresh resumable run ===")
+    summary = pipeline.run_pipeline(1, batch_size=30, base_url=server.base_url, resume=True,
+                                    checkpoint_path=checkpoint_path)
+    assert not summary["checkpoint"]["resumed"] and summary["scraped"] == 20
+    assert not os.path.exists(checkpoint_path)
@@ -0,0 +1,125 @@
+import os
+import tempfile
+from functools import partial
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from benchmarks.fixtures import book_index, render_listing_page, render_product_page
+import src.pipeline as pipeline
+import src.processing.anomaly as anomaly
+import src.metrics as metrics
+from src.db.init_db import create_tables
+from src.db.connector import get_session
+from src.db.models import Book
+from src.scrape.sharded import sharded_scraper
+
+create_tables()
+metrics.REPORTS_DIR = tempfile.mkdtemp()  # keep reports/ clean
+
+URL = "https://books.toscrape.com/catalogue/streaming-{}/index.html"
+
+
+def fake_scraper(max_pages=1, fail_after=None, price_offset=0, **kwargs):
+    for i in range(25):
+        if fail_after is not None and i == fail_after:
+            raise RuntimeError("network died")
+        yield {
+            "title": f"Streamed {i}",
+            "price": f"£{10 + i + price_offset}.00",
+            "availability": "In stock (3 available)",
+            "rating": 4,
+            "product_page_url": URL.format(i),
+            "category": "Poetry",
+        }
+
+
+def stored():
+    with get_session() as session:
+        return session.query(Book).filter(Book.product_page_url.like(URL.format("%"))).count()
+
+
+print("=== Testing run_pipeline(stream=True) ===")
+pipeline.scraper = lambda max_pages, **kwargs: fake_scraper(max_pages, fail_after=15)
+try:
+    pipeline.run_pipeline(1, stream=True, batch_size=10)
+except RuntimeError as e:
+    print("Crashed mid-run:", e)
+print("Rows that survived the crash:", stored())
+assert stored() == 10
+
+pipeline.scraper = fake_scraper
+summary = pipeline.run_pipeline(1, stream=True, batch_size=10)
+print("Streaming summary:", summary)
+# The 10 books committed before the crash are unchanged: not raw-inserted or rewritten again
+assert summary["scraped"] == summary["cleaned"] == 25
+assert summary["raw_inserted"] == 15
+assert (summary["inserted"], summary["updated"], summary["upserted"]) == (15, 0, 15)
+assert summary["changes"] == {"new": 15, "changed": 0, "unchanged": 10}
+assert set(summary["timings"]) == set(pipeline.STAGES)
+assert stored() == 25
+stages = summary["metrics"]["stages"]
+print("Metrics:", metrics.METRICS.format_stages(summary["metrics"]))
+assert stages["scrape"]["rows"] == 25 and stages["scrape"]["calls"] == 4  # 3 batches + the empty pull
+assert stages["upsert"]["rows"] == 15
+assert summary["metrics"]["counters"]["db_roundtrips"] > 0
+assert os.path.exists(summary["metrics_report"])
+
+batch_summary = pipeline.run_pipeline(1)
+print("Batch summary:", batch_summary)
+assert set(batch_summary) == set(summary)
+assert batch_summary["changes"] == {"new": 0, "changed": 0, "unchanged": 25}
+assert batch_summary["raw_inserted"] == batch_summary["upserted"] == 0
+
+pipeline.scraper = lambda max_pages, **kwargs: fake_scraper(max_pages, price_offset=1)
+changed_summary = pipeline.run_pipeline(1)
+assert changed_summary["changes"] == {"new": 0, "changed": 25, "unchanged": 0}
+assert changed_summary["raw_inserted"] == changed_summary["updated"] == 25
+
+anomaly.REPORTS_DIR = anomaly.Path(tempfile.mkdtemp())  # keep reports/ clean
+pipeline.scraper = lambda max_pages, **kwargs: fake_scraper(max_pages, price_offset=2)
+anomaly_summary = pipeline.run_pipeline(1, stream=True, batch_size=10, anomalies=True)
+print("Anomalies:", anomaly_summary["anomalies"])
+assert anomaly_summary["updated"] == 25
+assert anomaly_summary["anomalies"]["scored"] == 25
+assert "anomalies" in anomaly_summary["timings"]
+assert anomaly_summary["anomalies"]["report"].startswith(str(anomaly.REPORTS_DIR))
+
+print("=== Testing run_pipeline() with a failed shard ===")
+
+
+class ShardResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class ShardSite:
+    """5 listing pages of fixture books; page-3 is down."""
+
+    def get(self, url, timeout=None, headers=None):
+        if "/page-3." in url:
+            raise ConnectionError("page-3 is down")
+        if "/page-" in url:
+            page = int(url.rsplit("page-", 1)[1].split(".")[0])
+            return ShardResponse(render_listing_page(page, 100))
+        return ShardResponse(render_product_page(book_index(url.rstrip("/").split("/")[-2])))
+
+
+shard_base = "http://shards.invalid/"
+pipeline.sharded_scraper = partial(sharded_scraper, pages_per_shard=1, session_factory=ShardSite)
+for stream in (False, True):
+    try:
+        pipeline.run_pipeline(5, stream=stream, batch_size=20, workers=2, base_url=shard_base)
+    except RuntimeError as e:
+        print(f"stream={stream}:", e)
+        assert "catalogue/page-3.html" in str(e)
+    else:
+        raise AssertionError("a crawl with a failed shard was stored as complete")
+    with get_session() as session:
+        shard_books = session.query(Book).filter(Book.product_page_url.like(shard_base + "%")).count()
+    print("Books stored:", shard_books)
+    # batch mode stores nothing; streaming keeps the batches it committed, never page-3's books
+    assert (0 < shard_books <= 80) if stream else shard_books == 0
+pipeline.sharded_scraper = sharded_scraper
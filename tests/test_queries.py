@@ -0,0 +1,94 @@
+import tempfile
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+import src.metrics as metrics
+import src.pipeline as pipeline
+from benchmarks.fixtures import book as fixture_book
+from benchmarks.server import FixtureServer
+from src.db import queries
+from src.db.connector import bulk_upsert_books, get_session, upsert_books
+from src.db.init_db import create_tables
+from src.db.queries import books_page, books_query, cheapest_per_category, iter_books
+from src.scrape.scraper import scraper
+
+create_tables()
+
+URL = "https://books.toscrape.com/catalogue/queries-{}/index.html"
+CATEGORIES = ["Queries A", "Queries B"]
+
+
+def book(i, price=None):
+    return {"title": f"Query book {i}", "price": float(price if price is not None else i % 20),
+            "rating": i % 5 + 1, "availability": i % 4, "category": CATEGORIES[i % 2],
+            "product_page_url": URL.format(i)}
+
+
+bulk_upsert_books([book(i) for i in range(100)])
+
+print("=== Testing keyset pagination ===")
+pages, after = [], None
+while True:
+    page = books_page(category="Queries A", max_price=15, in_stock=True, limit=7, after=after)
+    pages.append(page["books"])
+    after = page["next"]
+    if after is None:
+        break
+rows = [b for page in pages for b in page]
+expected = {b["product_page_url"] for b in (book(i) for i in range(100))
+            if b["category"] == "Queries A" and b["price"] <= 15 and b["availability"] > 0}
+print(f"{len(pages)} pages, first:", rows[0])
+assert {b["product_page_url"] for b in rows} == expected and len(rows) == len(expected)
+assert all(len(page) == 7 for page in pages[:-1]) and 0 < len(pages[-1]) <= 7
+assert [(b["price"], b["id"]) for b in rows] == sorted((b["price"], b["id"]) for b in rows)
+
+by_id = books_page(category="Queries B", min_rating=4, order="id", limit=1000)
+assert by_id["next"] is None and [b["id"] for b in by_id["books"]] == sorted(b["id"] for b in by_id["books"])
+assert all(b["rating"] >= 4 and b["category"] == "Queries B" for b in by_id["books"])
+
+print("=== Testing iter_books() streaming ===")
+chunks = list(iter_books(category="Queries A", max_price=15, in_stock=True, chunk_size=4))
+assert all(len(chunk) <= 4 for chunk in chunks) and [b for chunk in chunks for b in chunk] == rows
+
+print("=== Testing cheapest_per_category() ===")
+cheapest = cheapest_per_category(3, category_names=CATEGORIES)
+print("Cheapest:", {c: [b["price"] for b in books] for c, books in cheapest.items()})
+assert set(cheapest) == set(CATEGORIES)
+assert [b["price"] for b in cheapest["Queries A"]] == [0.0, 0.0, 0.0] and len(cheapest["Queries B"]) == 3
+assert [b["price"] for b in cheapest_per_category(2, in_stock=True, category_names=["Queries B"])["Queries B"]] == [1.0, 1.0]
+
+print("=== Testing the result cache and its invalidation ===")
+queries.CACHE.clear()
+first = books_page(category="Queries B", limit=5)
+hits = queries.CACHE.stats()["hits"]
+assert books_page(category="Queries B", limit=5) == first and queries.CACHE.stats()["hits"] == hits + 1
+upsert_books([book(1, price=-1)])  # becomes the cheapest of Queries B
+assert books_page(category="Queries B", limit=5)["books"][0]["product_page_url"] == URL.format(1)
+assert cheapest_per_category(1, category_names=["Queries B"])["Queries B"][0]["price"] == -1
+with get_session() as session:  # the caller's transaction is never cached
+    bulk_upsert_books([book(3, price=-2)], session=session)
+    assert books_page(category="Queries B", limit=1, session=session)["books"][0]["price"] == -2
+assert books_page(category="Queries B", limit=1)["books"][0]["price"] == -2
+print("Cache:", queries.CACHE.stats())
+
+print("=== Testing that pages are index range scans ===")
+with get_session() as session:
+    for filters in ({"category": "Queries A"}, {"max_price": 5}, {"rating": 3}):
+        query = books_query(**filters, after=(1.0, 1)).limit(10)
+        compiled = query.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+        plan = " ".join(row[-1] for row in session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+        print(filters, "->", plan)
+        assert "USING INDEX ix_books_" in plan and "TEMP B-TREE" not in plan, plan
+
+print("=== Testing the read API on what the pipeline writes ===")
+metrics.REPORTS_DIR = tempfile.mkdtemp()  # keep reports/ clean
+pipeline.scraper = scraper  # other test modules in this process may have replaced it
+with FixtureServer(total_books=100) as server:  # 5 listing pages, 50 categories of 2 books
+    pipeline.run_pipeline(5, base_url=server.base_url)
+scraped = [fixture_book(i) for i in range(1, 101)]
+poetry = [b for b in books_page(category="Poetry", limit=1000)["books"]
+          if b["product_page_url"].startswith(server.base_url)]
+print("Poetry:", poetry)
+assert sorted(b["title"] for b in poetry) == sorted(b["title"] for b in scraped if b["category"] == "Poetry")
+cheapest = cheapest_per_category(1)
+assert None not in cheapest and {b["category"] for b in scraped} | set(CATEGORIES) <= set(cheapest)
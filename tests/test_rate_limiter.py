@@ -0,0 +1,107 @@
+import threading
+import time
+import unittest
+from email.utils import formatdate
+
+import requests
+
+from src.metrics import METRICS
+from src.scrape.ratelimit import RateLimiter, parse_retry_after
+from src.scrape.scraper import fetch_response
+
+URL = "https://books.toscrape.com/index.html"
+
+print("=== Testing parse_retry_after ===")
+assert parse_retry_after("3") == 3.0
+assert 5 < parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+assert parse_retry_after("soon") is None
+assert parse_retry_after(None) is None
+
+print("=== Testing AIMD ===")
+limiter = RateLimiter(rate=10, max_rate=20, min_rate=1, max_concurrency=4, target_latency=0.5, step=1)
+limiter.acquire(URL)
+limiter.release(URL, 0.01, 200)
+print("After a fast success:", limiter.state(URL))
+assert limiter.state(URL)["rate"] == 11 and limiter.state(URL)["limit"] == 4
+
+limiter.acquire(URL)
+limiter.release(URL, 0.01, 429)
+limiter.acquire(URL)
+limiter.release(URL, 0.01, 503)  # same cooldown window: no second cut
+print("After 429 + 503:", limiter.state(URL))
+assert limiter.state(URL)["rate"] == 5.5 and limiter.state(URL)["limit"] == 2
+
+limiter.acquire(URL)
+limiter.release(URL, 0.01, 404)  # client errors say nothing about load
+assert limiter.state(URL)["rate"] == 5.5
+assert limiter.state("https://example.com/")["rate"] == 10  # per host
+
+# A rate above max_rate starts at max_rate, and says so
+with unittest.TestCase().assertLogs("src.scrape.ratelimit", "WARNING") as logs:
+    assert RateLimiter(rate=50, max_rate=20).state(URL)["rate"] == 20
+assert "above max_rate" in logs.output[0]
+
+print("=== Testing Retry-After pause ===")
+limiter = RateLimiter(rate=100, max_rate=100, max_concurrency=2)
+limiter.acquire(URL)
+limiter.release(URL, 0.01, 503, retry_after=0.3)
+start = time.monotonic()
+limiter.acquire(URL)
+waited = time.monotonic() - start
+limiter.release(URL, 0.01, 200)
+print(f"Waited {waited:.2f}s")
+assert waited >= 0.25
+
+print("=== Testing that a scheduled retry does not hold a slot ===")
+limiter = RateLimiter(rate=100, max_rate=100, max_concurrency=1)
+order = []
+
+
+def retry():
+    limiter.acquire(URL, not_before=time.monotonic() + 0.3)
+    order.append("retry")
+    limiter.release(URL, 0.01, 200)
+
+
+thread = threading.Thread(target=retry)
+thread.start()
+time.sleep(0.05)
+limiter.acquire(URL)  # the only slot is free while the retry waits
+order.append("other")
+limiter.release(URL, 0.01, 200)
+thread.join()
+assert order == ["other", "retry"]
+
+
+class Response:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.text = "<html></html>"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+
+class BusySession:
+    """Answers 429 with Retry-After: 1 once, then 200."""
+    calls = 0
+
+    def get(self, url, timeout=None, headers=None):
+        BusySession.calls += 1
+        return Response(429, {"Retry-After": "1"}) if BusySession.calls == 1 else Response(200)
+
+
+print("=== Testing fetch_response with 429 + Retry-After ===")
+METRICS.reset()
+limiter = RateLimiter(rate=8, max_concurrency=4)
+start = time.monotonic()
+response = fetch_response(BusySession(), URL, throttle=limiter)
+elapsed = time.monotonic() - start
+counters = METRICS.snapshot()["counters"]
+print(f"Status {response.status_code} after {elapsed:.2f}s, counters {counters}, state {limiter.state(URL)}")
+assert response.status_code == 200
+assert 0.9 <= elapsed < 2  # Retry-After instead of the 2 s backoff
+assert counters["fetch_throttled"] == 1 and counters["fetch_retries"] == 1
+assert limiter.state(URL)["limit"] == 2 and limiter.state(URL)["in_flight"] == 0
@@ -0,0 +1,36 @@
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from src.db.init_db import create_tables
+from src.db.connector import get_session, insert_raw_books
+from src.db.models import RawBook
+
+create_tables()
+
+URL = "https://books.toscrape.com/catalogue/raw-loader-{}/index.html"
+
+
+def scraped(n):
+    for i in range(n):
+        yield {
+            "title": f"Raw {i}",
+            "price": "Â£51.77",
+            "availability": "In stock (22 available)",
+            "rating": 3 if i % 2 else None,
+            "product_page_url": URL.format(i),
+            "category": "Poetry",
+        }
+
+
+print("=== Testing insert_raw_books() ===")
+inserted = insert_raw_books(scraped(25), chunk_size=10)
+print("Inserted from a generator:", inserted)
+assert inserted == 25
+assert insert_raw_books([]) == 0
+
+with get_session() as session:
+    rows = session.query(RawBook).filter(RawBook.product_page_url.like(URL.format("%"))).order_by(RawBook.id).all()
+    print("First raw row:", rows[0].title, rows[0].price_raw, rows[0].rating_raw, rows[0].availability_raw)
+    assert len(rows) == 25
+    assert (rows[1].price_raw, rows[1].rating_raw, rows[1].category) == ("Â£51.77", "3", "Poetry")
+    assert rows[0].rating_raw is None
+    assert all(r.timestamp is not None for r in rows)
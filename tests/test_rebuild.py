@@ -0,0 +1,107 @@
+import tempfile
+
+import _db  # noqa: F401  (temporary DATABASE_URL, before src.db)
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+import src.metrics as metrics
+import src.pipeline as pipeline
+from benchmarks.server import FixtureServer
+from src.db.connector import content_hash, get_session, insert_raw_books, make_engine
+from src.db.init_db import create_tables
+from src.db.models import Base, Book
+from src.db.rebuild import backfill_content_hashes, rebuild_books, rebuild_statement
+from src.processing.clean import clean_row
+from src.scrape.scraper import scraper
+
+# A database of its own: rebuild_books() rewrites every book that has raw rows
+engine = make_engine(f"sqlite:///{tempfile.mkdtemp()}/rebuild.db")
+Base.metadata.create_all(engine)
+
+URL = "https://books.toscrape.com/catalogue/rebuild-{}/index.html"
+
+
+def raw(i, title="Book", price="Â£51.77", rating="Three", availability="In stock (22 available)"):
+    return {"title": title, "price": price, "rating": rating, "availability": availability,
+            "product_page_url": URL.format(i), "category": "Poetry"}
+
+
+history = [
+    raw(0, price="£10.00"), raw(0, price="£12.50", rating="Five"),     # latest row wins
+    raw(1, title="  Padded title  ", rating="4.0", availability="15 in stock"),
+    raw(2, rating="2.5", availability="Out of Stock"),                   # round half to even
+    raw(3, rating="7", availability="In stock"),                         # rating out of range
+    raw(4, rating="", availability="Currently unavailable"),
+    raw(5, price="free"),                                                # no price: skipped
+    raw(6, title="   "),                                                 # no title: skipped
+    raw(7, price="12", rating=" four ", availability=None),
+    raw(8), raw(8, title=None),                                          # latest raw row fails cleaning
+    {**raw(9), "category": "  "},                                        # blank category: NULL
+]
+
+with Session(engine) as session:
+    insert_raw_books(history, session=session)
+    session.commit()
+
+print("=== Testing rebuild_books() ===")
+with Session(engine) as session:
+    counts = rebuild_books(session=session)
+    session.commit()
+    print("First rebuild:", counts)
+    assert counts == {"inserted": 7, "updated": 0}
+
+    books = {b.product_page_url: b for b in session.query(Book)}
+    latest = {}
+    for row in history:
+        latest[row["product_page_url"]] = row
+    for url, row in latest.items():
+        expected = clean_row(row)
+        if expected is None or expected["price"] is None:
+            assert url not in books, url
+            continue
+        book = books[url]
+        got = {"title": book.title, "price": book.price, "rating": book.rating,
+               "availability": book.availability, "category": book.category,
+               "product_page_url": book.product_page_url}
+        print(got)
+        assert got == expected, (got, expected)
+        assert book.content_hash == content_hash(expected)
+
+print("=== Testing that a second rebuild rewrites nothing ===")
+with Session(engine) as session:
+    insert_raw_books([raw(1, title="Padded title", price="£1.00", rating="4.0", availability="15 in stock")],
+                     session=session)
+    counts = rebuild_books(session=session)
+    session.commit()
+    print("Second rebuild:", counts)
+    assert counts == {"inserted": 0, "updated": 1}
+    assert session.query(Book.price).filter_by(product_page_url=URL.format(1)).scalar() == 1.0
+
+print("=== Testing backfill_content_hashes() ===")
+with Session(engine) as session:
+    stored = dict(session.query(Book.id, Book.content_hash))
+    session.execute(update(Book).values(content_hash=None))
+    assert backfill_content_hashes(session=session, chunk_size=3) == len(stored)
+    assert dict(session.query(Book.id, Book.content_hash)) == stored
+    session.commit()
+
+print("=== Testing the PostgreSQL statement ===")
+sql = str(rebuild_statement("postgresql").compile(dialect=postgresql.dialect()))
+assert "SUBSTRING(" in sql and "ON CONFLICT (product_page_url) DO UPDATE" in sql and "IS DISTINCT FROM" in sql
+assert "btrim(raw.category" in sql
+
+print("=== Testing that a pipeline run after a rebuild sees no changes ===")
+create_tables()
+metrics.REPORTS_DIR = tempfile.mkdtemp()  # keep reports/ clean
+pipeline.scraper = scraper  # other test modules in this process may have replaced it
+with FixtureServer(total_books=40) as server:
+    pipeline.run_pipeline(2, base_url=server.base_url)
+    with get_session() as session:  # books drifted from raw_books
+        session.execute(update(Book).where(Book.product_page_url.startswith(server.base_url))
+                        .values(price=0.5, category=None, content_hash=None))
+    print("Rebuild:", rebuild_books())
+    changes = pipeline.run_pipeline(2, base_url=server.base_url)["changes"]
+print("Pipeline after rebuild:", changes)
+assert changes == {"new": 0, "changed": 0, "unchanged": 40}
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from src.scrape.cache import ResponseCache
+from src.scrape.scraper import fetch
+
+print("=== Testing ResponseCache ===")
+path = os.path.join(tempfile.mkdtemp(), "http_cache.db")
+cache = ResponseCache(path, ttl=60, max_bytes=25)
+
+cache.put("a", "x" * 10)
+cache.put("b", "y" * 10)
+print("get a:", cache.get("a"), "| missing:", cache.get("nope"))
+assert cache.get("a") == "x" * 10
+assert cache.get("nope") is None
+
+# "a" was used more recently than "b", so "b" is evicted
+cache.put("c", "z" * 10)
+print("Stats after eviction:", cache.stats())
+assert "b" not in cache and "a" in cache and "c" in cache
+assert cache.stats()["bytes"] <= 25
+
+cache.put("short", "s", ttl=0.01)
+time.sleep(0.02)
+assert cache.get("short") is None, "expired entries are misses"
+
+stats = cache.stats()
+assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1)
+cache.close()
+
+# entries survive a reopen
+reopened = ResponseCache(path, ttl=60, max_bytes=25)
+assert reopened.get("c") == "z" * 10
+
+print("=== Testing that hits do not write ===")
+writes = reopened._conn.total_changes
+accessed = time.time()
+assert reopened.get("a") == "x" * 10 and reopened.get("c") == "z" * 10
+assert reopened._conn.total_changes == writes
+reopened.close()
+with sqlite3.connect(path) as conn:  # access times are written on close
+    assert conn.execute("SELECT last_access >= ? FROM http_cache WHERE url = 'a'", (accessed,)).fetchone() == (1,)
+
+
+class CountingSession:
+    calls = 0
+
+    def get(self, url, timeout=None, headers=None):
+        CountingSession.calls += 1
+        response = type("Response", (), {})()
+        response.text = f"<html>{url}</html>"
+        response.status_code = 200
+        response.raise_for_status = lambda: None
+        return response
+
+
+print("=== Testing fetch() with a cache ===")
+cache = ResponseCache(":memory:", ttl=60, max_bytes=1024)
+first = fetch(CountingSession(), "https://books.toscrape.com/index.html", cache=cache)
+second = fetch(CountingSession(), "https://books.toscrape.com/index.html", cache=cache)
+print("Network calls:", CountingSession.calls, cache.stats())
+assert first == second and CountingSession.calls == 1
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from src.scrape.scraper import scraper
+
+LISTING = """
+<html><body><ol class="row">
+{cards}
+</ol></body></html>
+"""
+
+CARD = """
+<li><article class="product_pod">
+  <p class="star-rating {rating}"></p>
+  <h3><a href="catalogue/book_{i}/index.html" title="Book {i}">Book {i}</a></h3>
+  <div class="product_price"><p class="price_color">£{i}.50</p></div>
+</article></li>
+"""
+
+PRODUCT = """
+<html><body>
+<ul class="breadcrumb">
+  <li><a href="/index.html">Home</a></li>
+  <li><a href="/catalogue/category/books_1/index.html">Books</a></li>
+  <li><a href="/catalogue/category/books/poetry_23/index.html">Poetry</a></li>
+  <li class="active">Book {i}</li>
+</ul>
+<p class="instock availability"><i class="icon-ok"></i> In stock ({i} available)</p>
+</body></html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Serves one listing page with 8 books; later books answer faster."""
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def get(self, url, timeout=None, headers=None):
+        if url.endswith("index.html") and "book_" not in url:
+            ratings = ["One", "Two", "Three", "Four", "Five"]
+            cards = "".join(CARD.format(i=i, rating=ratings[i % 5]) for i in range(8))
+            return FakeResponse(LISTING.format(cards=cards))
+
+        i = int(url.split("book_")[1].split("/")[0])
+        with FakeSession.lock:
+            FakeSession.in_flight += 1
+            FakeSession.max_in_flight = max(FakeSession.max_in_flight, FakeSession.in_flight)
+        time.sleep(0.05 * (8 - i))
+        with FakeSession.lock:
+            FakeSession.in_flight -= 1
+        return FakeResponse(PRODUCT.format(i=i))
+
+
+print("=== Testing scraper() concurrency ===")
+serial = list(scraper(max_pages=1, concurrency=1, session_factory=FakeSession))
+print("Serial first row:", serial[0])
+
+FakeSession.max_in_flight = 0
+parallel = list(scraper(max_pages=1, concurrency=4, session_factory=FakeSession))
+print("Parallel first row:", parallel[0])
+print("Max requests in flight:", FakeSession.max_in_flight)
+
+assert parallel == serial, "concurrent scrape must give the same rows in the same order"
+assert [r["title"] for r in parallel] == [f"Book {i}" for i in range(8)]
+assert parallel[3]["category"] == "Poetry"
+assert parallel[3]["availability"] == "In stock (3 available)"
+assert 1 < FakeSession.max_in_flight <= 4
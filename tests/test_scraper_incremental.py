@@ -0,0 +1,122 @@
+import os
+import tempfile
+
+from src.scrape.http_index import FetchIndex
+from src.scrape.scraper import scraper
+
+BASE = "https://books.toscrape.com/"
+
+CARD = """
+<li><article class="product_pod">
+  <p class="star-rating Three"></p>
+  <h3><a href="catalogue/book_{i}/index.html" title="Book {i}">Book {i}</a></h3>
+  <div class="product_price"><p class="price_color">£1{i}.00</p></div>
+</article></li>
+"""
+
+PRODUCT = """
+<html><body>
+<ul class="breadcrumb">
+  <li><a href="/index.html">Home</a></li>
+  <li><a href="/catalogue/category/books_1/index.html">Books</a></li>
+  <li><a href="/catalogue/category/books/poetry_23/index.html">Poetry</a></li>
+  <li class="active">Book {i}</li>
+</ul>
+<div class="col-sm-6 product_main">
+  <h1>Book {i}</h1>
+  <p class="price_color">£1{i}.00</p>
+  <p class="instock availability"><i class="icon-ok"></i> In stock ({stock} available)</p>
+  <p class="star-rating Three"></p>
+</div>
+</body></html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSite:
+    """Listing + product 0 send ETags, product 1 sends no validators, product 2 changes."""
+    stock = {0: 5, 1: 6, 2: 7}
+    etag_version = 1
+    downloads = []  # URLs answered with a 200
+    down = set()  # books whose product page fails
+
+    def get(self, url, timeout=None, headers=None):
+        if url == BASE + "index.html":
+            body, etag = "<html>" + "".join(CARD.format(i=i) for i in range(3)) + "</html>", '"listing-v1"'
+        else:
+            i = int(url.split("book_")[1].split("/")[0])
+            if i in FakeSite.down:
+                raise RuntimeError(f"book {i} is down")
+            body = PRODUCT.format(i=i, stock=FakeSite.stock[i])
+            etag = f'"book-{i}-{FakeSite.stock[i]}-v{FakeSite.etag_version}"' if i != 1 else None
+        if etag and headers and headers.get("If-None-Match") == etag:
+            return FakeResponse("", status_code=304)
+        FakeSite.downloads.append(url)
+        return FakeResponse(body, headers={"ETag": etag} if etag else {})
+
+
+def run(commit=True):
+    """
+    One pipeline run: fresh FetchIndex on the same file, as in a new process.
+    commit: True (commit everything), False (crash before committing) or the
+    product URLs the run stored, as the streaming pipeline commits them.
+    """
+    index = FetchIndex(INDEX_PATH)
+    rows = list(scraper(max_pages=1, concurrency=1, session_factory=FakeSite, index=index))
+    if commit is True:
+        index.commit()
+    elif commit is not False:
+        index.commit(urls=commit)
+    index.close()
+    return rows, index
+
+
+print("=== Testing incremental scraper() ===")
+INDEX_PATH = os.path.join(tempfile.mkdtemp(), "http_index.db")
+
+first, index = run()
+print("First run rows:", len(first), "unchanged:", index.unchanged)
+assert len(first) == 3 and index.unchanged == 0
+
+FakeSite.stock[2] = 1
+second, index = run()
+print("Second run rows:", second, "unchanged:", index.unchanged)
+assert index.unchanged == 2
+# unchanged listing page: the changed book is rebuilt from its product page alone
+assert second == [dict(first[2], availability="In stock (1 available)")]
+
+# staged-but-uncommitted products are fetched again next run
+FakeSite.stock[0] = 9
+third, _ = run(commit=False)
+fourth, _ = run()
+print("Rows when the previous run was not committed:", len(third), len(fourth))
+assert [r["title"] for r in third] == [r["title"] for r in fourth] == ["Book 0"]
+
+print("=== Testing new validators on an unchanged body ===")
+FakeSite.etag_version = 2  # the server re-tags every product, bodies are the same
+product0 = BASE + "catalogue/book_0/index.html"
+rows, _ = run(commit=[])  # nothing stored: the pipeline only commits listing pages
+assert rows == [] and product0 in FakeSite.downloads
+FakeSite.downloads.clear()
+rows, _ = run(commit=[])
+print("Downloads once the new validators are known:", FakeSite.downloads)
+assert rows == [] and product0 not in FakeSite.downloads
+
+print("=== Testing a failed product page under an unchanged listing ===")
+FakeSite.down = {0}
+rows, index = run(commit=[])
+print("Rows:", rows, "unchanged:", index.unchanged)
+# The book is still reported, from the listing card kept in the index
+assert index.unchanged == 2  # products 1 and 2
+assert rows == [{**{k: first[0][k] for k in ("title", "price", "rating", "product_page_url")},
+                 "category": None, "availability": None}]
+FakeSite.down = set()
@@ -0,0 +1,121 @@
+import os
+import time
+
+from benchmarks.fixtures import CATEGORIES, book_index, render_listing_page, render_product_page
+from src.scrape.scraper import scraper
+from src.scrape.sharded import category_urls, page_count, page_shards, sharded_scraper
+
+TOTAL_BOOKS = 100  # 5 listing pages
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSite:
+    """books.toscrape.com-shaped catalogue with 10 ms of latency per request."""
+
+    def get(self, url, timeout=None, headers=None):
+        time.sleep(0.01)
+        if "/page-" in url:
+            page = int(url.rsplit("page-", 1)[1].split(".")[0])
+            return FakeResponse(render_listing_page(page, TOTAL_BOOKS))
+        return FakeResponse(render_product_page(book_index(url.rstrip("/").split("/")[-2])))
+
+
+print("=== Testing shard discovery helpers ===")
+first_page = render_listing_page(1, TOTAL_BOOKS)
+page_url = "https://books.toscrape.com/catalogue/page-1.html"
+assert page_count(first_page) == 5
+assert page_shards(12, 5) == [("catalogue/page-1.html", 5), ("catalogue/page-6.html", 5), ("catalogue/page-11.html", 2)]
+categories = category_urls(first_page, page_url)
+print("Categories:", len(categories), categories[0])
+assert len(categories) == len(CATEGORIES)
+assert categories[0] == "https://books.toscrape.com/catalogue/category/books/travel_2/index.html"
+
+print("=== Testing sharded_scraper() ===")
+start = time.perf_counter()
+serial = [row for page in range(1, 6)
+          for row in scraper(start_path=f"catalogue/page-{page}.html", max_pages=1, concurrency=1,
+                             session_factory=FakeSite)]
+serial_time = time.perf_counter() - start
+
+start = time.perf_counter()
+sharded = list(sharded_scraper(max_pages=5, workers=4, pages_per_shard=1, session_factory=FakeSite))
+sharded_time = time.perf_counter() - start
+print(f"Serial {serial_time:.2f}s, 4 workers {sharded_time:.2f}s, first row: {sharded[0]}")
+
+by_url = lambda row: row["product_page_url"]
+assert len(sharded) == TOTAL_BOOKS
+assert sorted(sharded, key=by_url) == sorted(serial, key=by_url)
+assert sharded[0]["product_page_url"].startswith("https://books.toscrape.com/catalogue/book-")
+
+limited = list(sharded_scraper(max_pages=3, workers=2, pages_per_shard=2, session_factory=FakeSite))
+assert len(limited) == 60
+
+overlapping = [("catalogue/page-1.html", 1), ("catalogue/page-1.html", 1), ("catalogue/page-2.html", 1)]
+deduped = list(sharded_scraper(shards=overlapping, workers=3, session_factory=FakeSite))
+print("Rows from overlapping shards:", len(deduped))
+assert len(deduped) == 40
+assert len({by_url(r) for r in deduped}) == 40
+
+print("=== Testing failed shards ===")
+
+
+class FlakySite(FakeSite):
+    """page-3 fails on its first request in each worker process."""
+    failed = False
+
+    def get(self, url, timeout=None, headers=None):
+        if "/page-3." in url and not FlakySite.failed:
+            FlakySite.failed = True
+            raise ConnectionError("page-3 timed out")
+        return super().get(url, timeout, headers)
+
+
+class BrokenSite(FakeSite):
+    """page-3 always fails."""
+
+    def get(self, url, timeout=None, headers=None):
+        if "/page-3." in url:
+            raise ConnectionError("page-3 is down")
+        return super().get(url, timeout, headers)
+
+
+class DyingSite(FakeSite):
+    """The worker that fetches page-3 dies."""
+
+    def get(self, url, timeout=None, headers=None):
+        if "/page-3." in url:
+            os._exit(1)
+        return super().get(url, timeout, headers)
+
+
+retried = list(sharded_scraper(max_pages=5, workers=2, pages_per_shard=1, session_factory=FlakySite))
+print("Rows after a retried shard:", len(retried))
+assert sorted(retried, key=by_url) == sorted(serial, key=by_url)
+
+for site, error in ((BrokenSite, "1 shard(s) failed: ['catalogue/page-3.html']"),
+                    (DyingSite, "Shard workers exited without finishing the crawl")):
+    rows = []
+    try:
+        for row in sharded_scraper(max_pages=5, workers=2, pages_per_shard=1, session_factory=site):
+            rows.append(row)
+    except RuntimeError as e:
+        print(f"{site.__name__}: {e} after {len(rows)} rows")
+        assert str(e) == error
+    else:
+        raise AssertionError(f"{site.__name__}: a crawl with a lost shard did not fail")
+    if site is BrokenSite:
+        assert len(rows) == TOTAL_BOOKS - 20  # every other shard was still crawled
+
+try:
+    list(sharded_scraper(shards=[("catalogue/page-3.html", 1)], workers=1, retries=0, session_factory=BrokenSite))
+except RuntimeError as e:
+    assert "page-3" in str(e)
+else:
+    raise AssertionError("retries=0: the failed shard did not fail the crawl")